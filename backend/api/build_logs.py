@@ -0,0 +1,92 @@
+"""
+Build log endpoints.
+"""
+
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.auth import require_tenant_admin
+from core.log_archive import get_log_storage
+from database import AsyncSessionLocal, get_db
+from repositories import (
+    BuildLogArchiveRepository,
+    BuildLogRepository,
+    BuildRepository,
+    NotFoundError,
+)
+
+router = APIRouter()
+
+# Seconds between polls while following a running build
+FOLLOW_POLL_INTERVAL = 1.0
+
+
+async def _follow_logs(build_id: str, offset: int) -> AsyncIterator[str]:
+    """Yield a build's output until it finishes, on a dedicated session."""
+    async with AsyncSessionLocal() as session:
+        async for content in BuildLogRepository(session).follow(
+            build_id, offset, FOLLOW_POLL_INTERVAL
+        ):
+            yield content
+
+
+@router.get("/builds/{build_id}/logs")
+async def get_build_logs(
+    build_id: str,
+    offset: int = Query(0, ge=0),
+    follow: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """Read build output from an offset, or follow it while the build runs"""
+    if not await BuildRepository(db).exists(build_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Build not found")
+
+    if follow:
+        return StreamingResponse(_follow_logs(build_id, offset), media_type="text/plain")
+
+    log_slice = await BuildLogRepository(db).read(build_id, offset)
+    content = log_slice.content
+    if not content and offset == 0:
+        # Builds from before the chunked log store
+        try:
+            content = await BuildRepository(db).get_logs(build_id) or ""
+        except NotFoundError:
+            content = ""
+    return {
+        "content": content,
+        "offset": offset,
+        "next_offset": offset + len(content),
+    }
+
+
+@router.get("/builds/{build_id}/logs/lines")
+async def get_build_log_lines(
+    build_id: str,
+    start: int = Query(0, ge=0),
+    count: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+):
+    """Read a range of build output lines, live or archived"""
+    try:
+        lines = await BuildRepository(db).get_log_lines(build_id, start, count)
+    except NotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Build not found")
+    return {"start": start, "lines": lines}
+
+
+@router.get("/tenants/{tenant_id}/log-storage", dependencies=[Depends(require_tenant_admin)])
+async def get_log_storage_savings(tenant_id: str, db: AsyncSession = Depends(get_db)):
+    """Storage saved by compressing a tenant's archived build logs"""
+    rows = await BuildLogArchiveRepository(db, get_log_storage()).storage_savings(tenant_id)
+    if rows:
+        return rows[0]
+    return {
+        "tenant_id": tenant_id,
+        "archived_builds": 0,
+        "original_bytes": 0,
+        "compressed_bytes": 0,
+        "saved_bytes": 0,
+    }
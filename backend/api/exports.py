@@ -0,0 +1,91 @@
+"""
+Tenant data export endpoints.
+"""
+
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.auth import require_tenant_admin
+from core.cache import entity_to_dict
+from database import AsyncSessionLocal, get_db
+from repositories import (
+    BuildRepository,
+    EnvironmentVariableRepository,
+    ProjectRepository,
+    ServiceRepository,
+    TenantRepository,
+    UserRepository,
+)
+
+router = APIRouter()
+
+# Rows fetched per server-side cursor round trip
+EXPORT_CHUNK_SIZE = 1000
+
+SECRET_MASK = "********"
+
+
+def _ndjson_line(record_type: str, data: dict[str, Any]) -> bytes:
+    """Encode one export record as a newline-terminated JSON line."""
+    return (json.dumps({"type": record_type, "data": data}, default=str) + "\n").encode()
+
+
+async def _export_tenant(tenant_id: str) -> AsyncIterator[bytes]:
+    """Yield a tenant and everything it owns as NDJSON lines.
+
+    Runs on its own session, since the request session is closed once the
+    response starts streaming. Every table is walked with a server-side
+    cursor, so memory use does not grow with the size of the tenant.
+    """
+    async with AsyncSessionLocal() as session:
+        tenant = await TenantRepository(session).get_by_id(tenant_id)
+        if tenant is None:
+            return
+        yield _ndjson_line("tenant", entity_to_dict(tenant))
+
+        async for user in UserRepository(session).stream(
+            {"tenant_id": tenant_id}, EXPORT_CHUNK_SIZE
+        ):
+            data = entity_to_dict(user)
+            data.pop("password_hash", None)
+            yield _ndjson_line("user", data)
+
+        async for project in ProjectRepository(session).stream(
+            {"tenant_id": tenant_id}, EXPORT_CHUNK_SIZE
+        ):
+            yield _ndjson_line("project", entity_to_dict(project))
+
+        async for service in ServiceRepository(session).stream_by_tenant(
+            tenant_id, EXPORT_CHUNK_SIZE
+        ):
+            yield _ndjson_line("service", entity_to_dict(service))
+
+        async for env_var in EnvironmentVariableRepository(session).stream_by_tenant(
+            tenant_id, EXPORT_CHUNK_SIZE
+        ):
+            data = entity_to_dict(env_var)
+            if data.get("is_secret"):
+                data["value"] = SECRET_MASK
+            yield _ndjson_line("environment_variable", data)
+
+        # Deferred log and metadata columns are not part of the export
+        async for build in BuildRepository(session).stream_by_tenant(
+            tenant_id, EXPORT_CHUNK_SIZE
+        ):
+            yield _ndjson_line("build", entity_to_dict(build))
+
+
+@router.get("/tenants/{tenant_id}/export", dependencies=[Depends(require_tenant_admin)])
+async def export_tenant(tenant_id: str, db: AsyncSession = Depends(get_db)):
+    """Export a tenant's users, projects, services, variables and builds as NDJSON"""
+    if not await TenantRepository(db).exists(tenant_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tenant not found")
+    return StreamingResponse(
+        _export_tenant(tenant_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="tenant-{tenant_id}.ndjson"'},
+    )
@@ -0,0 +1,164 @@
+"""
+Project and service read endpoints.
+
+Dashboards poll these, so every response carries an ETag computed from a
+single aggregate query and unchanged data is answered with 304 (see
+``core.http_cache``). Lists take a ``fields=`` sparse fieldset and are
+serialized from projected rows (see ``core.serialization``).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.http_cache import conditional_json
+from core.serialization import encode_page, list_adapter, parse_fields, parse_sort
+from database import get_db
+from models.base import ServiceStatus
+from repositories import (
+    CountMode,
+    Fingerprint,
+    LoadProfile,
+    PaginatedResult,
+    PaginationParams,
+    ProjectRepository,
+    ServiceRepository,
+    SortParams,
+)
+from schemas import ProjectRead, ServiceRead
+
+router = APIRouter()
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return (id is always included)"
+
+
+def _fields(value: str | None, schema: type[BaseModel]) -> tuple[str, ...] | None:
+    try:
+        return parse_fields(value, schema)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+
+def _sort(sort_by: str, sort_order: str, schema: type[BaseModel]) -> SortParams:
+    try:
+        return SortParams(*parse_sort(sort_by, sort_order, schema))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+
+def _page(
+    result: PaginatedResult,
+    fingerprint: Fingerprint,
+    schema: type[BaseModel],
+    fields: tuple[str, ...] | None,
+) -> bytes:
+    """Encode a page of projected rows; the total is the fingerprint's count."""
+    return encode_page(
+        list_adapter(schema, fields),
+        result.items,
+        total=fingerprint.count,
+        skip=result.skip,
+        limit=result.limit,
+        has_more=result.has_more,
+    )
+
+
+def _not_found(fingerprint: Fingerprint, name: str) -> None:
+    if fingerprint.count == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{name} not found")
+
+
+@router.get("/tenants/{tenant_id}/projects")
+async def list_projects(
+    request: Request,
+    tenant_id: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort_by: str = "created_at",
+    sort_order: str = "desc",
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_db),
+):
+    """List a tenant's projects"""
+    selected = _fields(fields, ProjectRead)
+    sort = _sort(sort_by, sort_order, ProjectRead)
+    repo = ProjectRepository(db)
+    fingerprint = await repo.fingerprint({"tenant_id": tenant_id})
+
+    async def render() -> bytes:
+        result = await repo.list_by_tenant(
+            tenant_id,
+            pagination=PaginationParams(skip=skip, limit=limit),
+            sort=sort,
+            count_mode=CountMode.NONE,
+            columns=selected or tuple(ProjectRead.model_fields),
+        )
+        return _page(result, fingerprint, ProjectRead, selected)
+
+    return await conditional_json(request, fingerprint, render, scope=tenant_id)
+
+
+@router.get("/projects/{project_id}")
+async def get_project(request: Request, project_id: str, db: AsyncSession = Depends(get_db)):
+    """Get a project"""
+    repo = ProjectRepository(db)
+    fingerprint = await repo.fingerprint({"id": project_id})
+    _not_found(fingerprint, "Project")
+
+    async def render() -> ProjectRead:
+        # A profile bypasses the entity cache, which may be older than the fingerprint
+        entity = await repo.get_by_id_or_raise(project_id, LoadProfile.SUMMARY)
+        return ProjectRead.model_validate(entity)
+
+    return await conditional_json(
+        request, fingerprint, render, scope=project_id, last_modified=True
+    )
+
+
+@router.get("/projects/{project_id}/services")
+async def list_services(
+    request: Request,
+    project_id: str,
+    service_status: ServiceStatus | None = Query(None, alias="status"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort_by: str = "created_at",
+    sort_order: str = "desc",
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_db),
+):
+    """List a project's services, optionally by status"""
+    selected = _fields(fields, ServiceRead)
+    sort = _sort(sort_by, sort_order, ServiceRead)
+    repo = ServiceRepository(db)
+    fingerprint = await repo.fingerprint({"project_id": project_id, "status": service_status})
+
+    async def render() -> bytes:
+        result = await repo.list_by_project(
+            project_id,
+            status=service_status,
+            pagination=PaginationParams(skip=skip, limit=limit),
+            sort=sort,
+            count_mode=CountMode.NONE,
+            columns=selected or tuple(ServiceRead.model_fields),
+        )
+        return _page(result, fingerprint, ServiceRead, selected)
+
+    return await conditional_json(request, fingerprint, render, scope=project_id)
+
+
+@router.get("/services/{service_id}")
+async def get_service(request: Request, service_id: str, db: AsyncSession = Depends(get_db)):
+    """Get a service"""
+    repo = ServiceRepository(db)
+    fingerprint = await repo.fingerprint({"id": service_id})
+    _not_found(fingerprint, "Service")
+
+    async def render() -> ServiceRead:
+        # A profile bypasses the entity cache, which may be older than the fingerprint
+        entity = await repo.get_by_id_or_raise(service_id, LoadProfile.SUMMARY)
+        return ServiceRead.model_validate(entity)
+
+    return await conditional_json(
+        request, fingerprint, render, scope=service_id, last_modified=True
+    )
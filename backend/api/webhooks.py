@@ -0,0 +1,75 @@
+"""
+Git provider webhook endpoints.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+from repositories import BuildRepository, WebhookRepository
+
+router = APIRouter()
+
+BRANCH_REF_PREFIX = "refs/heads/"
+
+
+def signature_matches(secret: str, body: bytes, signature: str | None) -> bool:
+    """Check a GitHub ``X-Hub-Signature-256`` header against the raw body."""
+    if not signature:
+        return False
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+@router.post("/webhooks/{webhook_id}", status_code=status.HTTP_202_ACCEPTED)
+async def receive_webhook(
+    webhook_id: str,
+    request: Request,
+    x_github_event: str | None = Header(None),
+    x_hub_signature_256: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Request a build of a pushed commit; bursts of pushes to a branch are coalesced"""
+    webhook = await WebhookRepository(db).get_by_id(webhook_id)
+    if webhook is None or not webhook.is_active:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not found")
+    body = await request.body()
+    if not signature_matches(webhook.secret, body, x_hub_signature_256):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature")
+    if x_github_event != "push":
+        return {"status": "ignored", "event": x_github_event}
+
+    try:
+        payload = json.loads(body)
+        ref = payload["ref"]
+        commit_sha = payload["after"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid push payload")
+    # Tag pushes and branch deletions have nothing to build
+    if not ref.startswith(BRANCH_REF_PREFIX) or payload.get("deleted"):
+        return {"status": "ignored", "event": x_github_event}
+
+    head_commit = payload.get("head_commit") or {}
+    build_request = await BuildRepository(db).request_build(
+        webhook.service_id,
+        commit_sha,
+        ref.removeprefix(BRANCH_REF_PREFIX),
+        head_commit.get("message"),
+    )
+    await db.commit()
+
+    # Imported lazily: loading the Celery app imports every task module
+    from tasks.scheduler import enqueue_build
+
+    # Publishing to the broker blocks, so it runs off the event loop
+    await asyncio.to_thread(enqueue_build, build_request)
+    return {
+        "status": "queued" if build_request.created else "joined",
+        "build_id": build_request.build.id,
+        "superseded": build_request.superseded,
+    }
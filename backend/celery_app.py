@@ -55,10 +55,36 @@ app.conf.update(
         "backend.tasks.deploy.*": {"queue": "deploy"},
         "backend.tasks.monitor.*": {"queue": "monitor"},
     },
+    # Periodic tasks (run with `celery -A celery_app beat`)
+    beat_schedule={
+        "archive-build-logs": {
+            "task": "tasks.logs.archive_build_logs",
+            "schedule": 3600.0,
+        },
+        "schedule-builds": {
+            "task": "tasks.scheduler.schedule_builds",
+            "schedule": float(os.getenv("BUILD_SCHEDULE_INTERVAL", "5")),
+        },
+        "monitor-services": {
+            "task": "backend.tasks.monitor.monitor_services",
+            "schedule": float(os.getenv("MONITOR_INTERVAL", "30")),
+        },
+    },
 )
 
 # Import tasks directly
-from tasks import add, long_running_task, process_deployment, monitor_service
+from tasks import (
+    add,
+    long_running_task,
+    process_deployment,
+    monitor_service,
+    archive_build_logs,
+    run_build,
+    deploy_build,
+    schedule_builds,
+    monitor_services,
+    monitor_shard,
+)
 
 
 @app.task(bind=True)
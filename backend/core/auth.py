@@ -0,0 +1,73 @@
+"""Bearer token authentication and tenant authorization for API endpoints.
+
+Access tokens are JWTs signed with ``SECRET_KEY`` whose ``sub`` claim is
+the user's id. Endpoints exposing a tenant's data depend on
+``require_tenant_admin``, which only lets through active owners and admins
+of the tenant named in the path.
+"""
+
+import os
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+from models.base import UserRole
+from models.user import User
+from repositories.user import UserRepository
+
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+
+# Roles allowed to read everything a tenant owns
+TENANT_ADMIN_ROLES = (UserRole.OWNER, UserRole.ADMIN)
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def decode_access_token(token: str) -> str | None:
+    """Get the user id from an access token, or None if it is not valid."""
+    if not SECRET_KEY:
+        return None
+    # Imported lazily, like the Redis clients: only authenticated endpoints need it
+    from jose import JWTError, jwt
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+    subject = claims.get("sub")
+    return subject if isinstance(subject, str) else None
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """Get the active user the request's bearer token was issued to.
+
+    Raises:
+        HTTPException: 401 if the token is missing or invalid, or its user
+            does not exist or is inactive
+    """
+    user_id = decode_access_token(credentials.credentials) if credentials else None
+    user = await UserRepository(db).get_by_id(user_id) if user_id else None
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+async def require_tenant_admin(tenant_id: str, user: User = Depends(get_current_user)) -> User:
+    """Allow only owners and admins of the tenant in the path.
+
+    Raises:
+        HTTPException: 403 if the user belongs to another tenant or is a member
+    """
+    if user.tenant_id != tenant_id or user.role not in TENANT_ADMIN_ROLES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+    return user
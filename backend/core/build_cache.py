@@ -0,0 +1,272 @@
+"""Content-addressed cache of build inputs and outputs on local disk.
+
+Files are stored once under ``objects/`` by the hash of their contents and
+executable bit, and each cache entry is a JSON manifest under ``entries/``
+listing the files, directories and symlinks of the cached tree. Restoring
+hardlinks the objects into place (copying when the cache is on another
+filesystem), so restoring ``node_modules`` costs a few syscalls per file
+rather than a download and install. Keep ``BUILD_CACHE_DIR`` on the same
+filesystem as ``BUILD_WORKSPACE``.
+
+Objects are read-only, since every restored tree shares them; a build
+that rewrites a restored file in place as root would corrupt the cache,
+while tools that replace files (unlink and create) are safe.
+
+The cache is held to a disk budget by evicting the least recently used
+entries; an entry's manifest mtime is its last use. Nothing is locked:
+objects and manifests are written by atomic rename, and a restore that
+loses a race with eviction is a miss.
+"""
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+BUILD_CACHE_REQUESTS = REGISTRY.counter(
+    "build_cache_requests_total", "Build cache lookups by kind and result", ("kind", "result")
+)
+
+# Unreferenced objects younger than this may belong to a store in progress
+OBJECT_GRACE_SECONDS = 3600
+
+
+def cache_key(*parts: str) -> str:
+    """Get the entry key for ``parts``, e.g. kind, service, toolchain, lockfile hash."""
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    """Get the sha256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """Content-addressed cache rooted at a directory, limited to ``max_bytes``."""
+
+    def __init__(self, root: str | Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.objects = self.root / "objects"
+        self.entries = self.root / "entries"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.entries.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.entries / f"{key}.json"
+
+    def _object_path(self, name: str) -> Path:
+        return self.objects / name[:2] / name
+
+    def _tmp_path(self, path: Path) -> Path:
+        return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    def lookup(self, key: str) -> dict[str, Any] | None:
+        """Get an entry's manifest and mark it as used, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            manifest = json.loads(path.read_text())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return manifest
+
+    def restore(self, key: str, dest: Path) -> dict[str, Any] | None:
+        """Restore an entry's tree to ``dest``, replacing what is there.
+
+        Returns:
+            The entry's metadata, or None on a miss
+        """
+        manifest = self.lookup(key)
+        if manifest is None:
+            return None
+        shutil.rmtree(dest, ignore_errors=True)
+        try:
+            dest.mkdir(parents=True)
+            for relative in manifest["dirs"]:
+                (dest / relative).mkdir(parents=True, exist_ok=True)
+            for relative, name in manifest["files"]:
+                target = dest / relative
+                try:
+                    os.link(self._object_path(name), target)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.copy2(self._object_path(name), target)
+            for relative, link in manifest["symlinks"]:
+                os.symlink(link, dest / relative)
+        except OSError as e:
+            # Most likely evicted while restoring
+            logger.warning(f"Build cache restore of {key} failed: {e}")
+            shutil.rmtree(dest, ignore_errors=True)
+            return None
+        return manifest["meta"]
+
+    def _store_object(self, path: Path, mode: int) -> tuple[str, int]:
+        executable = bool(mode & stat.S_IXUSR)
+        name = file_digest(path) + ("x" if executable else "")
+        target = self._object_path(name)
+        if target.exists():
+            os.utime(target)
+            return name, 0
+        target.parent.mkdir(exist_ok=True)
+        tmp = self._tmp_path(target)
+        # Copied rather than linked, so the build cannot change the object
+        shutil.copyfile(path, tmp)
+        os.chmod(tmp, 0o555 if executable else 0o444)
+        os.replace(tmp, target)
+        return name, target.stat().st_size
+
+    def store(self, key: str, source: Path | None, meta: dict[str, Any] | None = None) -> int:
+        """Store the tree at ``source`` (or only ``meta``) as entry ``key``.
+
+        Evicts old entries afterwards if the cache is over budget.
+
+        Returns:
+            Bytes of new objects written
+        """
+        files: list[tuple[str, str]] = []
+        dirs: list[str] = []
+        symlinks: list[tuple[str, str]] = []
+        written = 0
+        if source is not None:
+            for directory, dirnames, filenames in os.walk(source):
+                base = Path(directory)
+                for dirname in list(dirnames):
+                    path = base / dirname
+                    relative = str(path.relative_to(source))
+                    if path.is_symlink():
+                        symlinks.append((relative, os.readlink(path)))
+                        dirnames.remove(dirname)
+                    else:
+                        dirs.append(relative)
+                for filename in filenames:
+                    path = base / filename
+                    relative = str(path.relative_to(source))
+                    info = path.lstat()
+                    if stat.S_ISLNK(info.st_mode):
+                        symlinks.append((relative, os.readlink(path)))
+                    elif stat.S_ISREG(info.st_mode):
+                        name, size = self._store_object(path, info.st_mode)
+                        files.append((relative, name))
+                        written += size
+
+        manifest = {
+            "key": key,
+            "created_at": time.time(),
+            "meta": meta or {},
+            "dirs": dirs,
+            "files": files,
+            "symlinks": symlinks,
+        }
+        path = self._entry_path(key)
+        tmp = self._tmp_path(path)
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, path)
+        self.evict()
+        return written
+
+    def evict(self) -> int:
+        """Evict least recently used entries until the objects fit the budget.
+
+        Returns:
+            Bytes freed
+        """
+        sizes: dict[str, int] = {}
+        mtimes: dict[str, float] = {}
+        stale: list[Path] = []
+        now = time.time()
+        for path in self.objects.glob("*/*"):
+            try:
+                info = path.stat()
+            except OSError:
+                continue
+            if path.name.endswith(".tmp"):
+                if now - info.st_mtime > OBJECT_GRACE_SECONDS:
+                    stale.append(path)
+                continue
+            sizes[path.name] = info.st_size
+            mtimes[path.name] = info.st_mtime
+        total = sum(sizes.values())
+
+        entries: list[tuple[float, Path, set[str]]] = []
+        references: dict[str, int] = {}
+        for path in self.entries.glob("*.json"):
+            try:
+                last_used = path.stat().st_mtime
+                names = {name for _, name in json.loads(path.read_text())["files"]}
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append((last_used, path, names))
+            for name in names:
+                references[name] = references.get(name, 0) + 1
+
+        # Objects no entry references, e.g. left by a crash, once past the grace period
+        unreferenced = [
+            name
+            for name in sizes
+            if name not in references and now - mtimes[name] > OBJECT_GRACE_SECONDS
+        ]
+        freed = 0
+        for name in unreferenced:
+            freed += self._remove_object(name, sizes)
+        for path in stale:
+            path.unlink(missing_ok=True)
+
+        entries.sort(key=lambda entry: entry[0])
+        for _, path, names in entries:
+            if total - freed <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            for name in names:
+                references[name] -= 1
+                if references[name] == 0:
+                    freed += self._remove_object(name, sizes)
+        if freed:
+            logger.info(f"Build cache evicted {freed} bytes")
+        return freed
+
+    def _remove_object(self, name: str, sizes: dict[str, int]) -> int:
+        try:
+            self._object_path(name).unlink()
+        except FileNotFoundError:
+            return 0
+        return sizes.get(name, 0)
+
+
+_build_cache: BuildCache | None = None
+
+
+def get_build_cache() -> BuildCache | None:
+    """Get the process-wide build cache, or None when ``BUILD_CACHE_DIR`` is empty."""
+    global _build_cache
+    if _build_cache is None:
+        root = os.getenv(
+            "BUILD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "railway-build-cache")
+        )
+        if root:
+            max_bytes = int(float(os.getenv("BUILD_CACHE_MAX_MB", "20480")) * 1024 * 1024)
+            _build_cache = BuildCache(root, max_bytes)
+    return _build_cache
+
+
+def set_build_cache(cache: BuildCache | None) -> None:
+    """Install (or remove) the process-wide build cache."""
+    global _build_cache
+    _build_cache = cache
@@ -0,0 +1,330 @@
+"""Read-through entity cache: per-process LRU with TTL in front of Redis.
+
+Cached values are plain column dictionaries rather than ORM objects, so a
+value loaded by one session can be merged into any other session. Misses
+are never cached. Concurrent misses for the same key are collapsed into a
+single load (single-flight).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import DateTime, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# session.info key collecting callbacks to run once the transaction commits
+PENDING_INVALIDATIONS_KEY = "entity_cache_pending"
+
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL.
+
+    ``on_evict(key, value)`` is called for entries dropped because they
+    expired or the cache was full, but not for ``delete`` or ``clear``.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 5.0,
+        on_evict: Callable[[Any, Any], None] | None = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Get a live entry, refreshing its recency, or ``default``."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+                if self.on_evict is not None:
+                    self.on_evict(key, entry[1])
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Any, value: Any, ttl: float | None = None) -> None:
+        """Store an entry, evicting the least recently used one when full."""
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, (_, value) = self._data.popitem(last=False)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted, value)
+
+    def delete(self, key: Any) -> None:
+        """Remove an entry if present."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class EntityCache:
+    """Two-tier read-through cache for repository lookups.
+
+    Keys look like ``"<table>:<field>:<value>"``. Every key is indexed by the
+    id of the entity it resolved to, so invalidating an entity drops all of
+    its lookup keys at once.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        local_ttl: float = 5.0,
+        redis_url: str | None = None,
+        redis_ttl: int = 60,
+        prefix: str = "entity:",
+    ):
+        self.local = LRUCache(maxsize=maxsize, ttl=local_ttl, on_evict=self._unindex)
+        self.redis_url = redis_url
+        self.redis_ttl = redis_ttl
+        self.prefix = prefix
+        self.redis_hits = 0
+        self.loads = 0
+        self.coalesced = 0
+        self._redis: Any = None
+        self._index: dict[tuple[str, str], set[str]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._generation = 0
+
+    def _unindex(self, cache_key: str, data: dict[str, Any]) -> None:
+        """Drop an evicted key from the entity index."""
+        index_key = (cache_key.split(":", 1)[0], data["id"])
+        keys = self._index.get(index_key)
+        if keys is None:
+            return
+        keys.discard(cache_key)
+        if not keys:
+            del self._index[index_key]
+
+    def stats(self) -> dict[str, int]:
+        """Get hit, miss and eviction counters."""
+        return {
+            "size": len(self.local),
+            "local_hits": self.local.hits,
+            "local_misses": self.local.misses,
+            "redis_hits": self.redis_hits,
+            "misses": self.loads,
+            "coalesced": self.coalesced,
+            "evictions": self.local.evictions,
+        }
+
+    async def get_or_load(
+        self,
+        table: str,
+        key: str,
+        load: Callable[[], Awaitable[dict[str, Any] | None]],
+    ) -> dict[str, Any] | None:
+        """Get cached column values for ``table:key``, loading them on a miss."""
+        cache_key = f"{table}:{key}"
+        data = self.local.get(cache_key, _MISSING)
+        if data is not _MISSING:
+            return data
+
+        future = self._inflight.get(cache_key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            data = await self._load(table, cache_key, load)
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved so waiter-less failures are not reported as unhandled
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(cache_key) is future:
+                del self._inflight[cache_key]
+        future.set_result(data)
+        return data
+
+    async def _load(
+        self,
+        table: str,
+        cache_key: str,
+        load: Callable[[], Awaitable[dict[str, Any] | None]],
+    ) -> dict[str, Any] | None:
+        """Resolve a local miss from Redis, then from the database."""
+        generation = self._generation
+        data = await self._redis_get(cache_key)
+        if data is not None:
+            self.redis_hits += 1
+        else:
+            self.loads += 1
+            data = await load()
+            if data is None:
+                return None
+            if generation == self._generation:
+                await self._redis_set(table, cache_key, data)
+        # An invalidation during the load may have made ``data`` stale
+        if generation == self._generation:
+            self.local.set(cache_key, data)
+            self._index.setdefault((table, data["id"]), set()).add(cache_key)
+        return data
+
+    async def invalidate(self, table: str, entity_id: str) -> None:
+        """Drop every cached lookup that resolved to the given entity."""
+        self.invalidate_local(table, entity_id)
+        client = self._client()
+        if client is None:
+            return
+        index_key = f"{self.prefix}{table}:idx:{entity_id}"
+        try:
+            keys = await client.smembers(index_key)
+            await client.delete(index_key, *keys)
+        except Exception as exc:
+            logger.warning("Entity cache invalidation failed for %s: %s", index_key, exc)
+
+    def invalidate_local(self, table: str, entity_id: str) -> None:
+        """Drop the in-process entries for an entity."""
+        self._generation += 1
+        for cache_key in self._index.pop((table, entity_id), ()):
+            self.local.delete(cache_key)
+            self._inflight.pop(cache_key, None)
+
+    def _client(self) -> Any:
+        """Get the Redis client, creating it on first use."""
+        if self.redis_url and self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    async def _redis_get(self, cache_key: str) -> dict[str, Any] | None:
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(self.prefix + cache_key)
+        except Exception as exc:
+            logger.warning("Entity cache read failed for %s: %s", cache_key, exc)
+            return None
+        return None if raw is None else json.loads(raw)
+
+    async def _redis_set(self, table: str, cache_key: str, data: dict[str, Any]) -> None:
+        client = self._client()
+        if client is None:
+            return
+        index_key = f"{self.prefix}{table}:idx:{data['id']}"
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.set(self.prefix + cache_key, json.dumps(data), ex=self.redis_ttl)
+                pipe.sadd(index_key, self.prefix + cache_key)
+                pipe.expire(index_key, self.redis_ttl)
+                await pipe.execute()
+        except Exception as exc:
+            logger.warning("Entity cache write failed for %s: %s", cache_key, exc)
+
+
+def entity_to_dict(entity: Any) -> dict[str, Any]:
+    """Get the loaded column values of an entity in JSON-safe form."""
+    state = inspect(entity)
+    data = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in state.dict:
+            value = state.dict[attr.key]
+            data[attr.key] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+async def merge_cached(session: AsyncSession, model: type, data: dict[str, Any]) -> Any:
+    """Attach cached column values to ``session`` as a persistent entity, without SQL.
+
+    An instance the session already holds is returned as is: merging would
+    overwrite its unflushed changes with the cached values.
+    """
+    mapper = inspect(model)
+    identity = mapper.identity_key_from_primary_key(
+        tuple(data[column.key] for column in mapper.primary_key)
+    )
+    existing = session.identity_map.get(identity)
+    if existing is not None:
+        return existing
+
+    values = dict(data)
+    for attr in mapper.column_attrs:
+        value = values.get(attr.key)
+        if isinstance(value, str) and isinstance(attr.columns[0].type, DateTime):
+            values[attr.key] = datetime.fromisoformat(value)
+    entity = model(**values)
+    make_transient_to_detached(entity)
+    return await session.merge(entity, load=False)
+
+
+def invalidate_after_commit(session: AsyncSession, cache: EntityCache, table: str, entity_id: str) -> None:
+    """Repeat an invalidation once the session commits.
+
+    Readers can re-populate the cache with the old row between the write and
+    the commit; invalidating again after commit closes that window.
+    """
+    run_after_commit(session, lambda: cache.invalidate(table, entity_id))
+
+
+def run_after_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """Run ``callback`` once the session commits; it is dropped on rollback."""
+    session.info.setdefault(PENDING_INVALIDATIONS_KEY, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    pending = session.info.pop(PENDING_INVALIDATIONS_KEY, None)
+    if not pending:
+        return
+    loop = asyncio.get_running_loop()
+    for callback in pending:
+        loop.create_task(callback())
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(PENDING_INVALIDATIONS_KEY, None)
+
+
+_entity_cache: EntityCache | None = None
+
+
+def get_entity_cache() -> EntityCache | None:
+    """Get the process-wide entity cache, or None when it is disabled."""
+    global _entity_cache
+    if _entity_cache is None and os.getenv("ENTITY_CACHE_ENABLED", "false").lower() == "true":
+        _entity_cache = EntityCache(
+            maxsize=int(os.getenv("ENTITY_CACHE_MAX_SIZE", "10000")),
+            local_ttl=float(os.getenv("ENTITY_CACHE_TTL", "5")),
+            redis_url=os.getenv("ENTITY_CACHE_REDIS_URL", os.getenv("REDIS_URL")),
+            redis_ttl=int(os.getenv("ENTITY_CACHE_REDIS_TTL", "60")),
+        )
+    return _entity_cache
+
+
+def set_entity_cache(cache: EntityCache | None) -> None:
+    """Install (or remove) the process-wide entity cache."""
+    global _entity_cache
+    _entity_cache = cache
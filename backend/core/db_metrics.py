@@ -0,0 +1,139 @@
+"""SQLAlchemy pool and statement instrumentation.
+
+``InstrumentedAsyncPool`` times every connection checkout, and
+``instrument_engine`` hooks cursor events to time statements, keep a log
+of slow ones and count them against the current request (see
+``core.query_tracker``). Values are recorded in ``core.metrics.REGISTRY`` under
+``db_*`` names, labelled by engine name (the pool logging name).
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.metrics import REGISTRY
+from core.query_tracker import record_statement
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this (seconds) are logged and kept in SLOW_QUERIES
+SLOW_QUERY_THRESHOLD = float(os.getenv("DB_SLOW_QUERY_SECONDS", "0.5"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("DB_SLOW_QUERY_LOG_SIZE", "100"))
+
+CHECKOUT_SECONDS = REGISTRY.histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled connection, including pre-ping",
+    ("engine",),
+)
+CHECKOUT_TIMEOUTS = REGISTRY.counter(
+    "db_pool_checkout_timeouts_total",
+    "Connection checkouts that gave up because the pool was exhausted",
+    ("engine",),
+)
+POOL_SIZE = REGISTRY.gauge("db_pool_size", "Configured pool size", ("engine",))
+POOL_CHECKED_OUT = REGISTRY.gauge(
+    "db_pool_checked_out", "Connections currently in use", ("engine",)
+)
+POOL_OVERFLOW = REGISTRY.gauge(
+    "db_pool_overflow", "Connections open beyond the pool size", ("engine",)
+)
+STATEMENT_SECONDS = REGISTRY.histogram(
+    "db_statement_seconds", "SQL statement execution time", ("engine", "operation")
+)
+STATEMENT_ERRORS = REGISTRY.counter(
+    "db_statement_errors_total", "SQL statements that raised an error", ("engine", "operation")
+)
+SLOW_STATEMENTS = REGISTRY.counter(
+    "db_slow_statements_total", "SQL statements slower than the slow query threshold", ("engine",)
+)
+
+# Most recent slow statements, newest last
+SLOW_QUERIES: deque[dict[str, Any]] = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Async queue pool recording checkout latency and timeouts."""
+
+    def connect(self):
+        name = self._orig_logging_name or "default"
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            CHECKOUT_TIMEOUTS.inc(engine=name)
+            raise
+        finally:
+            CHECKOUT_SECONDS.observe(time.perf_counter() - start, engine=name)
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Replace bound parameter values with placeholders, keeping their shape."""
+    if isinstance(parameters, dict):
+        return {key: "?" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"<{len(parameters)} parameter sets>"
+        return ["?"] * len(parameters)
+    return None if parameters is None else "?"
+
+
+def _operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else ""
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Record pool gauges and statement timings for ``engine``."""
+    sync_engine = engine.sync_engine
+
+    if isinstance(sync_engine.pool, AsyncAdaptedQueuePool):
+        POOL_SIZE.set_function(lambda: sync_engine.pool.size(), engine=name)
+        POOL_CHECKED_OUT.set_function(lambda: sync_engine.pool.checkedout(), engine=name)
+        POOL_OVERFLOW.set_function(lambda: max(sync_engine.pool.overflow(), 0), engine=name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _record_statement(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        record_statement(statement, duration)
+        STATEMENT_SECONDS.observe(duration, engine=name, operation=_operation(statement))
+        if duration >= SLOW_QUERY_THRESHOLD:
+            SLOW_STATEMENTS.inc(engine=name)
+            entry = {
+                "engine": name,
+                "duration_seconds": round(duration, 6),
+                "statement": statement,
+                "parameters": redact_parameters(parameters),
+                "at": time.time(),
+            }
+            SLOW_QUERIES.append(entry)
+            logger.warning(
+                f"Slow query on {name} ({duration:.3f}s): {statement} "
+                f"params={entry['parameters']}"
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _record_error(context):
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+        STATEMENT_ERRORS.inc(engine=name, operation=_operation(context.statement or ""))
+
+
+def db_metrics_snapshot() -> dict[str, Any]:
+    """Get pool and statement metrics plus the recent slow query log."""
+    return {
+        "slow_query_threshold_seconds": SLOW_QUERY_THRESHOLD,
+        "metrics": REGISTRY.snapshot(prefix="db_"),
+        "slow_queries": list(SLOW_QUERIES),
+    }
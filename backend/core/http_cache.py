@@ -0,0 +1,210 @@
+"""Conditional GET support and a shared response cache.
+
+List and detail endpoints fingerprint the rows they would return (row count
+plus newest ``updated_at``/``created_at``) in one aggregate query. The ETag
+hashes that fingerprint with the request path and query, so a client
+polling unchanged data gets ``304 Not Modified`` without any row being
+loaded or serialized.
+
+With the response cache enabled, the body for an ETag is serialized once
+and shared between processes through Redis. Entries are keyed by tenant
+and ETag, and the ETag changes with the data, so entries are never stale.
+
+``now()`` is the transaction start time in Postgres, so a write committed
+after a newer one can leave the fingerprint unchanged. ETags therefore also
+change every ``ETAG_MAX_AGE`` seconds, which bounds how long such a write
+goes unseen.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable
+
+from fastapi import Request, Response
+
+from core.cache import LRUCache
+from core.metrics import REGISTRY
+from core.serialization import dumps
+from repositories.base import Fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Longest time a change hidden from the fingerprint can go unnoticed
+ETAG_MAX_AGE = int(os.getenv("ETAG_MAX_AGE", "60"))
+
+CONDITIONAL_RESPONSES = REGISTRY.counter(
+    "http_conditional_responses_total",
+    "Fingerprinted GET responses by outcome",
+    ("result",),
+)
+
+
+class ResponseCache:
+    """Serialized response bodies, per process in front of Redis."""
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        local_ttl: float = 60.0,
+        redis_url: str | None = None,
+        redis_ttl: int = 300,
+        prefix: str = "response:",
+    ):
+        self.local = LRUCache(maxsize=maxsize, ttl=local_ttl)
+        self.redis_url = redis_url
+        self.redis_ttl = redis_ttl
+        self.prefix = prefix
+        self._redis: Any = None
+
+    def _client(self) -> Any:
+        """Get the Redis client, creating it on first use."""
+        if self.redis_url and self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    async def get(self, key: str) -> bytes | None:
+        """Get a cached body, from this process or Redis."""
+        body = self.local.get(key)
+        if body is not None:
+            return body
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            body = await client.get(self.prefix + key)
+        except Exception as exc:
+            logger.warning("Response cache read failed for %s: %s", key, exc)
+            return None
+        if body is not None:
+            self.local.set(key, body)
+        return body
+
+    async def set(self, key: str, body: bytes) -> None:
+        """Cache a body in this process and Redis."""
+        self.local.set(key, body)
+        client = self._client()
+        if client is None:
+            return
+        try:
+            await client.set(self.prefix + key, body, ex=self.redis_ttl)
+        except Exception as exc:
+            logger.warning("Response cache write failed for %s: %s", key, exc)
+
+
+_response_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Get the process-wide response cache, or None when it is disabled."""
+    global _response_cache
+    if _response_cache is None and os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true":
+        _response_cache = ResponseCache(
+            maxsize=int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "1000")),
+            local_ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60")),
+            redis_url=os.getenv("RESPONSE_CACHE_REDIS_URL", os.getenv("REDIS_URL")),
+            redis_ttl=int(os.getenv("RESPONSE_CACHE_REDIS_TTL", "300")),
+        )
+    return _response_cache
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    """Install (or remove) the process-wide response cache."""
+    global _response_cache
+    _response_cache = cache
+
+
+def compute_etag(request: Request, fingerprint: Fingerprint) -> str:
+    """Get a weak ETag for ``fingerprint`` as served at the request's URL."""
+    last_modified = fingerprint.last_modified.isoformat() if fingerprint.last_modified else ""
+    parts = [
+        request.url.path,
+        "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items())),
+        str(fingerprint.count),
+        last_modified,
+        str(int(time.time() // ETAG_MAX_AGE)),
+    ]
+    return 'W/"' + hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(",")
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Convert to UTC, reading naive timestamps (SQLite) as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _not_modified_since(if_modified_since: str, fingerprint: Fingerprint) -> bool:
+    if fingerprint.last_modified is None:
+        return False
+    try:
+        since = _as_utc(parsedate_to_datetime(if_modified_since))
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have whole seconds
+    return _as_utc(fingerprint.last_modified).replace(microsecond=0) <= since
+
+
+async def conditional_json(
+    request: Request,
+    fingerprint: Fingerprint,
+    render: Callable[[], Awaitable[Any]],
+    scope: str,
+    last_modified: bool = False,
+) -> Response:
+    """Answer a GET with 304, a cached body, or the rendered JSON.
+
+    ``render`` builds the payload, or its encoded JSON bytes, and only runs
+    when neither the client nor the response cache has it. ``scope`` (the tenant, or the id the URL is
+    about) partitions the cache. Pass ``last_modified`` only when the
+    fingerprint covers a single row: for a set, deleting a row does not move
+    its newest modification time, so ``If-Modified-Since`` would miss it.
+    """
+    etag = compute_etag(request, fingerprint)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified and fingerprint.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            _as_utc(fingerprint.last_modified), usegmt=True
+        )
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = (
+            last_modified
+            and if_modified_since is not None
+            and _not_modified_since(if_modified_since, fingerprint)
+        )
+    if not_modified:
+        CONDITIONAL_RESPONSES.inc(result="not_modified")
+        return Response(status_code=304, headers=headers)
+
+    cache = get_response_cache()
+    cache_key = f"{scope}:{etag}"
+    body = await cache.get(cache_key) if cache is not None else None
+    if body is not None:
+        CONDITIONAL_RESPONSES.inc(result="cache_hit")
+    else:
+        CONDITIONAL_RESPONSES.inc(result="rendered")
+        payload = await render()
+        body = payload if isinstance(payload, bytes) else dumps(payload)
+        if cache is not None:
+            await cache.set(cache_key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,147 @@
+"""Compressed cold storage for build logs.
+
+An archived log is a gzip file made of independent members of
+``block_lines`` lines each; concatenated members are still a valid gzip file,
+so ``zcat`` reads it whole. The block index records the first line, byte
+offset and byte length of every member, which lets a line range be served by
+reading and decompressing only the members it spans.
+"""
+
+import bisect
+import gzip
+import os
+from pathlib import Path
+
+# Block index entry: [first_line, byte_offset, byte_length]
+BlockIndex = list[list[int]]
+
+
+class LogStorage:
+    """Blob storage for archived logs.
+
+    Subclasses back this with a local directory or an object store; reads
+    are by byte range so archives never have to be fetched whole.
+    """
+
+    def write(self, key: str, data: bytes) -> None:
+        """Store ``data`` under ``key``, replacing any previous blob."""
+        raise NotImplementedError
+
+    def read_range(self, key: str, offset: int, length: int) -> bytes:
+        """Read ``length`` bytes of a blob starting at ``offset``."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove a blob if it exists."""
+        raise NotImplementedError
+
+
+class LocalDiskStorage(LogStorage):
+    """Log storage in a local directory."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partial archive
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def read_range(self, key: str, offset: int, length: int) -> bytes:
+        with open(self._path(key), "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+def split_lines(text: str) -> list[str]:
+    """Split text into lines, keeping each line's ``\\n``."""
+    lines = text.split("\n")
+    tail = lines.pop()
+    lines = [line + "\n" for line in lines]
+    if tail:
+        lines.append(tail)
+    return lines
+
+
+def compress_log(text: str, block_lines: int = 1000) -> tuple[bytes, BlockIndex, int]:
+    """Compress a log into independently decompressible gzip blocks.
+
+    Returns the archive bytes, its block index and the number of lines.
+    """
+    lines = split_lines(text)
+    blocks = []
+    index: BlockIndex = []
+    offset = 0
+    for first_line in range(0, len(lines), block_lines):
+        block = "".join(lines[first_line:first_line + block_lines]).encode()
+        member = gzip.compress(block, mtime=0)
+        blocks.append(member)
+        index.append([first_line, offset, len(member)])
+        offset += len(member)
+    return b"".join(blocks), index, len(lines)
+
+
+def read_lines(
+    storage: LogStorage,
+    key: str,
+    index: BlockIndex,
+    start: int,
+    count: int,
+) -> list[str]:
+    """Read ``count`` lines from ``start`` out of an archived log.
+
+    Only the blocks overlapping the range are read, as one contiguous byte
+    range, and decompressed.
+    """
+    if not index or count <= 0:
+        return []
+    first = max(bisect.bisect_right([entry[0] for entry in index], start) - 1, 0)
+    last = first
+    while last + 1 < len(index) and index[last + 1][0] < start + count:
+        last += 1
+
+    offset = index[first][1]
+    length = index[last][1] + index[last][2] - offset
+    data = gzip.decompress(storage.read_range(key, offset, length)).decode()
+    lines = split_lines(data)
+    skip = start - index[first][0]
+    return [line.rstrip("\n") for line in lines[skip:skip + count]]
+
+
+def read_all(storage: LogStorage, key: str, index: BlockIndex) -> str:
+    """Decompress a whole archived log."""
+    if not index:
+        return ""
+    length = index[-1][1] + index[-1][2]
+    return gzip.decompress(storage.read_range(key, 0, length)).decode()
+
+
+def archive_key(build_id: str) -> str:
+    """Storage key of a build's archived log, fanned out by id prefix."""
+    return f"{build_id[:2]}/{build_id}.log.gz"
+
+
+_log_storage: LogStorage | None = None
+
+
+def get_log_storage() -> LogStorage:
+    """Get the process-wide log archive storage."""
+    global _log_storage
+    if _log_storage is None:
+        _log_storage = LocalDiskStorage(os.getenv("LOG_ARCHIVE_DIR", "./data/log-archive"))
+    return _log_storage
+
+
+def set_log_storage(storage: LogStorage | None) -> None:
+    """Install (or reset) the process-wide log archive storage."""
+    global _log_storage
+    _log_storage = storage
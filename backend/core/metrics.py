@@ -0,0 +1,273 @@
+"""In-process metrics: counters, gauges and histograms with labels.
+
+Metrics are plain dictionaries updated from the event loop thread; there
+are no locks, so recording costs a dict lookup and an addition. Values are
+keyed by the tuple of label values, in the order of ``labelnames``.
+"""
+
+import bisect
+from typing import Any, Callable
+
+# Default latency buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = tuple[str, ...]
+
+
+class Metric:
+    """Base class for a named metric with a fixed set of label names."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> list[dict[str, Any]]:
+        """Get the current value of every label combination."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[dict[str, Any]]:
+        return [
+            {"labels": self._labels(key), "value": value}
+            for key, value in list(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    """Value that goes up and down, set directly or read from a callback."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: dict[LabelValues, float] = {}
+        self._functions: dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def clear(self) -> None:
+        """Drop every value set with ``set``, e.g. before re-reading a changing label set."""
+        self._values.clear()
+
+    def set_function(self, function: Callable[[], float], **labels: Any) -> None:
+        """Read the value from ``function`` whenever the gauge is collected."""
+        self._functions[self._key(labels)] = function
+
+    def value(self, **labels: Any) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0)
+
+    def samples(self) -> list[dict[str, Any]]:
+        values = dict(self._values)
+        for key, function in list(self._functions.items()):
+            values[key] = function()
+        return [{"labels": self._labels(key), "value": value} for key, value in values.items()]
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label key: [count per bucket (+Inf last), sum, count]
+        self._values: dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def count(self, **labels: Any) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self) -> list[dict[str, Any]]:
+        samples = []
+        for key, (bucket_counts, total, count) in list(self._values.items()):
+            cumulative = []
+            running = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                running += bucket_count
+                cumulative.append(("+Inf" if bound == float("inf") else bound, running))
+            samples.append(
+                {
+                    "labels": self._labels(key),
+                    "buckets": cumulative,
+                    "sum": total,
+                    "count": count,
+                }
+            )
+        return samples
+
+
+class MetricsRegistry:
+    """Named collection of metrics."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def _get_or_create(self, cls: type, name: str, *args: Any, **kwargs: Any) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.type}")
+        return metric
+
+    def counter(self, name: str, description: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labelnames)
+
+    def gauge(self, name: str, description: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, description, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labelnames, buckets)
+
+    def metrics(self) -> list[Metric]:
+        return list(self._metrics.values())
+
+    def snapshot(self, prefix: str = "") -> dict[str, Any]:
+        """Get every metric whose name starts with ``prefix`` as JSON-safe data."""
+        return {
+            metric.name: {
+                "type": metric.type,
+                "description": metric.description,
+                "samples": metric.samples(),
+            }
+            for metric in self.metrics()
+            if metric.name.startswith(prefix)
+        }
+
+
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, Any], extra: dict[str, Any] | None = None) -> str:
+    pairs = {**labels, **(extra or {})}
+    if not pairs:
+        return ""
+    return "{" + ",".join(
+        f'{name}="{_escape_label_value(value)}"' for name, value in pairs.items()
+    ) + "}"
+
+
+def render_prometheus(registry: MetricsRegistry) -> str:
+    """Render every metric in the Prometheus text exposition format (0.0.4)."""
+    return render_snapshot(registry.snapshot())
+
+
+def render_snapshot(snapshot: dict[str, Any]) -> str:
+    """Render a ``MetricsRegistry.snapshot()`` in the Prometheus text format."""
+    lines = []
+    for name, metric in snapshot.items():
+        lines.append(f"# HELP {name} {metric['description']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for sample in metric["samples"]:
+            labels = sample["labels"]
+            if metric["type"] == Histogram.type:
+                for bound, count in sample["buckets"]:
+                    lines.append(f"{name}_bucket{_format_labels(labels, {'le': bound})} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {sample['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {sample['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {sample['value']}")
+    return "\n".join(lines) + "\n"
+
+
+def merge_snapshots(snapshots: dict[str, dict[str, Any]], gauges: bool = True) -> dict[str, Any]:
+    """Merge the registry snapshots of several processes into one.
+
+    ``snapshots`` maps a process name to its snapshot. Counters and
+    histograms are summed across processes; gauges keep one sample per
+    process with a ``worker`` label, or are left out when ``gauges`` is
+    false.
+    """
+    merged: dict[str, Any] = {}
+    for worker, snapshot in snapshots.items():
+        for name, metric in snapshot.items():
+            is_gauge = metric["type"] == Gauge.type
+            if is_gauge and not gauges:
+                continue
+            target = merged.setdefault(
+                name, {"type": metric["type"], "description": metric["description"], "samples": {}}
+            )
+            for sample in metric["samples"]:
+                labels = {**sample["labels"], "worker": worker} if is_gauge else sample["labels"]
+                key = tuple(sorted(labels.items()))
+                existing = target["samples"].get(key)
+                if existing is None:
+                    existing = target["samples"][key] = {**sample, "labels": labels}
+                    if "buckets" in sample:
+                        # Copied, since later processes are added in place
+                        existing["buckets"] = [list(bucket) for bucket in sample["buckets"]]
+                elif "buckets" in sample:
+                    for bucket, (_, count) in zip(existing["buckets"], sample["buckets"]):
+                        bucket[1] += count
+                    existing["sum"] += sample["sum"]
+                    existing["count"] += sample["count"]
+                else:
+                    existing["value"] += sample["value"]
+    for metric in merged.values():
+        metric["samples"] = list(metric["samples"].values())
+    return merged
+
+
+# Process-wide registry
+REGISTRY = MetricsRegistry()
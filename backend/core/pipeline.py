@@ -0,0 +1,212 @@
+"""Build and deploy pipelines as a DAG of async steps.
+
+A ``Pipeline`` declares its steps and their dependencies. ``run_pipeline``
+starts every step whose dependencies have succeeded, so independent steps
+run concurrently, and enforces each step's timeout. When a step fails the
+steps still running are cancelled and the ones not started are skipped.
+
+Progress is reported as a JSON-serializable state dict after every change,
+which the build tasks store in ``Build.build_metadata``.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCESS = "success"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+CANCELLED = "cancelled"
+# Returned by a step with nothing to do; dependents still run
+SKIPPED = "skipped"
+
+# Steps in these states let their dependents start
+COMPLETED_STATUSES = frozenset({SUCCESS, SKIPPED})
+
+
+class StepFailed(Exception):
+    """Raised by a step for an expected failure; the message is recorded."""
+
+
+@dataclass(frozen=True)
+class Step:
+    """One pipeline step.
+
+    ``run`` is awaited with the pipeline context and may return ``SKIPPED``
+    when there is nothing to do. ``timeout`` is in seconds.
+    """
+
+    name: str
+    run: Callable[[Any], Awaitable[str | None]]
+    depends_on: tuple[str, ...] = ()
+    timeout: float = 600.0
+
+
+class Pipeline:
+    """A named DAG of steps, validated on construction.
+
+    Raises:
+        ValueError: If step names repeat, a dependency is unknown, or the
+            dependencies form a cycle
+    """
+
+    def __init__(self, name: str, steps: Iterable[Step]):
+        self.name = name
+        self.steps: dict[str, Step] = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"Duplicate step '{step.name}' in pipeline '{name}'")
+            self.steps[step.name] = step
+        for step in self.steps.values():
+            unknown = [dep for dep in step.depends_on if dep not in self.steps]
+            if unknown:
+                raise ValueError(
+                    f"Step '{step.name}' depends on unknown steps: {', '.join(unknown)}"
+                )
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> list[str]:
+        remaining = {name: set(step.depends_on) for name, step in self.steps.items()}
+        order: list[str] = []
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(
+                    f"Pipeline '{self.name}' has a dependency cycle between: "
+                    f"{', '.join(sorted(remaining))}"
+                )
+            for name in ready:
+                del remaining[name]
+                order.append(name)
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class _StepState:
+    status: str = PENDING
+    started_at: str | None = None
+    finished_at: str | None = None
+    duration_seconds: float | None = None
+    error: str | None = None
+    _started: float = field(default=0.0, repr=False)
+
+    def start(self) -> None:
+        self.status = RUNNING
+        self.started_at = _now()
+        self._started = time.perf_counter()
+
+    def finish(self, status: str, error: str | None = None) -> None:
+        self.status = status
+        self.error = error
+        if self.started_at is not None:
+            self.finished_at = _now()
+            self.duration_seconds = round(time.perf_counter() - self._started, 3)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": self.duration_seconds,
+            "error": self.error,
+        }
+
+
+async def _run_step(step: Step, context: Any) -> tuple[str, str | None]:
+    """Run one step, turning its outcome into a status and error message."""
+    try:
+        result = await asyncio.wait_for(step.run(context), timeout=step.timeout)
+    except asyncio.TimeoutError:
+        return TIMED_OUT, f"Timed out after {step.timeout:g}s"
+    except StepFailed as e:
+        return FAILED, str(e)
+    except Exception as e:
+        logger.exception(f"Pipeline step {step.name} raised")
+        return FAILED, f"{type(e).__name__}: {e}"
+    return (SKIPPED if result == SKIPPED else SUCCESS), None
+
+
+async def run_pipeline(
+    pipeline: Pipeline,
+    context: Any,
+    report: Callable[[dict[str, Any]], Awaitable[None]] | None = None,
+) -> dict[str, Any]:
+    """Run ``pipeline`` and return its final state.
+
+    ``report`` is awaited with the full state whenever a step starts or
+    finishes. Calls never overlap, since they are made from this coroutine
+    rather than from the steps.
+    """
+    steps = {name: _StepState() for name in pipeline.order}
+    state: dict[str, Any] = {
+        "name": pipeline.name,
+        "status": RUNNING,
+        "started_at": _now(),
+        "finished_at": None,
+        "duration_seconds": None,
+        "steps": {},
+    }
+    started = time.perf_counter()
+
+    async def publish() -> None:
+        state["steps"] = {name: step.as_dict() for name, step in steps.items()}
+        if report is not None:
+            await report(state)
+
+    running: dict[asyncio.Task, str] = {}
+    failed = False
+    try:
+        while True:
+            if not failed:
+                for name in pipeline.order:
+                    step = pipeline.steps[name]
+                    if steps[name].status == PENDING and all(
+                        steps[dep].status in COMPLETED_STATUSES for dep in step.depends_on
+                    ):
+                        steps[name].start()
+                        running[asyncio.create_task(_run_step(step, context))] = name
+            await publish()
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                status, error = task.result()
+                steps[name].finish(status, error)
+                if status not in COMPLETED_STATUSES:
+                    failed = True
+
+            if failed and running:
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+                for name in running.values():
+                    steps[name].finish(CANCELLED)
+                running.clear()
+    finally:
+        # Also reached when the pipeline itself is cancelled
+        for task in running:
+            task.cancel()
+
+    for step in steps.values():
+        if step.status == PENDING:
+            step.finish(SKIPPED)
+    state["status"] = FAILED if failed else SUCCESS
+    state["finished_at"] = _now()
+    state["duration_seconds"] = round(time.perf_counter() - started, 3)
+    await publish()
+    return state
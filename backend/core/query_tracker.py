@@ -0,0 +1,108 @@
+"""Per-request SQL statement tracking, N+1 detection and query budgets.
+
+``track_queries()`` starts collecting statistics for the current context;
+every statement executed on an instrumented engine (see ``core.db_metrics``)
+while it is active is counted, timed and grouped by shape. A statement
+shape repeated ``N_PLUS_ONE_THRESHOLD`` times is reported as a likely N+1.
+"""
+
+import os
+import re
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Callable, TypeVar
+
+# Executions of one statement shape in a request reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_PLACEHOLDER = r"(?:\?|\$\d+|%\([^)]+\)s|%s)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_POSITIONAL = re.compile(r"\$\d+")
+_NUMBER = re.compile(r"\b\d+\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a request issues more statements than its route allows."""
+
+    def __init__(self, route: str, budget: int, count: int):
+        self.route = route
+        self.budget = budget
+        self.count = count
+        super().__init__(f"{route} issued {count} SQL statements, budget is {budget}")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so executions differing only in values match.
+
+    Expanded IN lists collapse to a single placeholder, positional markers
+    and literal numbers are unified and whitespace is squeezed.
+    """
+    shape = _IN_LIST.sub("(?)", statement)
+    shape = _POSITIONAL.sub("?", shape)
+    shape = _NUMBER.sub("N", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """SQL statements issued while tracking was active."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> dict[str, int]:
+        """Get statement shapes executed at least ``threshold`` times."""
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def track_queries() -> QueryStats:
+    """Start collecting statement statistics for the current context."""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def current_query_stats() -> QueryStats | None:
+    """Get the statistics being collected for the current context, if any."""
+    return _current_stats.get()
+
+
+def record_statement(statement: str, duration: float) -> None:
+    """Count a statement against the current context's statistics."""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+def query_budget(max_queries: int) -> Callable[[F], F]:
+    """Limit the number of SQL statements a route may issue per request.
+
+    Usage:
+        @router.get("/projects")
+        @query_budget(5)
+        async def list_projects(...):
+            ...
+    """
+
+    def decorator(func: F) -> F:
+        func.__query_budget__ = max_queries  # type: ignore[attr-defined]
+        return func
+
+    return decorator
+
+
+def route_query_budget(endpoint: Any) -> int | None:
+    """Get the query budget declared on a route endpoint, if any."""
+    return getattr(endpoint, "__query_budget__", None)
@@ -0,0 +1,107 @@
+"""Queue metrics: Celery queue depths from Redis and build queue waits from the database.
+
+These describe the whole deployment rather than one process, so they live
+in ``QUEUE_REGISTRY`` instead of the process-wide registry: they are not
+written to the worker snapshots, and only the worker serving a scrape
+reports them, unlabelled.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from core.metrics import MetricsRegistry
+from database import AsyncSessionLocal
+from repositories.build import BuildRepository
+
+logger = logging.getLogger(__name__)
+
+# Depths are re-read at most this often, however frequently /metrics is scraped
+QUEUE_DEPTH_REFRESH_SECONDS = float(os.getenv("QUEUE_DEPTH_REFRESH_SECONDS", "5"))
+
+# Deployment-wide gauges, refreshed and rendered by the worker serving /metrics
+QUEUE_REGISTRY = MetricsRegistry()
+
+CELERY_QUEUE_LENGTH = QUEUE_REGISTRY.gauge(
+    "celery_queue_length", "Messages waiting in a Celery queue", ("queue",)
+)
+
+BUILD_QUEUE_WAIT_SECONDS = QUEUE_REGISTRY.gauge(
+    "build_queue_wait_seconds", "Age of a tenant's oldest build not started yet", ("tenant",)
+)
+BUILD_QUEUE_WAITING = QUEUE_REGISTRY.gauge(
+    "build_queue_waiting_builds", "Builds of a tenant not started yet", ("tenant",)
+)
+
+_redis_client = None
+_queue_names: list[str] | None = None
+_last_refresh = 0.0
+_last_build_refresh = 0.0
+
+
+def celery_queue_names() -> list[str]:
+    """Get the names of the queues configured in ``celery_app``."""
+    global _queue_names
+    if _queue_names is None:
+        # Imported lazily: loading the Celery app imports every task module
+        from celery_app import app as celery
+
+        _queue_names = [queue.name for queue in celery.conf.task_queues]
+    return _queue_names
+
+
+async def collect_queue_depths() -> None:
+    """Refresh ``celery_queue_length`` with one pipelined LLEN per queue.
+
+    Failures are logged and leave the previous values in place.
+    """
+    global _redis_client, _last_refresh
+    now = time.monotonic()
+    if now - _last_refresh < QUEUE_DEPTH_REFRESH_SECONDS:
+        return
+    _last_refresh = now
+
+    try:
+        if _redis_client is None:
+            import redis.asyncio as redis
+
+            _redis_client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        names = celery_queue_names()
+        async with _redis_client.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.llen(name)
+            lengths = await pipe.execute()
+    except Exception as exc:
+        logger.warning(f"Could not read Celery queue depths: {exc}")
+        return
+    for name, length in zip(names, lengths):
+        CELERY_QUEUE_LENGTH.set(length, queue=name)
+
+
+async def collect_build_queue_waits() -> None:
+    """Refresh the per-tenant build queue gauges with one aggregate query.
+
+    Only tenants with waiting builds are reported. Failures are logged and
+    leave the previous values in place.
+    """
+    global _last_build_refresh
+    now = time.monotonic()
+    if now - _last_build_refresh < QUEUE_DEPTH_REFRESH_SECONDS:
+        return
+    _last_build_refresh = now
+
+    try:
+        async with AsyncSessionLocal() as session:
+            stats = await BuildRepository(session).queue_stats_by_tenant()
+    except Exception as exc:
+        logger.warning(f"Could not read build queue waits: {exc}")
+        return
+    current = datetime.now(timezone.utc)
+    BUILD_QUEUE_WAIT_SECONDS.clear()
+    BUILD_QUEUE_WAITING.clear()
+    for tenant_id, (count, oldest) in stats.items():
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        BUILD_QUEUE_WAIT_SECONDS.set(max(0.0, (current - oldest).total_seconds()), tenant=tenant_id)
+        BUILD_QUEUE_WAITING.set(count, tenant=tenant_id)
@@ -0,0 +1,91 @@
+"""Fast JSON serialization for API responses.
+
+List pages skip per-item model construction: repositories project the
+requested columns to plain dicts, a cached ``TypeAdapter`` validates the
+whole page in one call and encodes it to JSON bytes in pydantic-core, and
+only the small page envelope goes through orjson.
+"""
+
+from functools import lru_cache
+from typing import Any, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter, create_model
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode ``content`` as JSON with orjson; models and unknown types are handled."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(value: str | None, schema: type[BaseModel]) -> tuple[str, ...] | None:
+    """Parse a ``fields=a,b`` sparse fieldset against the fields of ``schema``.
+
+    ``id`` is always included. Returns None when no fieldset was given.
+
+    Raises:
+        ValueError: If a field is not part of the schema
+    """
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id", *names]))
+
+
+def parse_sort(sort_by: str, sort_order: str, schema: type[BaseModel]) -> tuple[str, str]:
+    """Check a sort column against the fields of ``schema`` and the sort order.
+
+    Raises:
+        ValueError: If the column is not part of the schema or the order is
+            not ``asc`` or ``desc``
+    """
+    if sort_by not in schema.model_fields:
+        raise ValueError(f"Cannot sort by {sort_by}")
+    if sort_order.lower() not in ("asc", "desc"):
+        raise ValueError("sort_order must be asc or desc")
+    return sort_by, sort_order.lower()
+
+
+@lru_cache(maxsize=256)
+def list_adapter(schema: type[BaseModel], fields: tuple[str, ...] | None = None) -> TypeAdapter:
+    """Get a cached ``TypeAdapter`` for a list of ``schema``, limited to ``fields``."""
+    if fields is not None:
+        definitions = {
+            name: (schema.model_fields[name].annotation, schema.model_fields[name])
+            for name in fields
+        }
+        schema = create_model(
+            f"{schema.__name__}Fields", __config__=schema.model_config, **definitions
+        )
+    return TypeAdapter(list[schema])
+
+
+def encode_page(adapter: TypeAdapter, rows: Sequence[Any], **meta: Any) -> bytes:
+    """Validate and encode a page as ``{"items": [...], **meta}``.
+
+    ``rows`` may be projected dicts or ORM objects (the schemas read
+    attributes). The items are encoded by pydantic-core in one pass and
+    spliced into the orjson-encoded envelope.
+    """
+    items = adapter.dump_json(adapter.validate_python(rows))
+    envelope = dumps(meta)
+    if len(envelope) == 2:
+        return b'{"items":' + items + b"}"
+    return b'{"items":' + items + b"," + envelope[1:]
@@ -0,0 +1,98 @@
+"""Startup phase timing and deferred router loading."""
+
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+STARTUP_PHASE_SECONDS = REGISTRY.gauge(
+    "startup_phase_seconds", "Time spent in each process startup phase", ("phase",)
+)
+
+
+class StartupTimer:
+    """Record how long each startup phase takes.
+
+    Phases are reported in the order they ran, exported as the
+    ``startup_phase_seconds`` gauge and logged by ``report()``.
+    """
+
+    def __init__(self, started_at: float | None = None):
+        # perf_counter() value the process counts as its start, for "total"
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.phases: dict[str, float] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = seconds
+        STARTUP_PHASE_SECONDS.set(seconds, phase=name)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the body of the ``with`` block as phase ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self) -> dict[str, float]:
+        """Log the phase timings and get them in milliseconds, with the total."""
+        total = time.perf_counter() - self.started_at
+        STARTUP_PHASE_SECONDS.set(total, phase="total")
+        timings = {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()}
+        timings["total"] = round(total * 1000, 1)
+        phases = ", ".join(f"{name}={ms} ms" for name, ms in timings.items() if name != "total")
+        logger.info(f"Startup finished in {timings['total']} ms ({phases})")
+        return timings
+
+
+class DeferredRouters:
+    """Routers whose modules are imported on first use instead of at boot.
+
+    Routers are registered as ``"module:attribute"`` strings. They are
+    loaded by ``load()`` (normally right after startup, off the critical
+    path) or, at the latest, by the first request no loaded route matched,
+    which is then dispatched again. The OpenAPI schema is rebuilt once they
+    are included.
+    """
+
+    def __init__(self, app: Any, timer: StartupTimer | None = None):
+        self.app = app
+        self.timer = timer
+        self._pending: list[tuple[str, dict[str, Any]]] = []
+        self._not_found = app.router.default
+        app.router.default = self._dispatch
+
+    def add(self, import_path: str, **include_options: Any) -> None:
+        """Register ``"module:attribute"`` to be included with ``include_options``."""
+        self._pending.append((import_path, include_options))
+
+    @property
+    def loaded(self) -> bool:
+        return not self._pending
+
+    def load(self) -> None:
+        """Import and include every pending router."""
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        pending, self._pending = self._pending, []
+        for import_path, include_options in pending:
+            module_name, _, attribute = import_path.partition(":")
+            router = getattr(importlib.import_module(module_name), attribute)
+            self.app.include_router(router, **include_options)
+        self.app.openapi_schema = None
+        if self.timer is not None:
+            self.timer.record("deferred_routers", time.perf_counter() - start)
+
+    async def _dispatch(self, scope: dict, receive: Any, send: Any) -> None:
+        if self._pending:
+            self.load()
+            await self.app.router(scope, receive, send)
+            return
+        await self._not_found(scope, receive, send)
@@ -0,0 +1,8 @@
+"""Process start time for the "imports" startup phase.
+
+Imported first by ``main`` so the phase covers every import after it.
+"""
+
+import time
+
+IMPORTS_STARTED = time.perf_counter()
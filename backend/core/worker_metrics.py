@@ -0,0 +1,121 @@
+"""Metrics shared between the API worker processes started by ``serve.py``.
+
+Every worker keeps its own in-process registry and writes a snapshot of it
+to ``METRICS_DIR/worker-<pid>.json`` every ``METRICS_WRITE_INTERVAL``
+seconds. The worker that serves a scrape merges all files, so ``/metrics``
+reports the whole server whichever worker answers. When a worker exits,
+the supervisor folds its counters and histograms into ``retired.json`` so
+totals never go backwards.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+from core.metrics import REGISTRY, MetricsRegistry, merge_snapshots
+
+logger = logging.getLogger(__name__)
+
+METRICS_WRITE_INTERVAL = float(os.getenv("METRICS_WRITE_INTERVAL", "5"))
+
+RETIRED_FILE = "retired.json"
+
+
+def metrics_dir() -> str | None:
+    """Get the shared metrics directory, set by serve.py for its workers.
+
+    Read on every call rather than at import, since the supervisor imports
+    this module before it sets the variable and forks.
+    """
+    return os.getenv("METRICS_DIR")
+
+
+def _worker_path(directory: str, pid: int) -> Path:
+    return Path(directory) / f"worker-{pid}.json"
+
+
+def _write_json(path: Path, data: Any) -> None:
+    # Write then rename, so readers never see a partial snapshot
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> Any:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def write_worker_snapshot(directory: str, registry: MetricsRegistry = REGISTRY) -> None:
+    """Write this process's metrics to its file in ``directory``."""
+    _write_json(_worker_path(directory, os.getpid()), registry.snapshot())
+
+
+def aggregate(directory: str, registry: MetricsRegistry = REGISTRY) -> dict[str, Any]:
+    """Merge the metrics of every live and retired worker in ``directory``.
+
+    This process's own snapshot is written first, so it is always current.
+    """
+    write_worker_snapshot(directory, registry)
+    snapshots = {}
+    for path in sorted(Path(directory).glob("worker-*.json")):
+        snapshot = _read_json(path)
+        if snapshot is not None:
+            snapshots[path.stem.removeprefix("worker-")] = snapshot
+    retired = _read_json(Path(directory) / RETIRED_FILE)
+    if retired is not None:
+        snapshots["retired"] = retired
+    return merge_snapshots(snapshots)
+
+
+def retire_worker(directory: str, pid: int) -> None:
+    """Fold an exited worker's counters and histograms into ``retired.json``.
+
+    Its gauges described a process that no longer exists and are dropped.
+    """
+    path = _worker_path(directory, pid)
+    snapshot = _read_json(path)
+    if snapshot is not None:
+        retired_path = Path(directory) / RETIRED_FILE
+        retired = _read_json(retired_path) or {}
+        _write_json(
+            retired_path, merge_snapshots({"retired": retired, str(pid): snapshot}, gauges=False)
+        )
+    path.unlink(missing_ok=True)
+
+
+async def _write_periodically(directory: str) -> None:
+    while True:
+        await asyncio.sleep(METRICS_WRITE_INTERVAL)
+        try:
+            write_worker_snapshot(directory)
+        except OSError as exc:
+            logger.warning(f"Could not write worker metrics: {exc}")
+
+
+_writer: asyncio.Task | None = None
+
+
+def start_metrics_writer() -> None:
+    """Start writing this worker's snapshot periodically, if ``METRICS_DIR`` is set."""
+    global _writer
+    directory = metrics_dir()
+    if directory is None or _writer is not None:
+        return
+    write_worker_snapshot(directory)
+    _writer = asyncio.create_task(_write_periodically(directory))
+
+
+def stop_metrics_writer() -> None:
+    """Stop the periodic writer after writing a final snapshot."""
+    global _writer
+    if _writer is None:
+        return
+    _writer.cancel()
+    _writer = None
+    write_worker_snapshot(metrics_dir())
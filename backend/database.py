@@ -2,16 +2,44 @@
 Database configuration and session management for async SQLAlchemy 2.0
 """
 
+import asyncio
+import hashlib
+import itertools
+import logging
 import os
-from typing import AsyncGenerator
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator
 
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    delete,
+    event,
+    func,
+    insert,
+    select,
+    text,
+)
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     create_async_engine,
     async_sessionmaker,
 )
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.util import find_tables
+
+from core.db_metrics import InstrumentedAsyncPool, instrument_engine
+
+logger = logging.getLogger(__name__)
 
 # Database URL from environment or default
 DATABASE_URL = os.getenv(
@@ -28,12 +56,233 @@ engine = create_async_engine(
     max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "30")),
     pool_pre_ping=True,  # Test connections before using them
     pool_recycle=3600,  # Recycle connections after 1 hour
+    poolclass=InstrumentedAsyncPool,  # Checkout latency metrics
+    pool_logging_name="primary",
 )
+instrument_engine(engine, "primary")
+
+# Optional read replicas, as a comma-separated list of URLs
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+# Replicas lagging further behind the primary than this are not read from
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", "5"))
+# Tables written by this process, and everything by a client that wrote (see
+# ClientWrites), are read from the primary for this long
+READ_YOUR_WRITES_WINDOW = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", str(REPLICA_MAX_LAG)))
+
+# session.info flag routing every statement of a session to the primary
+USE_PRIMARY_KEY = "use_primary"
+# session.info keys for the replica a session reads from and the tables it wrote
+REPLICA_KEY = "replica"
+WRITTEN_TABLES_KEY = "written_tables"
+
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    """A read replica engine and its last measured replication lag."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        # Unknown until the first lag check; unusable until then
+        self.lag: float | None = None
+
+    @property
+    def available(self) -> bool:
+        return self.lag is not None and self.lag <= REPLICA_MAX_LAG
+
+
+replicas = [
+    Replica(
+        create_async_engine(
+            url,
+            echo=os.getenv("SQL_ECHO", "false").lower() == "true",
+            future=True,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "30")),
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            poolclass=InstrumentedAsyncPool,
+            pool_logging_name=f"replica{number}",
+        )
+    )
+    for number, url in enumerate(DATABASE_REPLICA_URLS)
+]
+for number, replica in enumerate(replicas):
+    instrument_engine(replica.engine, f"replica{number}")
+_replica_cycle = itertools.cycle(replicas)
+
+# Table name -> monotonic time of this process's last committed write to it
+_recent_writes: dict[str, float] = {}
+
+
+class ClientWrites:
+    """Read-your-writes state of the client making the current request.
+
+    ``_recent_writes`` only covers this process, and a client's next request
+    may go to another worker. So a request that commits a write tells the
+    client until when to read from the primary, which it sends back with
+    later requests (see ``middleware.read_your_writes``).
+    """
+
+    def __init__(self, pinned_until: float = 0.0):
+        # Wall-clock time until which the client's reads use the primary
+        self.pinned_until = pinned_until
+        self.wrote = False
+
+    @property
+    def pinned(self) -> bool:
+        return self.pinned_until > time.time()
+
+
+client_writes: ContextVar[ClientWrites | None] = ContextVar("client_writes", default=None)
+
+
+class RoutingSession(Session):
+    """Session sending reads to a replica and everything else to the primary.
+
+    A SELECT goes to a replica unless it locks rows, the session has written
+    or was pinned with ``use_primary()``, the client wrote within
+    ``READ_YOUR_WRITES_WINDOW`` (``ClientWrites``), or it reads a table this
+    process wrote within that window. Each session reads from a
+    single replica, and falls back to the primary when no replica is within
+    ``REPLICA_MAX_LAG``.
+    """
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if not replicas or kw.get("bind") is not None:
+            return super().get_bind(mapper, clause=clause, **kw)
+        if self._flushing or getattr(clause, "is_dml", False):
+            # INSERT/UPDATE/DELETE, also when wrapped in select().from_statement()
+            dml = getattr(clause, "element", clause)
+            if isinstance(dml, UpdateBase):
+                self.info.setdefault(WRITTEN_TABLES_KEY, set()).add(dml.table.name)
+            self.info[USE_PRIMARY_KEY] = True
+            return engine.sync_engine
+        if (
+            not getattr(clause, "is_select", False)
+            or self.info.get(USE_PRIMARY_KEY)
+            or getattr(clause, "_for_update_arg", None) is not None
+            or self._client_wrote_recently()
+            or self._reads_recent_write(clause)
+        ):
+            return engine.sync_engine
+        replica = self._replica()
+        return replica.engine.sync_engine if replica is not None else engine.sync_engine
+
+    def _replica(self) -> Replica | None:
+        """Get this session's replica, picking the next available one first."""
+        replica = self.info.get(REPLICA_KEY)
+        if replica is not None and replica.available:
+            return replica
+        for _ in range(len(replicas)):
+            replica = next(_replica_cycle)
+            if replica.available:
+                self.info[REPLICA_KEY] = replica
+                return replica
+        return None
+
+    def _client_wrote_recently(self) -> bool:
+        state = client_writes.get()
+        return state is not None and state.pinned
+
+    def _reads_recent_write(self, clause: Any) -> bool:
+        """Check whether a statement reads a table written in the window."""
+        if not _recent_writes:
+            return False
+        horizon = time.monotonic() - READ_YOUR_WRITES_WINDOW
+        return any(
+            _recent_writes.get(getattr(table, "name", None), 0) > horizon
+            for table in find_tables(clause, include_joins=True, include_aliases=True)
+        )
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_flushed_tables(session: Session, flush_context: Any) -> None:
+    tables = session.info.setdefault(WRITTEN_TABLES_KEY, set())
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        tables.add(obj.__table__.name)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_committed_writes(session: Session) -> None:
+    tables = session.info.pop(WRITTEN_TABLES_KEY, None)
+    if tables:
+        now = time.monotonic()
+        for table in tables:
+            _recent_writes[table] = now
+        state = client_writes.get()
+        if state is not None:
+            state.wrote = True
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_written_tables(session: Session) -> None:
+    session.info.pop(WRITTEN_TABLES_KEY, None)
+
+
+def use_primary(session: AsyncSession) -> None:
+    """Route all further statements of ``session`` to the primary."""
+    session.info[USE_PRIMARY_KEY] = True
+
+
+async def check_replica_lag() -> None:
+    """Measure the replication lag of every replica.
+
+    A replica that cannot be reached is marked unavailable until a later
+    check succeeds.
+    """
+    for replica in replicas:
+        try:
+            async with replica.engine.connect() as conn:
+                result = await conn.execute(REPLICA_LAG_QUERY)
+                replica.lag = float(result.scalar() or 0)
+        except Exception as exc:
+            logger.warning(f"Replica {replica.engine.url!r} unavailable: {exc}")
+            replica.lag = None
+
+
+async def _monitor_replica_lag() -> None:
+    while True:
+        await asyncio.sleep(REPLICA_LAG_CHECK_INTERVAL)
+        await check_replica_lag()
+
+
+_replica_monitor: asyncio.Task | None = None
+
+
+async def start_replica_monitor() -> None:
+    """Check replica lag now and then periodically in the background."""
+    global _replica_monitor
+    if not replicas or _replica_monitor is not None:
+        return
+    await check_replica_lag()
+    _replica_monitor = asyncio.create_task(_monitor_replica_lag())
+
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False,
+)
+
+# Celery tasks run each invocation in a fresh event loop, so they must not
+# reuse pooled connections bound to a previous loop
+task_engine = create_async_engine(DATABASE_URL, future=True, poolclass=NullPool)
+instrument_engine(task_engine, "task")
+
+TaskSessionLocal = async_sessionmaker(
+    task_engine,
+    class_=AsyncSession,
     expire_on_commit=False,
     autoflush=False,
     autocommit=False,
@@ -42,29 +291,108 @@ AsyncSessionLocal = async_sessionmaker(
 # Base class for all models
 Base = declarative_base()
 
+# How init_db() treats the schema at startup:
+#   check      - create tables only when the stored schema version differs
+#                from the models (one SELECT when it matches)
+#   create_all - always run create_all
+#   skip       - no schema work (migrations are run separately)
+DB_STARTUP_MODE = os.getenv("DB_STARTUP_MODE", "check")
+
+# Fingerprint of the models the tables were last created from; one row
+schema_version_table = Table(
+    "schema_version",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("version", String(64), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+# session.info flag enabling batched get_by_id lookups (see repositories.loader)
+BATCH_LOADING_KEY = "batch_loading"
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency for FastAPI to get database session.
 
+    Repository lookups by id on this session are batched per event-loop
+    tick and memoized for the request (see ``repositories.loader``).
+
     Usage:
         @app.get("/items")
         async def get_items(db: AsyncSession = Depends(get_db)):
             ...
     """
     async with AsyncSessionLocal() as session:
+        session.info[BATCH_LOADING_KEY] = True
         try:
             yield session
         finally:
             await session.close()
 
 
-async def init_db() -> None:
-    """Initialize database tables."""
+def schema_version(metadata: MetaData | None = None) -> str:
+    """Fingerprint the tables, columns, indexes and foreign keys of the models."""
+    metadata = metadata if metadata is not None else Base.metadata
+    parts = []
+    for table in metadata.sorted_tables:
+        if table.name == schema_version_table.name:
+            continue
+        parts.append(f"table {table.name}")
+        for column in table.columns:
+            parts.append(
+                f"column {column.name} {column.type!r} "
+                f"nullable={column.nullable} primary_key={column.primary_key}"
+            )
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            columns = ",".join(column.name for column in index.columns)
+            parts.append(f"index {index.name} ({columns}) unique={index.unique}")
+        for fk in sorted(table.foreign_keys, key=lambda fk: fk.target_fullname):
+            parts.append(f"fk {fk.parent.name} -> {fk.target_fullname} ondelete={fk.ondelete}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+async def get_stored_schema_version() -> str | None:
+    """Read the stored schema version, or None if it was never recorded."""
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(schema_version_table.c.version).limit(1))
+            return result.scalar_one_or_none()
+    except DBAPIError:
+        # No schema_version table yet
+        return None
+
+
+async def init_db() -> str:
+    """
+    Initialize database tables according to ``DB_STARTUP_MODE``.
+
+    Returns:
+        What was done: "created" or "skipped"
+    """
+    import models  # noqa: F401  (registers every table on Base.metadata)
+
+    if DB_STARTUP_MODE == "skip":
+        return "skipped"
+
+    version = schema_version()
+    if DB_STARTUP_MODE != "create_all" and await get_stored_schema_version() == version:
+        return "skipped"
+
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(schema_version_table))
+        await conn.execute(insert(schema_version_table).values(id=1, version=version))
+    logger.info(f"Database schema created for version {version[:12]}")
+    return "created"
 
 
 async def close_db() -> None:
     """Close database connections."""
+    global _replica_monitor
+    if _replica_monitor is not None:
+        _replica_monitor.cancel()
+        _replica_monitor = None
+    for replica in replicas:
+        await replica.engine.dispose()
     await engine.dispose()
@@ -2,23 +2,60 @@
 Railway PaaS Clone - FastAPI Application Entry Point
 """
 
+# Start of the "imports" startup phase, so must stay the first import
+from core.startup_clock import IMPORTS_STARTED
+
+import asyncio
+import os
+import time
+
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 
 from backend.config import settings
-from backend.database import init_db, close_db
 from backend.api import auth_router
 from backend.middleware.exception_handlers import add_exception_handlers
+from core.cache import get_entity_cache
+from core.db_metrics import db_metrics_snapshot
+from core.metrics import REGISTRY, render_snapshot
+from core.queue_metrics import QUEUE_REGISTRY, collect_build_queue_waits, collect_queue_depths
+from core.startup import DeferredRouters, StartupTimer
+from core.worker_metrics import (
+    aggregate as aggregate_worker_metrics,
+    metrics_dir,
+    start_metrics_writer,
+    stop_metrics_writer,
+)
+from database import close_db, init_db, start_replica_monitor
+from middleware.metrics import MetricsMiddleware
+from middleware.query_tracking import QueryTrackingMiddleware
+from middleware.read_your_writes import ReadYourWritesMiddleware
+from api.build_logs import router as build_logs_router
+from api.projects import router as projects_router
+from api.webhooks import router as webhooks_router
+
+startup_timer = StartupTimer(started_at=IMPORTS_STARTED)
+startup_timer.record("imports", time.perf_counter() - IMPORTS_STARTED)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
     # Startup
-    await init_db()
+    with startup_timer.phase("init_db"):
+        app.state.schema = await init_db()
+    with startup_timer.phase("replica_monitor"):
+        await start_replica_monitor()
+    app.state.startup_timings = startup_timer.report()
+    # Import rarely used routers once the loop is serving, not before
+    asyncio.get_running_loop().call_soon(deferred_routers.load)
+    # Share metrics with the other workers when started by serve.py
+    start_metrics_writer()
     yield
     # Shutdown
+    stop_metrics_writer()
     await close_db()
 
 
@@ -41,6 +78,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Count SQL statements per request; X-DB-* headers in development,
+# query budget violations fail the request when enforced (tests)
+app.add_middleware(
+    QueryTrackingMiddleware,
+    emit_headers=os.getenv("ENVIRONMENT", "development") == "development",
+    enforce_budgets=os.getenv("QUERY_BUDGET_ENFORCE", "false").lower() == "true",
+)
+
+# Reads go to the primary for a while after the client wrote, on any worker
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Request latency, in-flight and response size metrics (outermost, so it
+# times the whole middleware stack)
+app.add_middleware(MetricsMiddleware)
+
 # Add exception handlers
 add_exception_handlers(app)
 
@@ -66,6 +118,47 @@ async def health_check():
     }
 
 
+@app.get("/health/cache", tags=["health"])
+async def cache_stats():
+    """Entity cache hit, miss and eviction counters"""
+    cache = get_entity_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/health/db", tags=["health"])
+async def db_metrics():
+    """Connection pool, statement timing and slow query metrics"""
+    return db_metrics_snapshot()
+
+
+@app.get("/health/startup", tags=["health"])
+async def startup_report():
+    """Startup phase timings (ms) and what init_db did with the schema"""
+    return {
+        "schema": getattr(app.state, "schema", None),
+        "phases": getattr(app.state, "startup_timings", {}),
+        "deferred_routers_loaded": deferred_routers.loaded,
+    }
+
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics"""
+    await collect_queue_depths()
+    await collect_build_queue_waits()
+    shared_dir = metrics_dir()
+    if shared_dir is not None:
+        # Behind serve.py: report every worker, not just the one scraped
+        snapshot = aggregate_worker_metrics(shared_dir)
+    else:
+        snapshot = REGISTRY.snapshot()
+    # Queue gauges describe the deployment, so they are reported once
+    body = render_snapshot({**snapshot, **QUEUE_REGISTRY.snapshot()})
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/hello", tags=["health"])
 async def hello():
     """Hello world endpoint"""
@@ -87,9 +180,17 @@ async def version():
 
 # Include API routers
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
+app.include_router(build_logs_router, tags=["builds"])
+app.include_router(projects_router, tags=["projects"])
+app.include_router(webhooks_router, tags=["webhooks"])
+
+# Rarely used routers, imported after startup or on the first request for them
+deferred_routers = DeferredRouters(app, startup_timer)
+deferred_routers.add("api.exports:router", tags=["exports"])
 
 
 if __name__ == "__main__":
+    # Single process, for development; production runs serve.py
     import uvicorn
 
     uvicorn.run(
@@ -0,0 +1,66 @@
+"""
+HTTP request metrics middleware.
+"""
+
+import time
+from typing import Any
+
+from core.metrics import REGISTRY
+
+# Route label for requests that matched no route, keeping label cardinality bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response body is sent",
+    ("method", "route", "status"),
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+RESPONSE_BYTES = REGISTRY.histogram(
+    "http_response_size_bytes",
+    "HTTP response body size",
+    ("method", "route"),
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+
+
+class MetricsMiddleware:
+    """Record latency, in-flight count and response size for HTTP requests.
+
+    Requests are labelled by route template rather than path, so metric
+    cardinality does not grow with ids in URLs.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message: dict) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method = scope.get("method", "")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method=method, route=route, status=status
+            )
+            RESPONSE_BYTES.observe(size, method=method, route=route)
@@ -0,0 +1,74 @@
+"""
+Per-request SQL query tracking middleware.
+"""
+
+import logging
+from typing import Any
+
+from core.query_tracker import (
+    QueryBudgetExceeded,
+    QueryStats,
+    route_query_budget,
+    track_queries,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTrackingMiddleware:
+    """Count SQL statements and database time for every HTTP request.
+
+    Repeated statement shapes (likely N+1 queries) are logged. Routes
+    decorated with ``query_budget`` are checked when the response starts:
+    with ``enforce_budgets`` the request fails with ``QueryBudgetExceeded``
+    (used in tests), otherwise a warning is logged. With ``emit_headers``
+    the statistics are returned as ``X-DB-*`` response headers.
+    """
+
+    def __init__(self, app: Any, emit_headers: bool = False, enforce_budgets: bool = False):
+        self.app = app
+        self.emit_headers = emit_headers
+        self.enforce_budgets = enforce_budgets
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = track_queries()
+
+        async def send_with_stats(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                self._check_budget(scope, stats)
+                if self.emit_headers:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + self._headers(stats)
+            await send(message)
+
+        await self.app(scope, receive, send_with_stats)
+        self._report_repeated(scope, stats)
+
+    def _route(self, scope: dict) -> str:
+        route = scope.get("route")
+        path = getattr(route, "path", scope.get("path", ""))
+        return f"{scope.get('method', '')} {path}"
+
+    def _check_budget(self, scope: dict, stats: QueryStats) -> None:
+        budget = route_query_budget(scope.get("endpoint"))
+        if budget is None or stats.count <= budget:
+            return
+        error = QueryBudgetExceeded(self._route(scope), budget, stats.count)
+        if self.enforce_budgets:
+            raise error
+        logger.warning(str(error))
+
+    def _report_repeated(self, scope: dict, stats: QueryStats) -> None:
+        for shape, count in stats.repeated_shapes().items():
+            logger.warning(f"Possible N+1 in {self._route(scope)}: {count} x {shape}")
+
+    def _headers(self, stats: QueryStats) -> list[tuple[bytes, bytes]]:
+        return [
+            (b"x-db-query-count", str(stats.count).encode()),
+            (b"x-db-time-ms", f"{stats.duration * 1000:.1f}".encode()),
+            (b"x-db-repeated-queries", str(len(stats.repeated_shapes())).encode()),
+        ]
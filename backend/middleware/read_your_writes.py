@@ -0,0 +1,67 @@
+"""
+Read-your-writes across worker processes.
+"""
+
+import math
+import time
+from http.cookies import CookieError, SimpleCookie
+from typing import Any
+
+from database import READ_YOUR_WRITES_WINDOW, ClientWrites, client_writes
+
+COOKIE_NAME = "db_primary_until"
+
+
+class ReadYourWritesMiddleware:
+    """Send a client's reads to the primary for a while after it wrote.
+
+    When a request commits a write, the response sets a cookie holding the
+    time until which the client's reads should use the primary. Later
+    requests carrying it are routed there by ``database.RoutingSession``,
+    whichever worker serves them, so a client never reads a replica older
+    than its own write. A client can only pin its own reads, and no longer
+    than ``READ_YOUR_WRITES_WINDOW`` from the request.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = ClientWrites(self._pinned_until(scope))
+        token = client_writes.set(state)
+
+        async def send_with_cookie(message: dict) -> None:
+            if message["type"] == "http.response.start" and state.wrote:
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [self._cookie()]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            client_writes.reset(token)
+
+    def _pinned_until(self, scope: dict) -> float:
+        for name, value in scope.get("headers", []):
+            if name != b"cookie":
+                continue
+            try:
+                morsel = SimpleCookie(value.decode("latin-1")).get(COOKIE_NAME)
+                until = float(morsel.value) if morsel is not None else 0.0
+            except (CookieError, ValueError):
+                continue
+            if math.isfinite(until):
+                return min(until, time.time() + READ_YOUR_WRITES_WINDOW)
+        return 0.0
+
+    def _cookie(self) -> tuple[bytes, bytes]:
+        until = time.time() + READ_YOUR_WRITES_WINDOW
+        value = (
+            f"{COOKIE_NAME}={until:.3f}; Max-Age={math.ceil(READ_YOUR_WRITES_WINDOW)}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        )
+        return (b"set-cookie", value.encode())
@@ -11,6 +11,7 @@ from models.base import (
     generate_uuid,
 )
 from models.build import Build
+from models.build_log import BuildLogArchive, BuildLogChunk
 from models.environment_variable import EnvironmentVariable
 from models.project import Project
 from models.service import Service
@@ -33,6 +34,8 @@ __all__ = [
     "WebhookProvider",
     # Models
     "Build",
+    "BuildLogArchive",
+    "BuildLogChunk",
     "EnvironmentVariable",
     "Project",
     "Service",
@@ -64,9 +64,12 @@ class BuildStatus(str, enum.Enum):
     """Build status."""
 
     PENDING = "pending"
+    # Handed to a build worker by the scheduler, not started yet
+    QUEUED = "queued"
     BUILDING = "building"
     SUCCESS = "success"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 class WebhookProvider(str, enum.Enum):
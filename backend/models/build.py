@@ -16,6 +16,11 @@ if TYPE_CHECKING:
     from models.service import Service
 
 
+# Large text columns are deferred into this group; load them explicitly with
+# ``undefer_group(BUILD_DETAILS_GROUP)`` (see ``BuildRepository.get_with_details``).
+BUILD_DETAILS_GROUP = "details"
+
+
 class Build(Base, UUIDPrimaryKeyMixin, TimestampMixin):
     """Build model."""
 
@@ -28,13 +33,33 @@ class Build(Base, UUIDPrimaryKeyMixin, TimestampMixin):
         String(20), default=BuildStatus.PENDING, nullable=False
     )
     commit_sha: Mapped[str | None] = mapped_column(String(40), nullable=True)
-    commit_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Branch the commit was pushed to; newer pushes supersede pending builds
+    git_branch: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    commit_message: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+        deferred=True,
+        deferred_group=BUILD_DETAILS_GROUP,
+        deferred_raiseload=True,
+    )
     image_tag: Mapped[str | None] = mapped_column(String(255), nullable=True)
-    logs: Mapped[str | None] = mapped_column(Text, nullable=True)
+    logs: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+        deferred=True,
+        deferred_group=BUILD_DETAILS_GROUP,
+        deferred_raiseload=True,
+    )
     started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     duration_seconds: Mapped[int | None] = mapped_column(Integer, nullable=True)
-    build_metadata: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    build_metadata: Mapped[dict | None] = mapped_column(
+        JSON,
+        nullable=True,
+        deferred=True,
+        deferred_group=BUILD_DETAILS_GROUP,
+        deferred_raiseload=True,
+    )
 
     # Relationships
     service: Mapped["Service"] = relationship("Service", back_populates="builds")
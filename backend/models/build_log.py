@@ -0,0 +1,65 @@
+"""Build log chunk and archive models."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+from models.base import TimestampMixin, UUIDPrimaryKeyMixin
+
+
+class BuildLogChunk(Base, UUIDPrimaryKeyMixin):
+    """One appended piece of a build's output.
+
+    Chunks are append-only and numbered per build by ``seq``. ``start_offset``
+    and ``end_offset`` are character positions in the concatenated log, so a
+    reader can resume from any offset without loading earlier chunks.
+    """
+
+    __tablename__ = "build_log_chunks"
+    __table_args__ = (
+        Index("ix_build_log_chunks_build_seq", "build_id", "seq", unique=True),
+        Index("ix_build_log_chunks_build_end_offset", "build_id", "end_offset"),
+    )
+
+    build_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("builds.id", ondelete="CASCADE"), nullable=False
+    )
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    start_offset: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    end_offset: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<BuildLogChunk(build_id={self.build_id}, seq={self.seq})>"
+
+
+class BuildLogArchive(Base, UUIDPrimaryKeyMixin, TimestampMixin):
+    """A finished build's log, moved compressed into cold storage.
+
+    ``block_index`` locates the independently compressed line blocks inside
+    the archive (see ``core.log_archive``).
+    """
+
+    __tablename__ = "build_log_archives"
+
+    build_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("builds.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    storage_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    original_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    compressed_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    line_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    block_index: Mapped[list] = mapped_column(JSON, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<BuildLogArchive(build_id={self.build_id}, key={self.storage_key})>"
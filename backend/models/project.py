@@ -28,8 +28,13 @@ class Project(Base, UUIDPrimaryKeyMixin, TimestampMixin):
 
     # Relationships
     tenant: Mapped["Tenant"] = relationship("Tenant", back_populates="projects")
+    # Collections are loaded per call through repository load profiles
     services: Mapped[list["Service"]] = relationship(
-        "Service", back_populates="project", lazy="selectin", cascade="all, delete-orphan"
+        "Service",
+        back_populates="project",
+        lazy="raise",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self) -> str:
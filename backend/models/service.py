@@ -39,17 +39,34 @@ class Service(Base, UUIDPrimaryKeyMixin, TimestampMixin):
     port: Mapped[int | None] = mapped_column(Integer, nullable=True)
     domain: Mapped[str | None] = mapped_column(String(255), nullable=True)
     image: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    # Consecutive failed health checks, see tasks.monitor
+    health_check_failures: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
 
     # Relationships
     project: Mapped["Project"] = relationship("Project", back_populates="services")
+    # Collections are loaded per call through repository load profiles
     builds: Mapped[list["Build"]] = relationship(
-        "Build", back_populates="service", lazy="selectin", cascade="all, delete-orphan"
+        "Build",
+        back_populates="service",
+        lazy="raise",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     environment_variables: Mapped[list["EnvironmentVariable"]] = relationship(
-        "EnvironmentVariable", back_populates="service", lazy="selectin", cascade="all, delete-orphan"
+        "EnvironmentVariable",
+        back_populates="service",
+        lazy="raise",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     webhooks: Mapped[list["Webhook"]] = relationship(
-        "Webhook", back_populates="service", lazy="selectin", cascade="all, delete-orphan"
+        "Webhook",
+        back_populates="service",
+        lazy="raise",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self) -> str:
@@ -23,8 +23,13 @@ class Team(Base, UUIDPrimaryKeyMixin, TimestampMixin):
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     # Relationships
+    # Collections are loaded per call through repository load profiles
     members: Mapped[list["TeamMember"]] = relationship(
-        "TeamMember", back_populates="team", lazy="selectin", cascade="all, delete-orphan"
+        "TeamMember",
+        back_populates="team",
+        lazy="raise",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self) -> str:
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String, Text
+from sqlalchemy import Float, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -23,13 +23,20 @@ class Tenant(Base, UUIDPrimaryKeyMixin, TimestampMixin):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     slug: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Share of build capacity relative to other tenants, see core.build_scheduler
+    build_weight: Mapped[float] = mapped_column(
+        Float, default=1.0, server_default="1", nullable=False
+    )
+    # Builds running at once; None uses BUILD_TENANT_MAX_CONCURRENT
+    max_concurrent_builds: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     # Relationships
+    # Collections are loaded per call through repository load profiles
     users: Mapped[list["User"]] = relationship(
-        "User", back_populates="tenant", lazy="selectin"
+        "User", back_populates="tenant", lazy="raise", passive_deletes=True
     )
     projects: Mapped[list["Project"]] = relationship(
-        "Project", back_populates="tenant", lazy="selectin"
+        "Project", back_populates="tenant", lazy="raise", passive_deletes=True
     )
 
     def __repr__(self) -> str:
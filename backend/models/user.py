@@ -37,8 +37,9 @@ class User(Base, UUIDPrimaryKeyMixin, TimestampMixin):
 
     # Relationships
     tenant: Mapped["Tenant"] = relationship("Tenant", back_populates="users")
+    # Collections are loaded per call through repository load profiles
     team_memberships: Mapped[list["TeamMember"]] = relationship(
-        "TeamMember", back_populates="user", lazy="selectin"
+        "TeamMember", back_populates="user", lazy="raise", passive_deletes=True
     )
 
     def __repr__(self) -> str:
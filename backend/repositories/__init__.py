@@ -3,12 +3,22 @@
 from repositories.base import (
     BaseRepository,
     ConflictError,
+    CountMode,
+    Cursor,
+    Fingerprint,
+    InvalidCursorError,
+    LoadProfile,
     NotFoundError,
     PaginatedResult,
     PaginationParams,
     SortParams,
 )
-from repositories.build import BuildRepository
+from repositories.build import BuildRepository, BuildRequest
+from repositories.build_log import (
+    BuildLogArchiveRepository,
+    BuildLogRepository,
+    BuildLogSlice,
+)
 from repositories.environment_variable import EnvironmentVariableRepository
 from repositories.project import ProjectRepository
 from repositories.service import ServiceRepository
@@ -23,11 +33,20 @@ __all__ = [
     "BaseRepository",
     "NotFoundError",
     "ConflictError",
+    "InvalidCursorError",
+    "Cursor",
+    "Fingerprint",
     "PaginationParams",
     "SortParams",
     "PaginatedResult",
+    "CountMode",
+    "LoadProfile",
     # Repositories
+    "BuildLogArchiveRepository",
+    "BuildLogRepository",
+    "BuildLogSlice",
     "BuildRepository",
+    "BuildRequest",
     "EnvironmentVariableRepository",
     "ProjectRepository",
     "ServiceRepository",
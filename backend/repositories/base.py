@@ -1,16 +1,60 @@
 """Base repository with common CRUD operations."""
 
-from typing import Any, Generic, TypeVar, get_args
-
-from sqlalchemy import asc, desc, func, select
+import base64
+import binascii
+import enum
+import json
+import os
+from datetime import date, datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generic,
+    Mapping,
+    Sequence,
+    TypeVar,
+    get_args,
+)
+
+from sqlalchemy import (
+    DateTime,
+    and_,
+    asc,
+    desc,
+    func,
+    inspect,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from database import Base
+from core.cache import (
+    LRUCache,
+    entity_to_dict,
+    get_entity_cache,
+    invalidate_after_commit,
+    merge_cached,
+)
+from database import Base, use_primary
+from repositories.loader import batching_enabled, clear_loaders, get_loader
 
 ModelType = TypeVar("ModelType", bound=Base)
 
+# How long an estimated count is reused before it is recomputed
+COUNT_ESTIMATE_TTL = float(os.getenv("COUNT_ESTIMATE_TTL", "60"))
+# Distinct (table, filters) combinations whose count is kept
+COUNT_ESTIMATE_CACHE_SIZE = int(os.getenv("COUNT_ESTIMATE_CACHE_SIZE", "1024"))
+
+# (table, filters) -> count
+_count_estimates = LRUCache(maxsize=COUNT_ESTIMATE_CACHE_SIZE, ttl=COUNT_ESTIMATE_TTL)
+
 
 class NotFoundError(Exception):
     """Raised when an entity is not found."""
@@ -28,12 +72,56 @@ class ConflictError(Exception):
         super().__init__(message)
 
 
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor cannot be decoded or does not match the sort."""
+
+    def __init__(self, message: str = "Invalid pagination cursor"):
+        super().__init__(message)
+
+
+class CountMode(str, enum.Enum):
+    """How ``BaseRepository.list`` computes ``PaginatedResult.total``.
+
+    ``exact`` runs a ``count(*)`` over the filtered set, ``none`` skips the
+    count entirely and ``estimate`` uses planner statistics or a cached count.
+    """
+
+    EXACT = "exact"
+    NONE = "none"
+    ESTIMATE = "estimate"
+
+
+class LoadProfile(str, enum.Enum):
+    """Named relationship load profiles.
+
+    Each repository maps profiles to the relationships it loads in
+    ``load_profiles``. Passing no profile loads no relationships.
+    """
+
+    SUMMARY = "summary"
+    DETAIL = "detail"
+    FULL = "full"
+
+
 class PaginationParams:
-    """Pagination parameters."""
+    """Pagination parameters.
+
+    Offset pagination is used by default. Passing ``cursor`` (or ``keyset=True``
+    for the first page) switches to keyset pagination, which seeks on
+    ``(sort column, id)`` instead of skipping rows.
+    """
 
-    def __init__(self, skip: int = 0, limit: int = 100):
+    def __init__(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+        keyset: bool = False,
+    ):
         self.skip = max(0, skip)
         self.limit = min(max(1, limit), 1000)  # Cap at 1000
+        self.cursor = cursor or None
+        self.keyset = keyset or self.cursor is not None
 
     @property
     def offset(self) -> int:
@@ -47,11 +135,18 @@ class SortParams:
         self.sort_by = sort_by
         self.sort_order = sort_order.lower() if sort_order else "desc"
 
+    def resolve_column(self, model: type) -> Any:
+        """Get the column to sort on, falling back to created_at.
+
+        Only mapped columns qualify, never relationships or other attributes.
+        """
+        columns = inspect(model).column_attrs
+        name = self.sort_by if self.sort_by in columns else "created_at"
+        return getattr(model, name) if name in columns else None
+
     def apply(self, query: Any, model: type) -> Any:
         """Apply sorting to query."""
-        column = getattr(model, self.sort_by, None)
-        if column is None:
-            column = getattr(model, "created_at", None)
+        column = self.resolve_column(model)
         if column is not None:
             if self.sort_order == "asc":
                 query = query.order_by(asc(column))
@@ -59,6 +154,118 @@ class SortParams:
                 query = query.order_by(desc(column))
         return query
 
+    def apply_keyset(
+        self,
+        query: Any,
+        model: type,
+        cursor: "Cursor | None" = None,
+        reverse: bool = False,
+    ) -> Any:
+        """Apply ``(column, id)`` ordering and seek past ``cursor``.
+
+        With ``reverse`` the ordering is flipped so the rows *before* the
+        cursor can be fetched; callers must reverse the fetched page.
+
+        NULLs sort after every value in ascending order and before them in
+        descending order, as in PostgreSQL, so rows with no sort value are
+        paged through like any other.
+        """
+        column = self.resolve_column(model)
+        ascending = (self.sort_order == "asc") != reverse
+        if cursor is not None:
+            query = query.where(self._seek(column, model.id, cursor, ascending))
+        if ascending:
+            return query.order_by(asc(column).nulls_last(), asc(model.id))
+        return query.order_by(desc(column).nulls_first(), desc(model.id))
+
+    @staticmethod
+    def _seek(column: Any, id_column: Any, cursor: "Cursor", ascending: bool) -> Any:
+        """Get the condition for rows after ``cursor`` in the given order."""
+        if cursor.value is None:
+            # Only NULLs sort on one side of a NULL: after it ascending, before it descending
+            if ascending:
+                return and_(column.is_(None), id_column > cursor.entity_id)
+            return or_(
+                column.is_not(None), and_(column.is_(None), id_column < cursor.entity_id)
+            )
+        key = tuple_(column, id_column)
+        bound = tuple_(cursor.value, cursor.entity_id)
+        if not ascending:
+            # Comparisons with NULL are never true, so rows with NULLs, which come first, drop out
+            return key < bound
+        if column.expression.nullable:
+            return or_(key > bound, column.is_(None))
+        return key > bound
+
+
+class Cursor:
+    """Opaque keyset pagination cursor.
+
+    Encodes the sort column name and order, the sort value and the id of
+    the boundary row, plus the direction to page in (``next`` or ``prev``).
+    """
+
+    NEXT = "next"
+    PREV = "prev"
+
+    def __init__(
+        self,
+        sort_by: str,
+        value: Any,
+        entity_id: str,
+        direction: str = NEXT,
+        sort_order: str = "desc",
+    ):
+        self.sort_by = sort_by
+        self.value = value
+        self.entity_id = entity_id
+        self.direction = direction
+        self.sort_order = sort_order
+
+    @classmethod
+    def from_entity(
+        cls, entity: Any, column: Any, direction: str, sort_order: str = "desc"
+    ) -> "Cursor":
+        """Build a cursor pointing at ``entity`` (an ORM object or a projected row)."""
+        if isinstance(entity, Mapping):
+            return cls(column.key, entity[column.key], entity["id"], direction, sort_order)
+        return cls(column.key, getattr(entity, column.key), entity.id, direction, sort_order)
+
+    def encode(self) -> str:
+        """Encode the cursor as an opaque URL-safe string."""
+        value = self.value
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        payload = json.dumps(
+            [self.sort_by, self.sort_order, value, self.entity_id, self.direction],
+            separators=(",", ":"),
+            default=str,
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str, column: Any, sort_order: str = "desc") -> "Cursor":
+        """Decode a cursor produced by ``encode`` for the given sort column and order."""
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            sort_by, order, value, entity_id, direction = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+        except (binascii.Error, ValueError, TypeError) as e:
+            raise InvalidCursorError() from e
+        if (
+            sort_by != column.key
+            or order != sort_order
+            or direction not in (cls.NEXT, cls.PREV)
+        ):
+            raise InvalidCursorError("Pagination cursor does not match the requested sort")
+        if value is not None and isinstance(column.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError) as e:
+                raise InvalidCursorError() from e
+        return cls(sort_by, value, entity_id, direction, order)
+
 
 class PaginatedResult(Generic[ModelType]):
     """Paginated result container."""
@@ -66,22 +273,44 @@ class PaginatedResult(Generic[ModelType]):
     def __init__(
         self,
         items: list[ModelType],
-        total: int,
+        total: int | None,
         skip: int,
         limit: int,
+        has_more: bool | None = None,
+        next_cursor: str | None = None,
+        prev_cursor: str | None = None,
+        total_is_estimate: bool = False,
     ):
         self.items = items
         self.total = total
         self.skip = skip
         self.limit = limit
-        self.has_more = skip + len(items) < total
+        if has_more is None:
+            has_more = total is not None and skip + len(items) < total
+        self.has_more = has_more
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total_is_estimate = total_is_estimate
+
+
+class Fingerprint:
+    """Row count and newest modification time of a set of rows.
+
+    Changes whenever a row of the set is inserted, updated or deleted, so it
+    can stand in for the rows when validating cached responses.
+    """
+
+    def __init__(self, count: int, last_modified: datetime | None):
+        self.count = count
+        self.last_modified = last_modified
 
 
 class BaseRepository(Generic[ModelType]):
     """Base repository with async CRUD operations."""
 
     model: type[ModelType]
-    eager_load: list[str] = []
+    # Relationships loaded per profile; dotted paths load nested relationships
+    load_profiles: dict[LoadProfile, list[str]] = {}
 
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -97,78 +326,336 @@ class BaseRepository(Generic[ModelType]):
                 return args[0]
         raise RuntimeError("Could not determine model type")
 
-    def _apply_eager_loading(self, query: Any) -> Any:
-        """Apply eager loading for relationships."""
+    def _clear_lookups(self) -> None:
+        """Forget batched lookups of this model after a write."""
+        clear_loaders(self.session, self._get_model_class())
+
+    async def _entity_changed(self, entity_id: str) -> None:
+        """Drop batched and cached lookups after an entity was updated or deleted."""
+        self._clear_lookups()
+        cache = get_entity_cache()
+        if cache is None:
+            return
+        table = self._get_model_class().__tablename__
+        await cache.invalidate(table, entity_id)
+        invalidate_after_commit(self.session, cache, table, entity_id)
+
+    async def _read_through(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[ModelType | None]],
+    ) -> ModelType | None:
+        """Serve a lookup through the entity cache when it is enabled.
+
+        ``key`` identifies the lookup within the model's table (for example
+        ``"slug:acme"``); ``fetch`` loads the entity from the database on a miss.
+        """
+        cache = get_entity_cache()
+        if cache is None:
+            return await fetch()
+        model_class = self._get_model_class()
+
+        async def load() -> dict[str, Any] | None:
+            entity = await fetch()
+            return None if entity is None else entity_to_dict(entity)
+
+        data = await cache.get_or_load(model_class.__tablename__, key, load)
+        if data is None:
+            return None
+        return await merge_cached(self.session, model_class, data)
+
+    def _apply_load_profile(self, query: Any, profile: LoadProfile | None) -> Any:
+        """Apply selectin loading for the relationships of a load profile."""
+        if profile is None:
+            return query
         model_class = self._get_model_class()
-        for attr_name in self.eager_load:
-            attr = getattr(model_class, attr_name, None)
-            if attr is not None:
-                query = query.options(selectinload(attr))
+        for path in self.load_profiles.get(LoadProfile(profile), []):
+            loader = None
+            current = model_class
+            for attr_name in path.split("."):
+                attr = getattr(current, attr_name)
+                loader = selectinload(attr) if loader is None else loader.selectinload(attr)
+                current = attr.property.mapper.class_
+            query = query.options(loader)
         return query
 
-    async def get_by_id(self, entity_id: str) -> ModelType | None:
-        """Get an entity by ID."""
+    async def get_by_id(
+        self, entity_id: str, profile: LoadProfile | None = None
+    ) -> ModelType | None:
+        """Get an entity by ID.
+
+        Without a load profile, lookups on a batching session (see ``get_db``)
+        are coalesced with other lookups issued in the same event-loop tick.
+        """
         model_class = self._get_model_class()
+        if profile is None and batching_enabled(self.session):
+            return await get_loader(self.session, model_class).load(entity_id)
         query = select(model_class).where(model_class.id == entity_id)
-        query = self._apply_eager_loading(query)
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
-    async def get_by_id_or_raise(self, entity_id: str) -> ModelType:
+    async def get_by_id_or_raise(
+        self, entity_id: str, profile: LoadProfile | None = None
+    ) -> ModelType:
         """Get an entity by ID or raise NotFoundError."""
-        entity = await self.get_by_id(entity_id)
+        entity = await self.get_by_id(entity_id, profile=profile)
         if entity is None:
             model_class = self._get_model_class()
             raise NotFoundError(model_class.__name__, entity_id)
         return entity
 
+    def _apply_filters(self, query: Any, filters: dict[str, Any] | None) -> Any:
+        """Apply equality filters, skipping None values and unknown columns."""
+        model_class = self._get_model_class()
+        if filters:
+            for key, value in filters.items():
+                if value is not None:
+                    column = getattr(model_class, key, None)
+                    if column is not None:
+                        query = query.where(column == value)
+        return query
+
     async def list(
         self,
         filters: dict[str, Any] | None = None,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
+        columns: Sequence[str] | None = None,
     ) -> PaginatedResult[ModelType]:
-        """List entities with optional filtering, pagination, and sorting."""
+        """List entities with optional filtering, pagination, and sorting.
+
+        ``count_mode`` controls how ``total`` is filled; with ``none`` it is
+        None and ``has_more`` comes from fetching one extra row.
+
+        With ``columns`` only those columns (plus ``id``) are selected and
+        items are plain dicts instead of ORM objects, skipping identity-map
+        hydration; ``profile`` is ignored then.
+        """
         model_class = self._get_model_class()
         pagination = pagination or PaginationParams()
         sort = sort or SortParams()
+        count_mode = CountMode(count_mode)
 
         # Build base query
-        query = select(model_class)
+        if columns is not None:
+            query = self._select_columns(columns, sort if pagination.keyset else None)
+        else:
+            query = select(model_class)
 
         # Apply filters
-        if filters:
-            for key, value in filters.items():
-                if value is not None:
-                    column = getattr(model_class, key, None)
-                    if column is not None:
-                        query = query.where(column == value)
+        query = self._apply_filters(query, filters)
 
         # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await self.session.execute(count_query)
-        total = total_result.scalar() or 0
+        total: int | None = None
+        if count_mode == CountMode.EXACT:
+            count_query = select(func.count()).select_from(query.subquery())
+            total_result = await self.session.execute(count_query)
+            total = total_result.scalar() or 0
+        elif count_mode == CountMode.ESTIMATE:
+            total = await self._estimate_count(query, filters)
+        estimated = count_mode == CountMode.ESTIMATE
+
+        if pagination.keyset:
+            return await self._list_keyset(
+                query, total, pagination, sort, estimated, profile, projected=columns is not None
+            )
 
         # Apply sorting
         query = sort.apply(query, model_class)
 
-        # Apply pagination
-        query = query.offset(pagination.offset).limit(pagination.limit)
+        # Apply pagination; without an exact total, peek one row ahead
+        peek = count_mode != CountMode.EXACT
+        limit = pagination.limit + 1 if peek else pagination.limit
+        query = query.offset(pagination.offset).limit(limit)
 
-        # Apply eager loading
-        query = self._apply_eager_loading(query)
+        # Apply relationship loading
+        if columns is None:
+            query = self._apply_load_profile(query, profile)
 
         # Execute query
-        result = await self.session.execute(query)
-        items = list(result.scalars().all())
+        items = await self._fetch(query, projected=columns is not None)
+
+        has_more = None
+        if peek:
+            has_more = len(items) > pagination.limit
+            items = items[: pagination.limit]
 
         return PaginatedResult(
             items=items,
             total=total,
             skip=pagination.skip,
             limit=pagination.limit,
+            has_more=has_more,
+            total_is_estimate=estimated,
         )
 
+    async def _estimate_count(self, query: Any, filters: dict[str, Any] | None) -> int:
+        """Estimate the size of the filtered set.
+
+        Unfiltered counts come from ``pg_class.reltuples``. Filtered counts
+        (or tables the planner has not analyzed yet) fall back to an exact
+        count that is cached for ``COUNT_ESTIMATE_TTL`` seconds.
+        """
+        model_class = self._get_model_class()
+        table_name = model_class.__tablename__
+        active = tuple(
+            sorted(
+                (key, str(value))
+                for key, value in (filters or {}).items()
+                if value is not None and hasattr(model_class, key)
+            )
+        )
+
+        if not active and self.session.get_bind().dialect.name == "postgresql":
+            result = await self.session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": table_name},
+            )
+            reltuples = result.scalar()
+            if reltuples is not None and reltuples >= 0:
+                return int(reltuples)
+
+        cache_key = (table_name, active)
+        cached = _count_estimates.get(cache_key)
+        if cached is not None:
+            return cached
+
+        count_query = select(func.count()).select_from(query.subquery())
+        total = (await self.session.execute(count_query)).scalar() or 0
+        _count_estimates.set(cache_key, total)
+        return total
+
+    async def _list_keyset(
+        self,
+        query: Any,
+        total: int | None,
+        pagination: PaginationParams,
+        sort: SortParams,
+        estimated: bool = False,
+        profile: LoadProfile | None = None,
+        projected: bool = False,
+    ) -> PaginatedResult[ModelType]:
+        """Fetch one page by seeking on ``(sort column, id)``.
+
+        One extra row is fetched to know whether another page exists in the
+        paging direction, so no OFFSET scan is needed at any depth.
+        """
+        model_class = self._get_model_class()
+        column = sort.resolve_column(model_class)
+        cursor = (
+            Cursor.decode(pagination.cursor, column, sort.sort_order)
+            if pagination.cursor
+            else None
+        )
+        backwards = cursor is not None and cursor.direction == Cursor.PREV
+
+        query = sort.apply_keyset(query, model_class, cursor, reverse=backwards)
+        query = query.limit(pagination.limit + 1)
+        if not projected:
+            query = self._apply_load_profile(query, profile)
+
+        rows = await self._fetch(query, projected)
+        more = len(rows) > pagination.limit
+        items = rows[: pagination.limit]
+        if backwards:
+            items.reverse()
+
+        # Paging backwards always has rows after it (the page we came from);
+        # paging forwards has rows before it whenever a cursor was given.
+        has_next = True if backwards else more
+        has_prev = more if backwards else cursor is not None
+
+        next_cursor = prev_cursor = None
+        if items and has_next:
+            next_cursor = Cursor.from_entity(
+                items[-1], column, Cursor.NEXT, sort.sort_order
+            ).encode()
+        if items and has_prev:
+            prev_cursor = Cursor.from_entity(
+                items[0], column, Cursor.PREV, sort.sort_order
+            ).encode()
+
+        return PaginatedResult(
+            items=items,
+            total=total,
+            skip=0,
+            limit=pagination.limit,
+            has_more=next_cursor is not None,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            total_is_estimate=estimated,
+        )
+
+    def _select_columns(self, columns: Sequence[str], sort: SortParams | None = None) -> Any:
+        """Select ``columns`` of the model, plus ``id`` and the keyset sort column.
+
+        Raises:
+            ValueError: If a name is not a column of the model
+        """
+        model_class = self._get_model_class()
+        mapped = {attr.key for attr in inspect(model_class).column_attrs}
+        unknown = [name for name in columns if name not in mapped]
+        if unknown:
+            raise ValueError(f"Unknown {model_class.__name__} columns: {', '.join(unknown)}")
+        names = ["id", *(name for name in columns if name != "id")]
+        if sort is not None:
+            sort_column = sort.resolve_column(model_class)
+            if sort_column is not None and sort_column.key not in names:
+                names.append(sort_column.key)
+        return select(*(getattr(model_class, name) for name in names))
+
+    async def _fetch(self, query: Any, projected: bool = False) -> Sequence[Any]:
+        """Run a list query, as dicts for projected queries and entities otherwise."""
+        result = await self.session.execute(query)
+        if projected:
+            return [dict(row) for row in result.mappings()]
+        return list(result.scalars().all())
+
+    async def stream(
+        self,
+        filters: dict[str, Any] | None = None,
+        chunk_size: int = 1000,
+        criteria: Sequence[Any] = (),
+        sort: SortParams | None = None,
+    ) -> AsyncIterator[ModelType]:
+        """Iterate over every matching entity through a server-side cursor.
+
+        Rows are fetched ``chunk_size`` at a time (``yield_per``), so memory
+        stays bounded however many rows match. ``criteria`` takes extra SQL
+        conditions for filters that are not plain equality.
+        """
+        model_class = self._get_model_class()
+        query = self._apply_filters(select(model_class), filters)
+        if criteria:
+            query = query.where(*criteria)
+        if sort is not None:
+            query = sort.apply(query, model_class)
+        result = await self.session.stream_scalars(
+            query, execution_options={"yield_per": chunk_size}
+        )
+        async for partition in result.partitions():
+            for entity in partition:
+                yield entity
+
+    async def _refresh(self, entity: ModelType, undefer: bool = False) -> None:
+        """Reload an entity's columns after a flush.
+
+        A plain refresh expires deferred columns, including ones just set,
+        which then raise on access when deferred with raiseload. Deferred
+        columns that are loaded or set are reloaded too, and with
+        ``undefer`` all of them are.
+        """
+        state = inspect(entity)
+        names = [
+            attr.key
+            for attr in state.mapper.column_attrs
+            if undefer or not attr.deferred or attr.key not in state.unloaded
+        ]
+        await self.session.refresh(entity, attribute_names=names)
+
     async def create(self, data: dict[str, Any]) -> ModelType:
         """Create a new entity."""
         model_class = self._get_model_class()
@@ -176,36 +663,89 @@ class BaseRepository(Generic[ModelType]):
             entity = model_class(**data)
             self.session.add(entity)
             await self.session.flush()
-            await self.session.refresh(entity)
+            # The row was just written, so it is read back whole
+            await self._refresh(entity, undefer=True)
+            self._clear_lookups()
             return entity
         except IntegrityError as e:
             await self.session.rollback()
             raise ConflictError(str(e.orig)) from e
 
+    async def _get_for_write(self, entity_id: str) -> ModelType | None:
+        """Load an entity to modify from the primary, bypassing every cache.
+
+        ``get_by_id`` may answer from a batch loader memo or the entity
+        cache, which can be behind the database; a read-modify-write must
+        start from the current row.
+        """
+        use_primary(self.session)
+        model_class = self._get_model_class()
+        query = (
+            select(model_class)
+            .where(model_class.id == entity_id)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
     async def update(self, entity_id: str, data: dict[str, Any]) -> ModelType:
         """Update an entity by ID."""
-        entity = await self.get_by_id_or_raise(entity_id)
+        entity = await self._get_for_write(entity_id)
+        if entity is None:
+            raise NotFoundError(self._get_model_class().__name__, entity_id)
         for key, value in data.items():
-            if hasattr(entity, key) and value is not None:
+            if hasattr(type(entity), key) and value is not None:
                 setattr(entity, key, value)
         await self.session.flush()
-        await self.session.refresh(entity)
+        await self._refresh(entity)
+        await self._entity_changed(entity_id)
+        return entity
+
+    async def update_returning(self, entity_id: str, data: dict[str, Any]) -> ModelType:
+        """Update an entity with a single ``UPDATE ... WHERE id = :id RETURNING``.
+
+        Unlike ``update`` the entity is not loaded first and no relationships
+        are materialized. Values may be SQL expressions; None values are
+        skipped, as in ``update``.
+        """
+        model_class = self._get_model_class()
+        values = {
+            key: value
+            for key, value in data.items()
+            if hasattr(model_class, key) and value is not None
+        }
+        query = (
+            update(model_class)
+            .where(model_class.id == entity_id)
+            .values(**values)
+            .returning(model_class)
+            .execution_options(populate_existing=True)
+        )
+        try:
+            result = await self.session.execute(query)
+        except IntegrityError as e:
+            await self.session.rollback()
+            raise ConflictError(str(e.orig)) from e
+        entity = result.scalar_one_or_none()
+        if entity is None:
+            raise NotFoundError(model_class.__name__, entity_id)
+        await self._entity_changed(entity_id)
         return entity
 
     async def delete(self, entity_id: str) -> bool:
         """Delete an entity by ID."""
-        entity = await self.get_by_id(entity_id)
+        entity = await self._get_for_write(entity_id)
         if entity is None:
             return False
         await self.session.delete(entity)
         await self.session.flush()
+        await self._entity_changed(entity_id)
         return True
 
     async def delete_or_raise(self, entity_id: str) -> None:
         """Delete an entity by ID or raise NotFoundError."""
-        entity = await self.get_by_id_or_raise(entity_id)
-        await self.session.delete(entity)
-        await self.session.flush()
+        if not await self.delete(entity_id):
+            raise NotFoundError(self._get_model_class().__name__, entity_id)
 
     async def exists(self, entity_id: str) -> bool:
         """Check if an entity exists."""
@@ -215,15 +755,29 @@ class BaseRepository(Generic[ModelType]):
         count = result.scalar() or 0
         return count > 0
 
+    async def fingerprint(
+        self,
+        filters: dict[str, Any] | None = None,
+        criteria: Sequence[Any] = (),
+    ) -> Fingerprint:
+        """Get the count and newest ``updated_at``/``created_at`` of matching rows.
+
+        Runs a single aggregate query, for answering conditional GETs without
+        loading the rows (see ``core.http_cache``).
+        """
+        model_class = self._get_model_class()
+        modified = func.coalesce(model_class.updated_at, model_class.created_at)
+        query = select(func.count(), func.max(modified)).select_from(model_class)
+        query = self._apply_filters(query, filters)
+        if criteria:
+            query = query.where(*criteria)
+        count, last_modified = (await self.session.execute(query)).one()
+        return Fingerprint(count, last_modified)
+
     async def count(self, filters: dict[str, Any] | None = None) -> int:
         """Count entities with optional filtering."""
         model_class = self._get_model_class()
         query = select(func.count()).select_from(model_class)
-        if filters:
-            for key, value in filters.items():
-                if value is not None:
-                    column = getattr(model_class, key, None)
-                    if column is not None:
-                        query = query.where(column == value)
+        query = self._apply_filters(query, filters)
         result = await self.session.execute(query)
         return result.scalar() or 0
@@ -1,23 +1,65 @@
 """Build repository."""
 
 from datetime import datetime
-from typing import Any
+from typing import Any, AsyncIterator
 
-from sqlalchemy import select
+from sqlalchemy import Integer, cast, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from sqlalchemy.orm.attributes import set_committed_value
 
+from core.log_archive import get_log_storage, split_lines
+from database import use_primary
 from models.base import BuildStatus
-from models.build import Build
-from repositories.base import BaseRepository, PaginatedResult, PaginationParams, SortParams
+from models.build import BUILD_DETAILS_GROUP, Build
+from models.project import Project
+from models.service import Service
+from repositories.base import (
+    BaseRepository,
+    CountMode,
+    LoadProfile,
+    NotFoundError,
+    PaginatedResult,
+    PaginationParams,
+    SortParams,
+)
+from repositories.build_log import BuildLogArchiveRepository, BuildLogRepository
+from repositories.service import select_tenant_service_ids
+
+# A build in one of these states may still run; requests for its commit join it
+IN_FLIGHT_BUILD_STATUSES = (BuildStatus.PENDING, BuildStatus.QUEUED, BuildStatus.BUILDING)
+# Builds holding a build slot
+ACTIVE_BUILD_STATUSES = (BuildStatus.QUEUED, BuildStatus.BUILDING)
+# Advisory lock key serializing scheduler runs ("build" in ASCII)
+SCHEDULER_LOCK_KEY = 0x6275696C64
+
+
+class BuildRequest:
+    """Outcome of ``BuildRepository.request_build``.
+
+    ``created`` is False when the request joined an in-flight build of the
+    same commit. ``superseded`` holds the ids of pending builds it cancelled.
+    """
+
+    def __init__(self, build: Build, created: bool, superseded: list[str]):
+        self.build = build
+        self.created = created
+        self.superseded = superseded
 
 
 class BuildRepository(BaseRepository[Build]):
     """Repository for Build entities."""
 
     model = Build
+    load_profiles = {
+        LoadProfile.DETAIL: ["service"],
+        LoadProfile.FULL: ["service"],
+    }
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
+        self.log_store = BuildLogRepository(session)
+        self.log_archive = BuildLogArchiveRepository(session, get_log_storage())
 
     async def list_by_service(
         self,
@@ -25,35 +67,112 @@ class BuildRepository(BaseRepository[Build]):
         status: BuildStatus | None = None,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[Build]:
         """List builds for a specific service."""
         filters: dict[str, Any] = {"service_id": service_id}
         if status:
             filters["status"] = status
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+        )
 
     async def list_by_status(
         self,
         status: BuildStatus,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[Build]:
         """List builds by status."""
         filters: dict[str, Any] = {"status": status}
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+        )
 
-    async def get_latest_build(self, service_id: str) -> Build | None:
-        """Get the latest build for a service."""
+    async def get_with_details(
+        self, build_id: str, profile: LoadProfile | None = None
+    ) -> Build | None:
+        """Get a build with its deferred logs, commit message and metadata loaded.
+
+        ``Build.logs`` is filled from the chunked log store or the archive;
+        builds from before the store keep the contents of the legacy column.
+        """
         query = (
             select(Build)
-            .where(Build.service_id == service_id)
-            .order_by(Build.created_at.desc())
-            .limit(1)
+            .where(Build.id == build_id)
+            .options(undefer_group(BUILD_DETAILS_GROUP))
         )
+        query = self._apply_load_profile(query, profile)
+        result = await self.session.execute(query)
+        build = result.scalar_one_or_none()
+        if build is not None:
+            logs = await self._read_stored_logs(build_id)
+            if logs is not None:
+                set_committed_value(build, "logs", logs)
+        return build
+
+    async def get_logs(self, build_id: str) -> str | None:
+        """Get only the logs of a build, without loading the entity."""
+        logs = await self._read_stored_logs(build_id)
+        if logs is not None:
+            return logs
+        query = select(Build.logs).where(Build.id == build_id)
+        result = await self.session.execute(query)
+        row = result.one_or_none()
+        if row is None:
+            raise NotFoundError("Build", build_id)
+        return row.logs
+
+    async def get_log_lines(self, build_id: str, start: int = 0, count: int = 1000) -> list[str]:
+        """Get a range of log lines.
+
+        Archived logs decompress only the blocks holding the range.
+        """
+        lines = await self.log_archive.read_lines(build_id, start, count)
+        if lines is not None:
+            return lines
+        logs = await self.get_logs(build_id) or ""
+        return [line.rstrip("\n") for line in split_lines(logs)[start:start + count]]
+
+    async def _read_stored_logs(self, build_id: str) -> str | None:
+        """Read logs from the chunk store, then the archive tier."""
+        logs = await self.log_store.read_all(build_id)
+        if logs is None:
+            logs = await self.log_archive.read_all(build_id)
+        return logs
+
+    async def get_latest_build(
+        self,
+        service_id: str,
+        profile: LoadProfile | None = None,
+        commit_sha: str | None = None,
+        statuses: tuple[BuildStatus, ...] | None = None,
+    ) -> Build | None:
+        """Get the latest build for a service, optionally of a commit or in given states."""
+        query = select(Build).where(Build.service_id == service_id)
+        if commit_sha is not None:
+            query = query.where(Build.commit_sha == commit_sha)
+        if statuses is not None:
+            query = query.where(Build.status.in_(statuses))
+        query = query.order_by(Build.created_at.desc()).limit(1)
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
-    async def get_latest_successful_build(self, service_id: str) -> Build | None:
+    async def get_latest_successful_build(
+        self, service_id: str, profile: LoadProfile | None = None
+    ) -> Build | None:
         """Get the latest successful build for a service."""
         query = (
             select(Build)
@@ -64,26 +183,30 @@ class BuildRepository(BaseRepository[Build]):
             .order_by(Build.created_at.desc())
             .limit(1)
         )
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
+    async def append_logs(self, build_id: str, content: str) -> None:
+        """Append output to a build's log."""
+        await self.log_store.append(build_id, content)
+
     async def update_status(
         self,
         build_id: str,
         status: BuildStatus,
         logs: str | None = None,
     ) -> Build:
-        """Update build status and optionally logs."""
-        data: dict[str, Any] = {"status": status}
-        if logs is not None:
-            data["logs"] = logs
-        return await self.update(build_id, data)
+        """Update build status and optionally append log output."""
+        if logs:
+            await self.log_store.append(build_id, logs)
+        return await self.update_returning(build_id, {"status": status})
 
     async def start_build(self, build_id: str) -> Build:
         """Mark build as started."""
-        return await self.update(
+        return await self.update_returning(
             build_id,
-            {"status": BuildStatus.BUILDING, "started_at": datetime.utcnow()},
+            {"status": BuildStatus.BUILDING, "started_at": func.now()},
         )
 
     async def complete_build(
@@ -93,29 +216,301 @@ class BuildRepository(BaseRepository[Build]):
         logs: str | None = None,
         image_tag: str | None = None,
     ) -> Build:
-        """Complete a build with success or failure."""
-        finished_at = datetime.utcnow()
-        build = await self.get_by_id_or_raise(build_id)
-        
-        duration = None
-        if build.started_at:
-            duration = int((finished_at - build.started_at).total_seconds())
-        
+        """Complete a build with success or failure, appending any final logs.
+
+        The finish time and duration are computed by the database, so this is
+        a single UPDATE; the duration stays NULL for builds never started.
+        """
+        if logs:
+            await self.log_store.append(build_id, logs)
+
+        finished_at = func.now()
+        duration = cast(func.floor(func.extract("epoch", finished_at - Build.started_at)), Integer)
+
         data: dict[str, Any] = {
             "status": BuildStatus.SUCCESS if success else BuildStatus.FAILED,
             "finished_at": finished_at,
             "duration_seconds": duration,
         }
-        if logs is not None:
-            data["logs"] = logs
         if image_tag is not None:
             data["image_tag"] = image_tag
-        
-        return await self.update(build_id, data)
+
+        return await self.update_returning(build_id, data)
+
+    async def get_metadata(self, build_id: str) -> dict | None:
+        """Get only the metadata of a build, without loading the entity."""
+        query = select(Build.build_metadata).where(Build.id == build_id)
+        result = await self.session.execute(query)
+        row = result.one_or_none()
+        if row is None:
+            raise NotFoundError("Build", build_id)
+        return row.build_metadata
+
+    async def update_metadata(self, build_id: str, metadata: dict[str, Any]) -> Build:
+        """Replace a build's metadata, e.g. with pipeline progress."""
+        return await self.update_returning(build_id, {"build_metadata": metadata})
 
     async def get_pending_builds(
         self,
         pagination: PaginationParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
+        service_id: str | None = None,
+        git_branch: str | None = None,
     ) -> PaginatedResult[Build]:
-        """Get pending builds."""
-        return await self.list_by_status(BuildStatus.PENDING, pagination=pagination)
+        """Get pending builds, optionally of one service and branch."""
+        filters: dict[str, Any] = {
+            "status": BuildStatus.PENDING,
+            "service_id": service_id,
+            "git_branch": git_branch,
+        }
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            count_mode=count_mode,
+            profile=profile,
+        )
+
+    async def request_build(
+        self,
+        service_id: str,
+        commit_sha: str,
+        git_branch: str | None = None,
+        commit_message: str | None = None,
+    ) -> BuildRequest:
+        """Get a build for a pushed commit, coalescing bursts of pushes.
+
+        A request for a commit that is already pending or building joins
+        that build. Otherwise a new build is created and the builds still
+        pending on the same branch are cancelled, so only the newest commit
+        of a burst runs. The service row is locked until the caller
+        commits, which serializes concurrent requests for a service.
+        """
+        use_primary(self.session)
+        await self.session.execute(
+            select(Service.id).where(Service.id == service_id).with_for_update()
+        )
+
+        existing = await self.get_latest_build(
+            service_id, commit_sha=commit_sha, statuses=IN_FLIGHT_BUILD_STATUSES
+        )
+        if existing is not None:
+            return BuildRequest(existing, created=False, superseded=[])
+
+        build = await self.create(
+            {
+                "service_id": service_id,
+                "commit_sha": commit_sha,
+                "git_branch": git_branch,
+                "commit_message": commit_message,
+                "status": BuildStatus.PENDING,
+            }
+        )
+        superseded: list[str] = []
+        if git_branch is not None:
+            pending = await self.get_pending_builds(
+                pagination=PaginationParams(limit=1000),
+                count_mode=CountMode.NONE,
+                service_id=service_id,
+                git_branch=git_branch,
+            )
+            older = [item.id for item in pending.items if item.id != build.id]
+            superseded = await self.cancel_pending(
+                older, reason=f"Superseded by build {build.id} of {commit_sha}"
+            )
+        return BuildRequest(build, created=True, superseded=superseded)
+
+    async def cancel_pending(self, build_ids: list[str], reason: str | None = None) -> list[str]:
+        """Cancel the builds of ``build_ids`` that have not started yet.
+
+        Returns:
+            Ids of the builds cancelled; builds already started are left alone
+        """
+        if not build_ids:
+            return []
+        query = (
+            update(Build)
+            .where(Build.id.in_(build_ids), Build.status == BuildStatus.PENDING)
+            .values(status=BuildStatus.CANCELLED, finished_at=func.now())
+            .returning(Build.id)
+        )
+        result = await self.session.execute(query)
+        cancelled = list(result.scalars().all())
+        for build_id in cancelled:
+            if reason:
+                await self.log_store.append(build_id, reason + "\n")
+            await self._entity_changed(build_id)
+        return cancelled
+
+    async def claim_build(self, build_id: str) -> Build | None:
+        """Start a pending or queued build in one conditional UPDATE.
+
+        Returns None when the build was cancelled or already started, so a
+        superseded build's task exits even if revoking it did not reach the
+        worker.
+        """
+        query = (
+            update(Build)
+            .where(
+                Build.id == build_id,
+                Build.status.in_((BuildStatus.PENDING, BuildStatus.QUEUED)),
+            )
+            .values(status=BuildStatus.BUILDING, started_at=func.now())
+            .returning(Build)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(query)
+        build = result.scalar_one_or_none()
+        if build is not None:
+            await self._entity_changed(build_id)
+        return build
+
+    async def lock_scheduler(self) -> None:
+        """Wait for other scheduler runs; the lock is held until the transaction ends.
+
+        A run reads the free slots and the pending builds in separate
+        statements, so overlapping runs would hand out the same slots.
+        Only PostgreSQL has advisory locks; elsewhere this does nothing.
+        """
+        if self.session.get_bind().dialect.name == "postgresql":
+            await self.session.execute(select(func.pg_advisory_xact_lock(SCHEDULER_LOCK_KEY)))
+
+    async def list_schedulable(self, limit: int = 5000) -> list[dict[str, Any]]:
+        """Get the oldest pending builds with their tenant and the service's branch."""
+        query = (
+            select(
+                Build.id,
+                Build.service_id,
+                Build.git_branch,
+                Build.created_at,
+                Service.git_branch.label("service_branch"),
+                Project.tenant_id,
+            )
+            .join(Service, Service.id == Build.service_id)
+            .join(Project, Project.id == Service.project_id)
+            .where(Build.status == BuildStatus.PENDING)
+            .order_by(Build.created_at)
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return [dict(row) for row in result.mappings()]
+
+    async def count_active_by_tenant(self) -> dict[str, dict[str, int]]:
+        """Count queued and running builds per tenant and service."""
+        query = (
+            select(Project.tenant_id, Build.service_id, func.count())
+            .join(Service, Service.id == Build.service_id)
+            .join(Project, Project.id == Service.project_id)
+            .where(Build.status.in_(ACTIVE_BUILD_STATUSES))
+            .group_by(Project.tenant_id, Build.service_id)
+        )
+        result = await self.session.execute(query)
+        active: dict[str, dict[str, int]] = {}
+        for tenant_id, service_id, count in result:
+            active.setdefault(tenant_id, {})[service_id] = count
+        return active
+
+    async def build_seconds_by_tenant(self, since: datetime) -> dict[str, float]:
+        """Sum the durations of builds finished since ``since`` per tenant."""
+        query = (
+            select(Project.tenant_id, func.sum(Build.duration_seconds))
+            .join(Service, Service.id == Build.service_id)
+            .join(Project, Project.id == Service.project_id)
+            .where(Build.finished_at >= since, Build.duration_seconds.is_not(None))
+            .group_by(Project.tenant_id)
+        )
+        result = await self.session.execute(query)
+        return {tenant_id: float(seconds or 0) for tenant_id, seconds in result}
+
+    async def estimate_durations(
+        self, service_ids: list[str], samples: int = 10
+    ) -> dict[str, float]:
+        """Average duration of each service's last ``samples`` successful builds.
+
+        Services without a successful timed build are missing from the result.
+        """
+        if not service_ids:
+            return {}
+        ranked = (
+            select(
+                Build.service_id,
+                Build.duration_seconds,
+                func.row_number()
+                .over(partition_by=Build.service_id, order_by=Build.created_at.desc())
+                .label("rank"),
+            )
+            .where(
+                Build.service_id.in_(service_ids),
+                Build.status == BuildStatus.SUCCESS,
+                Build.duration_seconds.is_not(None),
+            )
+            .subquery()
+        )
+        query = (
+            select(ranked.c.service_id, func.avg(ranked.c.duration_seconds))
+            .where(ranked.c.rank <= samples)
+            .group_by(ranked.c.service_id)
+        )
+        result = await self.session.execute(query)
+        return {service_id: float(seconds) for service_id, seconds in result}
+
+    async def mark_queued(self, build_ids: list[str]) -> list[str]:
+        """Mark pending builds as handed to a worker.
+
+        Returns:
+            Ids of the builds marked; builds no longer pending are left out
+        """
+        if not build_ids:
+            return []
+        query = (
+            update(Build)
+            .where(Build.id.in_(build_ids), Build.status == BuildStatus.PENDING)
+            .values(status=BuildStatus.QUEUED)
+            .returning(Build.id)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def requeue_stale(self, queued_before: datetime) -> int:
+        """Return builds queued before ``queued_before`` but never started to pending.
+
+        Covers tasks lost between the scheduler and a worker. Should a lost
+        task turn up after all, its claim and the new task's race and only
+        one runs the build.
+        """
+        query = (
+            update(Build)
+            .where(Build.status == BuildStatus.QUEUED, Build.updated_at < queued_before)
+            .values(status=BuildStatus.PENDING)
+            .returning(Build.id)
+        )
+        result = await self.session.execute(query)
+        return len(result.scalars().all())
+
+    async def queue_stats_by_tenant(self) -> dict[str, tuple[int, datetime]]:
+        """Get the number of waiting builds and the oldest one's creation time per tenant."""
+        query = (
+            select(Project.tenant_id, func.count(), func.min(Build.created_at))
+            .join(Service, Service.id == Build.service_id)
+            .join(Project, Project.id == Service.project_id)
+            .where(Build.status.in_((BuildStatus.PENDING, BuildStatus.QUEUED)))
+            .group_by(Project.tenant_id)
+        )
+        result = await self.session.execute(query)
+        return {tenant_id: (count, oldest) for tenant_id, count, oldest in result}
+
+    async def stream_finished_before(
+        self,
+        cutoff: datetime,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[Build]:
+        """Iterate over all builds that finished before ``cutoff``."""
+        criteria = [Build.finished_at < cutoff]
+        async for build in self.stream(chunk_size=chunk_size, criteria=criteria):
+            yield build
+
+    async def stream_by_tenant(self, tenant_id: str, chunk_size: int = 1000) -> AsyncIterator[Build]:
+        """Iterate over all builds of a tenant's services."""
+        criteria = [Build.service_id.in_(select_tenant_service_ids(tenant_id))]
+        async for build in self.stream(chunk_size=chunk_size, criteria=criteria):
+            yield build
@@ -0,0 +1,322 @@
+"""Build log repository."""
+
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator
+
+from sqlalchemy import (
+    BigInteger,
+    String,
+    Text,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import log_archive
+from core.log_archive import LogStorage
+from models.base import BuildStatus, generate_uuid
+from models.build import Build
+from models.build_log import BuildLogArchive, BuildLogChunk
+from models.project import Project
+from models.service import Service
+from repositories.base import BaseRepository, ConflictError
+
+# A build whose status is one of these receives no more log output
+FINISHED_BUILD_STATUSES = (BuildStatus.SUCCESS, BuildStatus.FAILED, BuildStatus.CANCELLED)
+
+
+class BuildLogSlice:
+    """Log output read from an offset, with the offset to resume from.
+
+    ``archived`` is set when the output came from the archive tier, which
+    means the build is finished and nothing more will be appended.
+    """
+
+    def __init__(self, content: str, offset: int, next_offset: int, archived: bool = False):
+        self.content = content
+        self.offset = offset
+        self.next_offset = next_offset
+        self.archived = archived
+
+
+class BuildLogRepository(BaseRepository[BuildLogChunk]):
+    """Append-only store for build output.
+
+    Each append is one INSERT of a new chunk; existing chunks are never
+    rewritten. Appends for a build are expected to come from a single
+    writer, the unique ``(build_id, seq)`` index rejects interleaved ones.
+    """
+
+    model = BuildLogChunk
+
+    def __init__(self, session: AsyncSession, storage: LogStorage | None = None):
+        super().__init__(session)
+        self._storage = storage
+
+    @property
+    def storage(self) -> LogStorage:
+        """Storage of the archive tier, read once a build's chunks are archived."""
+        if self._storage is None:
+            self._storage = log_archive.get_log_storage()
+        return self._storage
+
+    async def append(self, build_id: str, content: str) -> BuildLogChunk | None:
+        """Append output to a build's log in a single INSERT ... SELECT.
+
+        The sequence number and offsets are taken from the build's last chunk
+        in the same statement. Returns None when there is nothing to append.
+        """
+        if not content:
+            return None
+
+        def last_chunk(column):
+            return (
+                select(column)
+                .where(BuildLogChunk.build_id == build_id)
+                .order_by(BuildLogChunk.seq.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
+
+        start_offset = func.coalesce(last_chunk(BuildLogChunk.end_offset), 0)
+        rows = select(
+            literal(generate_uuid(), String(36)),
+            literal(build_id, String(36)),
+            func.coalesce(last_chunk(BuildLogChunk.seq) + 1, 0),
+            start_offset,
+            start_offset + literal(len(content), BigInteger),
+            literal(content, Text),
+        )
+        statement = (
+            insert(BuildLogChunk)
+            .from_select(
+                ["id", "build_id", "seq", "start_offset", "end_offset", "content"], rows
+            )
+            .returning(BuildLogChunk)
+        )
+        query = select(BuildLogChunk).from_statement(statement)
+        try:
+            result = await self.session.execute(query)
+        except IntegrityError as e:
+            await self.session.rollback()
+            raise ConflictError(str(e.orig)) from e
+        return result.scalar_one()
+
+    async def read(
+        self,
+        build_id: str,
+        offset: int = 0,
+        max_chunks: int | None = None,
+    ) -> BuildLogSlice:
+        """Read a build's output from a character offset.
+
+        Only chunks ending after ``offset`` are fetched. ``max_chunks`` bounds
+        how much is returned at once; continue from ``next_offset``.
+
+        Once the build's log is archived its chunks are gone, and the rest
+        of the output from ``offset`` is read from the archive instead.
+        """
+        query = (
+            select(BuildLogChunk.start_offset, BuildLogChunk.content)
+            .where(
+                BuildLogChunk.build_id == build_id,
+                BuildLogChunk.end_offset > offset,
+            )
+            .order_by(BuildLogChunk.seq)
+        )
+        if max_chunks is not None:
+            query = query.limit(max_chunks)
+        result = await self.session.execute(query)
+        rows = result.all()
+        if not rows:
+            archived = await BuildLogArchiveRepository(self.session, self.storage).read_all(
+                build_id
+            )
+            if archived is not None:
+                content = archived[offset:]
+                return BuildLogSlice(content, offset, offset + len(content), archived=True)
+        parts = [row.content[max(offset - row.start_offset, 0):] for row in rows]
+        content = "".join(parts)
+        return BuildLogSlice(content, offset, offset + len(content))
+
+    async def read_all(self, build_id: str) -> str | None:
+        """Read a build's whole output, or None if nothing was ever appended."""
+        query = (
+            select(BuildLogChunk.content)
+            .where(BuildLogChunk.build_id == build_id)
+            .order_by(BuildLogChunk.seq)
+        )
+        result = await self.session.execute(query)
+        parts = list(result.scalars().all())
+        if not parts:
+            return None
+        return "".join(parts)
+
+    async def follow(
+        self,
+        build_id: str,
+        offset: int = 0,
+        poll_interval: float = 1.0,
+    ) -> AsyncIterator[str]:
+        """Yield a build's output as it is appended, until the build finishes.
+
+        Polls for chunks past the last offset read. Once the build has
+        finished (or no longer exists) the remaining output is yielded and
+        the iteration ends; for an archived build that is on the first read.
+
+        The session's transaction is ended before every yield and sleep, so
+        its connection goes back to the pool while the client reads or the
+        build runs. Use a session dedicated to following.
+        """
+        while True:
+            log_slice = await self.read(build_id, offset)
+            if log_slice.archived:
+                await self.session.rollback()
+                if log_slice.content:
+                    yield log_slice.content
+                return
+            if log_slice.content:
+                await self.session.rollback()
+                offset = log_slice.next_offset
+                yield log_slice.content
+                continue
+
+            result = await self.session.execute(select(Build.status).where(Build.id == build_id))
+            status = result.scalar_one_or_none()
+            if status is None or status in FINISHED_BUILD_STATUSES:
+                # Output appended between the read and the status check
+                log_slice = await self.read(build_id, offset)
+                await self.session.rollback()
+                if log_slice.content:
+                    yield log_slice.content
+                return
+
+            await self.session.rollback()
+            await asyncio.sleep(poll_interval)
+
+
+class BuildLogArchiveRepository(BaseRepository[BuildLogArchive]):
+    """Compressed cold storage tier for the logs of finished builds.
+
+    Archiving moves a build's log out of the database into ``storage`` and
+    drops its chunks and legacy ``Build.logs`` value; reads go through the
+    archive's block index.
+    """
+
+    model = BuildLogArchive
+
+    def __init__(self, session: AsyncSession, storage: LogStorage):
+        super().__init__(session)
+        self.storage = storage
+
+    async def get_by_build(self, build_id: str) -> BuildLogArchive | None:
+        """Get the archive of a build's log."""
+        query = select(BuildLogArchive).where(BuildLogArchive.build_id == build_id)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def read_all(self, build_id: str) -> str | None:
+        """Read a whole archived log, or None if the build is not archived."""
+        archive = await self.get_by_build(build_id)
+        if archive is None:
+            return None
+        return await asyncio.to_thread(
+            log_archive.read_all, self.storage, archive.storage_key, archive.block_index
+        )
+
+    async def read_lines(self, build_id: str, start: int, count: int) -> list[str] | None:
+        """Read a line range of an archived log, or None if the build is not archived."""
+        archive = await self.get_by_build(build_id)
+        if archive is None:
+            return None
+        return await asyncio.to_thread(
+            log_archive.read_lines, self.storage, archive.storage_key, archive.block_index, start, count
+        )
+
+    async def find_archivable(self, finished_before: datetime, limit: int = 100) -> list[str]:
+        """Get ids of builds finished before a cutoff whose logs are still in the database."""
+        has_chunks = exists().where(BuildLogChunk.build_id == Build.id)
+        is_archived = exists().where(BuildLogArchive.build_id == Build.id)
+        query = (
+            select(Build.id)
+            .where(
+                Build.finished_at < finished_before,
+                or_(has_chunks, Build.logs.is_not(None)),
+                ~is_archived,
+            )
+            .order_by(Build.finished_at)
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def archive(self, build_id: str, block_lines: int = 1000) -> BuildLogArchive | None:
+        """Move a build's log into compressed storage.
+
+        Returns None when the build has no log. The caller commits; until
+        then the database copy stays authoritative and a rerun rewrites the
+        same storage key.
+        """
+        text = await BuildLogRepository(self.session).read_all(build_id)
+        if text is None:
+            result = await self.session.execute(select(Build.logs).where(Build.id == build_id))
+            text = result.scalar_one_or_none()
+        if text is None:
+            return None
+
+        data, index, line_count = await asyncio.to_thread(
+            log_archive.compress_log, text, block_lines
+        )
+        key = log_archive.archive_key(build_id)
+        await asyncio.to_thread(self.storage.write, key, data)
+
+        archive = BuildLogArchive(
+            build_id=build_id,
+            storage_key=key,
+            original_bytes=len(text.encode()),
+            compressed_bytes=len(data),
+            line_count=line_count,
+            block_index=index,
+        )
+        self.session.add(archive)
+        await self.session.execute(delete(BuildLogChunk).where(BuildLogChunk.build_id == build_id))
+        await self.session.execute(update(Build).where(Build.id == build_id).values(logs=None))
+        await self.session.flush()
+        return archive
+
+    async def storage_savings(self, tenant_id: str | None = None) -> list[dict[str, Any]]:
+        """Sum original and compressed log sizes of archived builds per tenant."""
+        query = (
+            select(
+                Project.tenant_id,
+                func.count(BuildLogArchive.id).label("archived_builds"),
+                func.sum(BuildLogArchive.original_bytes).label("original_bytes"),
+                func.sum(BuildLogArchive.compressed_bytes).label("compressed_bytes"),
+            )
+            .join(Build, BuildLogArchive.build_id == Build.id)
+            .join(Service, Build.service_id == Service.id)
+            .join(Project, Service.project_id == Project.id)
+            .group_by(Project.tenant_id)
+            .order_by(Project.tenant_id)
+        )
+        if tenant_id is not None:
+            query = query.where(Project.tenant_id == tenant_id)
+        result = await self.session.execute(query)
+        return [
+            {
+                "tenant_id": row.tenant_id,
+                "archived_builds": row.archived_builds,
+                "original_bytes": int(row.original_bytes),
+                "compressed_bytes": int(row.compressed_bytes),
+                "saved_bytes": int(row.original_bytes - row.compressed_bytes),
+            }
+            for row in result.all()
+        ]
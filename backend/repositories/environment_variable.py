@@ -1,18 +1,38 @@
 """Environment variable repository."""
 
-from typing import Any
+from typing import Any, AsyncIterator
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from models.base import generate_uuid
 from models.environment_variable import EnvironmentVariable
-from repositories.base import BaseRepository, PaginatedResult, PaginationParams, SortParams
+from repositories.base import (
+    BaseRepository,
+    ConflictError,
+    CountMode,
+    LoadProfile,
+    PaginatedResult,
+    PaginationParams,
+    SortParams,
+)
+from repositories.service import select_tenant_service_ids
+
+
+# Rows per INSERT statement, keeping bind parameters well under the driver limit
+BULK_CHUNK_SIZE = 1000
 
 
 class EnvironmentVariableRepository(BaseRepository[EnvironmentVariable]):
     """Repository for EnvironmentVariable entities."""
 
     model = EnvironmentVariable
+    load_profiles = {
+        LoadProfile.DETAIL: ["service"],
+        LoadProfile.FULL: ["service"],
+    }
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
@@ -23,19 +43,30 @@ class EnvironmentVariableRepository(BaseRepository[EnvironmentVariable]):
         is_secret: bool | None = None,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[EnvironmentVariable]:
         """List environment variables for a specific service."""
         filters: dict[str, Any] = {"service_id": service_id}
         if is_secret is not None:
             filters["is_secret"] = is_secret
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+        )
 
-    async def get_by_key(self, service_id: str, key: str) -> EnvironmentVariable | None:
+    async def get_by_key(
+        self, service_id: str, key: str, profile: LoadProfile | None = None
+    ) -> EnvironmentVariable | None:
         """Get environment variable by key for a service."""
         query = select(EnvironmentVariable).where(
             EnvironmentVariable.service_id == service_id,
             EnvironmentVariable.key == key,
         )
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
@@ -50,6 +81,16 @@ class EnvironmentVariableRepository(BaseRepository[EnvironmentVariable]):
         result = await self.session.execute(query)
         return result.scalar_one_or_none() is not None
 
+    async def stream_by_tenant(
+        self,
+        tenant_id: str,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[EnvironmentVariable]:
+        """Iterate over all environment variables of a tenant's services."""
+        criteria = [EnvironmentVariable.service_id.in_(select_tenant_service_ids(tenant_id))]
+        async for env_var in self.stream(chunk_size=chunk_size, criteria=criteria):
+            yield env_var
+
     async def upsert(
         self,
         service_id: str,
@@ -58,38 +99,101 @@ class EnvironmentVariableRepository(BaseRepository[EnvironmentVariable]):
         is_secret: bool = False,
     ) -> EnvironmentVariable:
         """Create or update an environment variable."""
-        existing = await self.get_by_key(service_id, key)
-        if existing:
-            return await self.update(existing.id, {"value": value, "is_secret": is_secret})
-        return await self.create({
-            "service_id": service_id,
-            "key": key,
-            "value": value,
-            "is_secret": is_secret,
-        })
+        env_vars = await self.bulk_upsert(
+            service_id, [{"key": key, "value": value, "is_secret": is_secret}]
+        )
+        return env_vars[0]
 
     async def delete_by_key(self, service_id: str, key: str) -> bool:
         """Delete environment variable by key."""
-        env_var = await self.get_by_key(service_id, key)
-        if env_var is None:
-            return False
-        await self.session.delete(env_var)
-        await self.session.flush()
-        return True
+        return await self.delete_by_keys(service_id, [key]) > 0
+
+    async def delete_by_keys(self, service_id: str, keys: list[str]) -> int:
+        """Delete environment variables by key in a single statement.
+
+        Returns the number of deleted variables.
+        """
+        if not keys:
+            return 0
+        query = delete(EnvironmentVariable).where(
+            EnvironmentVariable.service_id == service_id,
+            EnvironmentVariable.key.in_(set(keys)),
+        )
+        result = await self.session.execute(query)
+        self._clear_lookups()
+        return result.rowcount or 0
 
     async def bulk_create(
         self,
         service_id: str,
         variables: list[dict[str, Any]],
     ) -> list[EnvironmentVariable]:
-        """Bulk create environment variables for a service."""
-        created = []
-        for var in variables:
-            env_var = await self.create({
+        """Bulk create environment variables with one INSERT ... RETURNING per chunk."""
+        rows = self._bulk_rows(service_id, variables)
+        created: list[EnvironmentVariable] = []
+        try:
+            for start in range(0, len(rows), BULK_CHUNK_SIZE):
+                query = (
+                    insert(EnvironmentVariable)
+                    .values(rows[start:start + BULK_CHUNK_SIZE])
+                    .returning(EnvironmentVariable)
+                )
+                created.extend(await self._execute_returning(query))
+        except IntegrityError as e:
+            await self.session.rollback()
+            raise ConflictError(str(e.orig)) from e
+        return created
+
+    async def bulk_upsert(
+        self,
+        service_id: str,
+        variables: list[dict[str, Any]],
+    ) -> list[EnvironmentVariable]:
+        """Create or update environment variables in one statement per chunk.
+
+        Uses ``INSERT ... ON CONFLICT (service_id, key) DO UPDATE ... RETURNING``
+        against the ``ix_env_vars_service_key`` unique index. When a key is
+        given more than once, the last occurrence wins.
+        """
+        deduplicated = {var["key"]: var for var in variables}
+        rows = self._bulk_rows(service_id, list(deduplicated.values()))
+        upserted: list[EnvironmentVariable] = []
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            query = pg_insert(EnvironmentVariable).values(rows[start:start + BULK_CHUNK_SIZE])
+            query = query.on_conflict_do_update(
+                index_elements=[EnvironmentVariable.service_id, EnvironmentVariable.key],
+                set_={
+                    "value": query.excluded.value,
+                    "is_secret": query.excluded.is_secret,
+                    "updated_at": func.now(),
+                },
+            ).returning(EnvironmentVariable)
+            upserted.extend(await self._execute_returning(query))
+        return upserted
+
+    def _bulk_rows(
+        self,
+        service_id: str,
+        variables: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        """Build INSERT parameter rows for a list of variables."""
+        return [
+            {
+                "id": generate_uuid(),
                 "service_id": service_id,
                 "key": var["key"],
                 "value": var["value"],
                 "is_secret": var.get("is_secret", False),
-            })
-            created.append(env_var)
-        return created
+            }
+            for var in variables
+        ]
+
+    async def _execute_returning(self, statement: Any) -> list[EnvironmentVariable]:
+        """Execute an INSERT ... RETURNING and map the rows onto entities."""
+        query = (
+            select(EnvironmentVariable)
+            .from_statement(statement)
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
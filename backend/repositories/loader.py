@@ -0,0 +1,120 @@
+"""Request-scoped batching loader for entity lookups."""
+
+import asyncio
+from typing import Any
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import BATCH_LOADING_KEY
+
+# session.info keys holding the loaders of a session and the lock serializing them
+LOADERS_KEY = "batch_loaders"
+LOADER_LOCK_KEY = "batch_loader_lock"
+
+
+class BatchLoader:
+    """Coalesce lookups on one model column issued in the same event-loop tick.
+
+    Keys requested before the loop comes back to the loader are fetched with
+    a single ``WHERE column IN (...)`` query. Results, including misses, are
+    memoized until the model is written or the session rolls back.
+    """
+
+    def __init__(self, session: AsyncSession, model: type, column: str = "id"):
+        self.session = session
+        self.model = model
+        self.column = column
+        self._cache: dict[Any, Any] = {}
+        self._pending: dict[Any, asyncio.Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, key: Any) -> Any:
+        """Load the entity whose column equals ``key``, or None."""
+        if key in self._cache:
+            return self._cache[key]
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            future = loop.create_future()
+            self._pending[key] = future
+        # Shield so one cancelled caller does not fail the others in the batch
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: list[Any]) -> list[Any]:
+        """Load several entities with one query; results follow ``keys`` order."""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Any, entity: Any) -> None:
+        """Seed the memo with an entity loaded elsewhere."""
+        self._cache[key] = entity
+
+    def clear(self) -> None:
+        """Forget all memoized results."""
+        self._cache.clear()
+
+    def _dispatch(self) -> None:
+        """Start fetching every key queued since the last dispatch."""
+        batch, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._fetch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: dict[Any, asyncio.Future]) -> None:
+        """Run one IN query for a batch and resolve its futures."""
+        column = getattr(self.model, self.column)
+        try:
+            async with _session_lock(self.session):
+                result = await self.session.execute(
+                    select(self.model).where(column.in_(list(batch)))
+                )
+                found = {getattr(entity, self.column): entity for entity in result.scalars()}
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for key, future in batch.items():
+            entity = found.get(key)
+            self._cache[key] = entity
+            if not future.done():
+                future.set_result(entity)
+
+
+def _session_lock(session: AsyncSession) -> asyncio.Lock:
+    """Get the lock that keeps loaders from using a session concurrently."""
+    lock = session.info.get(LOADER_LOCK_KEY)
+    if lock is None:
+        lock = session.info[LOADER_LOCK_KEY] = asyncio.Lock()
+    return lock
+
+
+def batching_enabled(session: AsyncSession) -> bool:
+    """Check whether lookups on this session should go through loaders."""
+    return bool(session.info.get(BATCH_LOADING_KEY))
+
+
+def get_loader(session: AsyncSession, model: type, column: str = "id") -> BatchLoader:
+    """Get the loader for ``model.column`` bound to ``session``, creating it once."""
+    loaders: dict[tuple[type, str], BatchLoader] = session.info.setdefault(LOADERS_KEY, {})
+    loader = loaders.get((model, column))
+    if loader is None:
+        loader = loaders[(model, column)] = BatchLoader(session, model, column)
+    return loader
+
+
+def clear_loaders(session: AsyncSession, model: type) -> None:
+    """Drop memoized lookups for ``model`` after it was written."""
+    for (loaded_model, _), loader in session.info.get(LOADERS_KEY, {}).items():
+        if loaded_model is model:
+            loader.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_after_rollback(session: Session) -> None:
+    # A rollback expires every instance; memoized ones would lazy load on access
+    for loader in session.info.get(LOADERS_KEY, {}).values():
+        loader.clear()
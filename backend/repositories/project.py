@@ -1,19 +1,34 @@
 """Project repository."""
 
-from typing import Any
+from typing import Any, Sequence
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.project import Project
-from repositories.base import BaseRepository, PaginatedResult, PaginationParams, SortParams
+from repositories.base import (
+    BaseRepository,
+    CountMode,
+    LoadProfile,
+    PaginatedResult,
+    PaginationParams,
+    SortParams,
+)
 
 
 class ProjectRepository(BaseRepository[Project]):
     """Repository for Project entities."""
 
     model = Project
-    eager_load = ["services"]
+    load_profiles = {
+        LoadProfile.SUMMARY: [],
+        LoadProfile.DETAIL: ["services"],
+        LoadProfile.FULL: [
+            "tenant",
+            "services.environment_variables",
+            "services.webhooks",
+        ],
+    }
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
@@ -23,17 +38,30 @@ class ProjectRepository(BaseRepository[Project]):
         tenant_id: str,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
+        columns: Sequence[str] | None = None,
     ) -> PaginatedResult[Project]:
         """List projects for a specific tenant."""
         filters: dict[str, Any] = {"tenant_id": tenant_id}
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+            columns=columns,
+        )
 
-    async def get_by_name(self, name: str, tenant_id: str) -> Project | None:
+    async def get_by_name(
+        self, name: str, tenant_id: str, profile: LoadProfile | None = None
+    ) -> Project | None:
         """Get project by name within a tenant."""
         query = select(Project).where(
             Project.name == name,
             Project.tenant_id == tenant_id,
         )
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
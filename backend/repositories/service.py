@@ -1,43 +1,87 @@
 """Service repository."""
 
-from typing import Any
+from typing import Any, AsyncIterator, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Select, and_, case, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.base import ServiceStatus
+from models.project import Project
 from models.service import Service
-from repositories.base import BaseRepository, PaginatedResult, PaginationParams, SortParams
+from repositories.base import (
+    BaseRepository,
+    CountMode,
+    LoadProfile,
+    PaginatedResult,
+    PaginationParams,
+    SortParams,
+)
+
+
+def select_tenant_service_ids(tenant_id: str) -> Select:
+    """Select the ids of all services belonging to a tenant."""
+    return (
+        select(Service.id)
+        .join(Project, Service.project_id == Project.id)
+        .where(Project.tenant_id == tenant_id)
+    )
 
 
 class ServiceRepository(BaseRepository[Service]):
     """Repository for Service entities."""
 
     model = Service
-    eager_load = ["builds", "environment_variables"]
+    load_profiles = {
+        LoadProfile.SUMMARY: [],
+        LoadProfile.DETAIL: ["environment_variables", "webhooks"],
+        LoadProfile.FULL: ["project", "builds", "environment_variables", "webhooks"],
+    }
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
 
+    async def get_by_id(
+        self, entity_id: str, profile: LoadProfile | None = None
+    ) -> Service | None:
+        """Get a service by ID, through the entity cache when no profile is given."""
+        if profile is None:
+            return await self._read_through(
+                f"id:{entity_id}", lambda: super(ServiceRepository, self).get_by_id(entity_id)
+            )
+        return await super().get_by_id(entity_id, profile)
+
     async def list_by_project(
         self,
         project_id: str,
         status: ServiceStatus | None = None,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
+        columns: Sequence[str] | None = None,
     ) -> PaginatedResult[Service]:
         """List services for a specific project."""
         filters: dict[str, Any] = {"project_id": project_id}
         if status:
             filters["status"] = status
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+            columns=columns,
+        )
 
-    async def get_by_name(self, name: str, project_id: str) -> Service | None:
+    async def get_by_name(
+        self, name: str, project_id: str, profile: LoadProfile | None = None
+    ) -> Service | None:
         """Get service by name within a project."""
         query = select(Service).where(
             Service.name == name,
             Service.project_id == project_id,
         )
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
@@ -46,18 +90,138 @@ class ServiceRepository(BaseRepository[Service]):
         status: ServiceStatus,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[Service]:
         """List services by status."""
         filters: dict[str, Any] = {"status": status}
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+        )
 
     async def update_status(self, service_id: str, status: ServiceStatus) -> Service:
         """Update service status."""
-        return await self.update(service_id, {"status": status})
+        return await self.update_returning(service_id, {"status": status})
 
     async def get_running_services(
         self,
         pagination: PaginationParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[Service]:
         """Get all running services."""
-        return await self.list_by_status(ServiceStatus.RUNNING, pagination=pagination)
+        return await self.list_by_status(
+            ServiceStatus.RUNNING,
+            pagination=pagination,
+            count_mode=count_mode,
+            profile=profile,
+        )
+
+    async def get_health_targets(self, service_ids: Sequence[str]) -> list[dict[str, Any]]:
+        """Get the id, port and status of each service, for health checks."""
+        if not service_ids:
+            return []
+        query = select(Service.id, Service.port, Service.status).where(
+            Service.id.in_(service_ids)
+        )
+        result = await self.session.execute(query)
+        return [dict(row) for row in result.mappings()]
+
+    async def list_monitored_ids(self, limit: int, after: str | None = None) -> list[str]:
+        """Get ids of the services the health monitor checks, in id order after ``after``.
+
+        These are the running services, and the failed ones the monitor
+        failed itself, which it marks running again once they recover.
+        """
+        query = (
+            select(Service.id)
+            .where(
+                or_(
+                    Service.status == ServiceStatus.RUNNING,
+                    and_(Service.status == ServiceStatus.FAILED, Service.health_check_failures > 0),
+                )
+            )
+            .order_by(Service.id)
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.where(Service.id > after)
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def record_health_checks(
+        self,
+        healthy: Sequence[str],
+        unhealthy: Sequence[str],
+        threshold: int,
+    ) -> tuple[list[str], list[str]]:
+        """Count health check results and change statuses, one UPDATE per outcome.
+
+        A running service is marked failed after ``threshold`` consecutive
+        failed checks; a service failed that way is marked running again
+        on its first passing check. Services in any other status, e.g.
+        mid-deploy, are left alone.
+
+        Returns:
+            Ids of the services marked failed, and of those recovered
+        """
+        changed: list[str] = []
+        failed: list[str] = []
+        recovered: list[str] = []
+        if unhealthy:
+            failures = Service.health_check_failures + 1
+            query = (
+                update(Service)
+                .where(Service.id.in_(unhealthy), Service.status == ServiceStatus.RUNNING)
+                .values(
+                    health_check_failures=failures,
+                    status=case(
+                        (failures >= threshold, ServiceStatus.FAILED), else_=Service.status
+                    ),
+                )
+                .returning(Service.id, Service.status)
+            )
+            rows = (await self.session.execute(query)).all()
+            changed += [row.id for row in rows]
+            failed = [row.id for row in rows if row.status == ServiceStatus.FAILED]
+        if healthy:
+            query = (
+                update(Service)
+                .where(
+                    Service.id.in_(healthy),
+                    Service.status == ServiceStatus.FAILED,
+                    Service.health_check_failures > 0,
+                )
+                .values(status=ServiceStatus.RUNNING, health_check_failures=0)
+                .returning(Service.id)
+            )
+            recovered = list((await self.session.execute(query)).scalars().all())
+            query = (
+                update(Service)
+                .where(
+                    Service.id.in_(healthy),
+                    Service.status == ServiceStatus.RUNNING,
+                    Service.health_check_failures > 0,
+                )
+                .values(health_check_failures=0)
+                .returning(Service.id)
+            )
+            changed += recovered + list((await self.session.execute(query)).scalars().all())
+        for service_id in changed:
+            await self._entity_changed(service_id)
+        return failed, recovered
+
+    async def stream_running(self, chunk_size: int = 1000) -> AsyncIterator[Service]:
+        """Iterate over all running services."""
+        async for service in self.stream({"status": ServiceStatus.RUNNING}, chunk_size):
+            yield service
+
+    async def stream_by_tenant(self, tenant_id: str, chunk_size: int = 1000) -> AsyncIterator[Service]:
+        """Iterate over all services of a tenant."""
+        criteria = [Service.id.in_(select_tenant_service_ids(tenant_id))]
+        async for service in self.stream(chunk_size=chunk_size, criteria=criteria):
+            yield service
@@ -5,21 +5,26 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from models.team import Team
-from repositories.base import BaseRepository
+from repositories.base import BaseRepository, LoadProfile
 
 
 class TeamRepository(BaseRepository[Team]):
     """Repository for Team entities."""
 
     model = Team
-    eager_load = ["members"]
+    load_profiles = {
+        LoadProfile.SUMMARY: [],
+        LoadProfile.DETAIL: ["members"],
+        LoadProfile.FULL: ["members.user"],
+    }
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    async def get_by_name(self, name: str) -> Team | None:
+    async def get_by_name(self, name: str, profile: LoadProfile | None = None) -> Team | None:
         """Get team by name."""
         query = select(Team).where(Team.name == name)
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
@@ -1,19 +1,134 @@
 """Team member repository."""
 
+import logging
+import os
 from typing import Any
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.cache import LRUCache, run_after_commit
 from models.base import TeamMemberRole
 from models.team_member import TeamMember
-from repositories.base import BaseRepository, PaginatedResult, PaginationParams, SortParams
+from repositories.base import (
+    BaseRepository,
+    CountMode,
+    LoadProfile,
+    PaginatedResult,
+    PaginationParams,
+    SortParams,
+)
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+# Version names: one per user, and one covering everybody
+ALL_USERS = "*"
+# Version keys outlive any cached entry by far; an expired key reads as 0
+VERSION_TTL = 86400
+
+Versions = tuple[int, int]
+
+
+class MembershipCache:
+    """Team roles cached per process, invalidated across processes.
+
+    Every membership write bumps a version for its user in Redis, once
+    straight away and again after commit. A cached role carries the
+    versions it was read under and is used only while they are current,
+    so a revoked role stops being granted by every process as soon as the
+    change commits, at the cost of one Redis round trip per check. When
+    Redis cannot be reached, roles are read from the database. Without a
+    Redis URL versions are kept in this process, which only suits a single
+    process.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 50000,
+        ttl: float = 10.0,
+        redis_url: str | None = None,
+        prefix: str = "membership:",
+    ):
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self._redis: Any = None
+        self._versions: dict[str, int] = {}
+
+    def _client(self) -> Any:
+        """Get the Redis client, creating it on first use."""
+        if self.redis_url and self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    async def versions(self, user_id: str) -> Versions | None:
+        """Get the current versions for a user's roles, or None if they cannot be read."""
+        client = self._client()
+        if client is None:
+            return self._versions.get(ALL_USERS, 0), self._versions.get(user_id, 0)
+        try:
+            values = await client.mget(self.prefix + ALL_USERS, self.prefix + user_id)
+        except Exception as exc:
+            logger.warning("Membership version read failed for %s: %s", user_id, exc)
+            return None
+        return int(values[0] or 0), int(values[1] or 0)
+
+    def get(self, team_id: str, user_id: str, versions: Versions | None) -> Any:
+        """Get a cached role (None for non-members) read under ``versions``, or ``_MISSING``."""
+        entry = self.local.get((team_id, user_id))
+        if entry is None or versions is None or entry[0] != versions:
+            return _MISSING
+        return entry[1]
+
+    def set(
+        self, team_id: str, user_id: str, versions: Versions | None, role: TeamMemberRole | None
+    ) -> None:
+        """Cache a role read from the database after ``versions`` were read."""
+        if versions is not None:
+            self.local.set((team_id, user_id), (versions, role))
+
+    async def invalidate(self, user_id: str | None) -> None:
+        """Invalidate a user's cached roles, or everybody's when ``user_id`` is None."""
+        name = ALL_USERS if user_id is None else user_id
+        client = self._client()
+        if client is None:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.incr(self.prefix + name)
+                pipe.expire(self.prefix + name, VERSION_TTL)
+                await pipe.execute()
+        except Exception as exc:
+            # Processes keep serving the old role until their entries expire
+            logger.warning("Membership invalidation failed for %s: %s", name, exc)
+
+    def clear(self) -> None:
+        """Drop this process's entries and local versions."""
+        self.local.clear()
+        self._versions.clear()
+
+
+_role_cache = MembershipCache(
+    maxsize=int(os.getenv("MEMBERSHIP_CACHE_MAX_SIZE", "50000")),
+    ttl=float(os.getenv("MEMBERSHIP_CACHE_TTL", "10")),
+    redis_url=os.getenv("MEMBERSHIP_CACHE_REDIS_URL", os.getenv("REDIS_URL")),
+)
 
 
 class TeamMemberRepository(BaseRepository[TeamMember]):
     """Repository for TeamMember entities."""
 
     model = TeamMember
+    load_profiles = {
+        LoadProfile.SUMMARY: [],
+        LoadProfile.DETAIL: ["user"],
+        LoadProfile.FULL: ["user", "team"],
+    }
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
@@ -24,22 +139,38 @@ class TeamMemberRepository(BaseRepository[TeamMember]):
         role: TeamMemberRole | None = None,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[TeamMember]:
         """List team members for a specific team."""
         filters: dict[str, Any] = {"team_id": team_id}
         if role:
             filters["role"] = role
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+        )
 
     async def list_by_user(
         self,
         user_id: str,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[TeamMember]:
         """List team memberships for a specific user."""
         filters: dict[str, Any] = {"user_id": user_id}
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+        )
 
     async def get_membership(self, team_id: str, user_id: str) -> TeamMember | None:
         """Get membership for a user in a team."""
@@ -50,15 +181,46 @@ class TeamMemberRepository(BaseRepository[TeamMember]):
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
+    async def get_role(self, team_id: str, user_id: str) -> TeamMemberRole | None:
+        """Get a user's role in a team, or None if not a member.
+
+        Served from the role cache; a miss selects only the role.
+        """
+        versions = await _role_cache.versions(user_id)
+        role = _role_cache.get(team_id, user_id, versions)
+        if role is _MISSING:
+            query = select(TeamMember.role).where(
+                TeamMember.team_id == team_id,
+                TeamMember.user_id == user_id,
+            )
+            result = await self.session.execute(query)
+            role = result.scalar_one_or_none()
+            _role_cache.set(team_id, user_id, versions, role)
+        return role
+
+    async def get_user_roles(self, user_id: str) -> dict[str, TeamMemberRole]:
+        """Get a user's role in every team in one query, priming the role cache."""
+        versions = await _role_cache.versions(user_id)
+        query = select(TeamMember.team_id, TeamMember.role).where(TeamMember.user_id == user_id)
+        result = await self.session.execute(query)
+        roles = {team_id: role for team_id, role in result.all()}
+        for team_id, role in roles.items():
+            _role_cache.set(team_id, user_id, versions, role)
+        return roles
+
     async def is_member(self, team_id: str, user_id: str) -> bool:
         """Check if user is a member of team."""
-        membership = await self.get_membership(team_id, user_id)
-        return membership is not None
+        return await self.get_role(team_id, user_id) is not None
 
     async def has_role(self, team_id: str, user_id: str, role: TeamMemberRole) -> bool:
         """Check if user has a specific role in team."""
-        membership = await self.get_membership(team_id, user_id)
-        return membership is not None and membership.role == role
+        return await self.get_role(team_id, user_id) == role
+
+    async def create(self, data: dict[str, Any]) -> TeamMember:
+        """Add a member to a team."""
+        membership = await super().create(data)
+        await self._roles_changed(membership.user_id)
+        return membership
 
     async def update_role(self, team_id: str, user_id: str, role: TeamMemberRole) -> TeamMember:
         """Update a member's role in a team."""
@@ -75,4 +237,20 @@ class TeamMemberRepository(BaseRepository[TeamMember]):
             return False
         await self.session.delete(membership)
         await self.session.flush()
+        await self._roles_changed(user_id)
         return True
+
+    async def _roles_changed(self, user_id: str | None) -> None:
+        """Invalidate cached roles now and again once the transaction commits.
+
+        Other sessions can cache the old role between the write and the
+        commit; the second invalidation drops it.
+        """
+        await _role_cache.invalidate(user_id)
+        run_after_commit(self.session, lambda: _role_cache.invalidate(user_id))
+
+    async def _entity_changed(self, entity_id: str) -> None:
+        """Drop cached roles after a membership was updated or deleted by id."""
+        await super()._entity_changed(entity_id)
+        # Only the id is known here; membership writes are rare, so start over
+        await self._roles_changed(None)
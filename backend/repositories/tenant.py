@@ -1,23 +1,40 @@
 """Tenant repository."""
 
+from typing import Iterable
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.tenant import Tenant
-from repositories.base import BaseRepository
+from repositories.base import BaseRepository, LoadProfile
+from repositories.loader import batching_enabled, get_loader
 
 
 class TenantRepository(BaseRepository[Tenant]):
     """Repository for Tenant entities."""
 
     model = Tenant
+    load_profiles = {
+        LoadProfile.SUMMARY: [],
+        LoadProfile.DETAIL: ["projects"],
+        LoadProfile.FULL: ["users", "projects.services"],
+    }
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    async def get_by_slug(self, slug: str) -> Tenant | None:
+    async def get_by_slug(self, slug: str, profile: LoadProfile | None = None) -> Tenant | None:
         """Get tenant by slug."""
+        if profile is None:
+            return await self._read_through(f"slug:{slug}", lambda: self._fetch_by_slug(slug))
+        return await self._fetch_by_slug(slug, profile)
+
+    async def _fetch_by_slug(self, slug: str, profile: LoadProfile | None = None) -> Tenant | None:
+        """Load a tenant by slug from the database."""
+        if profile is None and batching_enabled(self.session):
+            return await get_loader(self.session, Tenant, "slug").load(slug)
         query = select(Tenant).where(Tenant.slug == slug)
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
@@ -25,3 +42,16 @@ class TenantRepository(BaseRepository[Tenant]):
         """Check if a slug already exists."""
         tenant = await self.get_by_slug(slug)
         return tenant is not None
+
+    async def get_build_limits(
+        self, tenant_ids: Iterable[str]
+    ) -> dict[str, tuple[float, int | None]]:
+        """Get the build weight and concurrency cap of each tenant."""
+        ids = list(tenant_ids)
+        if not ids:
+            return {}
+        query = select(Tenant.id, Tenant.build_weight, Tenant.max_concurrent_builds).where(
+            Tenant.id.in_(ids)
+        )
+        result = await self.session.execute(query)
+        return {row.id: (row.build_weight, row.max_concurrent_builds) for row in result}
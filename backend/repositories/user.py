@@ -6,30 +6,58 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.user import User
-from repositories.base import BaseRepository, PaginatedResult, PaginationParams, SortParams
+from repositories.base import (
+    BaseRepository,
+    CountMode,
+    LoadProfile,
+    PaginatedResult,
+    PaginationParams,
+    SortParams,
+)
 
 
 class UserRepository(BaseRepository[User]):
     """Repository for User entities."""
 
     model = User
+    load_profiles = {
+        LoadProfile.SUMMARY: [],
+        LoadProfile.DETAIL: ["team_memberships"],
+        LoadProfile.FULL: ["tenant", "team_memberships.team"],
+    }
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    async def get_by_email(self, email: str, tenant_id: str | None = None) -> User | None:
-        """Get user by email, optionally filtered by tenant."""
+    async def get_by_email(
+        self,
+        email: str,
+        tenant_id: str | None = None,
+        profile: LoadProfile | None = None,
+    ) -> User | None:
+        """Get user by email, optionally filtered by tenant.
+
+        Not served through the entity cache, which would copy
+        ``password_hash`` into the shared Redis tier.
+        """
         query = select(User).where(User.email == email)
         if tenant_id:
             query = query.where(User.tenant_id == tenant_id)
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
-    async def get_by_username(self, username: str, tenant_id: str | None = None) -> User | None:
+    async def get_by_username(
+        self,
+        username: str,
+        tenant_id: str | None = None,
+        profile: LoadProfile | None = None,
+    ) -> User | None:
         """Get user by username, optionally filtered by tenant."""
         query = select(User).where(User.username == username)
         if tenant_id:
             query = query.where(User.tenant_id == tenant_id)
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
@@ -39,12 +67,20 @@ class UserRepository(BaseRepository[User]):
         is_active: bool | None = None,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[User]:
         """List users for a specific tenant."""
         filters: dict[str, Any] = {"tenant_id": tenant_id}
         if is_active is not None:
             filters["is_active"] = is_active
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+        )
 
     async def email_exists(self, email: str, tenant_id: str, exclude_id: str | None = None) -> bool:
         """Check if email exists in tenant, optionally excluding a specific user."""
@@ -56,12 +92,12 @@ class UserRepository(BaseRepository[User]):
 
     async def activate(self, user_id: str) -> User:
         """Activate a user."""
-        return await self.update(user_id, {"is_active": True})
+        return await self.update_returning(user_id, {"is_active": True})
 
     async def deactivate(self, user_id: str) -> User:
         """Deactivate a user."""
-        return await self.update(user_id, {"is_active": False})
+        return await self.update_returning(user_id, {"is_active": False})
 
     async def verify(self, user_id: str) -> User:
         """Mark user as verified."""
-        return await self.update(user_id, {"is_verified": True})
+        return await self.update_returning(user_id, {"is_verified": True})
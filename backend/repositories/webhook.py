@@ -7,13 +7,24 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.base import WebhookProvider
 from models.webhook import Webhook
-from repositories.base import BaseRepository, PaginatedResult, PaginationParams, SortParams
+from repositories.base import (
+    BaseRepository,
+    CountMode,
+    LoadProfile,
+    PaginatedResult,
+    PaginationParams,
+    SortParams,
+)
 
 
 class WebhookRepository(BaseRepository[Webhook]):
     """Repository for Webhook entities."""
 
     model = Webhook
+    load_profiles = {
+        LoadProfile.DETAIL: ["service"],
+        LoadProfile.FULL: ["service"],
+    }
 
     def __init__(self, session: AsyncSession):
         super().__init__(session)
@@ -25,6 +36,8 @@ class WebhookRepository(BaseRepository[Webhook]):
         is_active: bool | None = None,
         pagination: PaginationParams | None = None,
         sort: SortParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[Webhook]:
         """List webhooks for a specific service."""
         filters: dict[str, Any] = {"service_id": service_id}
@@ -32,11 +45,18 @@ class WebhookRepository(BaseRepository[Webhook]):
             filters["provider"] = provider
         if is_active is not None:
             filters["is_active"] = is_active
-        return await self.list(filters=filters, pagination=pagination, sort=sort)
+        return await self.list(
+            filters=filters,
+            pagination=pagination,
+            sort=sort,
+            count_mode=count_mode,
+            profile=profile,
+        )
 
-    async def get_by_url(self, url: str) -> Webhook | None:
+    async def get_by_url(self, url: str, profile: LoadProfile | None = None) -> Webhook | None:
         """Get webhook by URL."""
         query = select(Webhook).where(Webhook.url == url)
+        query = self._apply_load_profile(query, profile)
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
@@ -44,18 +64,22 @@ class WebhookRepository(BaseRepository[Webhook]):
         self,
         service_id: str,
         pagination: PaginationParams | None = None,
+        count_mode: CountMode = CountMode.EXACT,
+        profile: LoadProfile | None = None,
     ) -> PaginatedResult[Webhook]:
         """List active webhooks for a service."""
         return await self.list_by_service(
             service_id=service_id,
             is_active=True,
             pagination=pagination,
+            count_mode=count_mode,
+            profile=profile,
         )
 
     async def activate(self, webhook_id: str) -> Webhook:
         """Activate a webhook."""
-        return await self.update(webhook_id, {"is_active": True})
+        return await self.update_returning(webhook_id, {"is_active": True})
 
     async def deactivate(self, webhook_id: str) -> Webhook:
         """Deactivate a webhook."""
-        return await self.update(webhook_id, {"is_active": False})
+        return await self.update_returning(webhook_id, {"is_active": False})
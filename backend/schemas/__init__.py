@@ -0,0 +1,9 @@
+"""Pydantic schemas for API responses."""
+
+from schemas.project import ProjectRead
+from schemas.service import ServiceRead
+
+__all__ = [
+    "ProjectRead",
+    "ServiceRead",
+]
@@ -0,0 +1,18 @@
+"""Project API schemas."""
+
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ProjectRead(BaseModel):
+    """Project as returned by the API."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    tenant_id: str
+    name: str
+    description: str | None = None
+    created_at: datetime
+    updated_at: datetime | None = None
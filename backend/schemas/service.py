@@ -0,0 +1,27 @@
+"""Service API schemas."""
+
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+from models.base import ServiceStatus
+
+
+class ServiceRead(BaseModel):
+    """Service as returned by the API."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    project_id: str
+    name: str
+    status: ServiceStatus
+    git_repo: str | None = None
+    git_branch: str
+    dockerfile_path: str
+    build_context: str
+    port: int | None = None
+    domain: str | None = None
+    image: str | None = None
+    created_at: datetime
+    updated_at: datetime | None = None
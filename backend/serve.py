@@ -0,0 +1,319 @@
+"""
+Pre-fork API server: a supervisor process running several uvicorn workers.
+
+The supervisor binds the listening socket and forks the workers, which all
+accept on it. Each worker imports the app after the fork, so workers share
+nothing but the socket: every one has its own event loop, database pools
+and caches. Database pools are sized per worker so that all workers
+together stay under ``DB_MAX_CONNECTIONS``, and metrics are merged through
+``METRICS_DIR`` (see ``core.worker_metrics``).
+
+Signals to the supervisor:
+    SIGHUP           rolling restart, replacing workers one at a time
+    SIGTERM, SIGINT  graceful shutdown, letting in-flight requests finish
+
+Usage:
+    python serve.py --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import argparse
+import logging
+import os
+import select
+import shutil
+import signal
+import socket
+import tempfile
+import time
+
+from core.worker_metrics import retire_worker
+
+logger = logging.getLogger("serve")
+
+# Worker processes; one per CPU unless set
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1
+# Postgres max_connections, and how many of them API workers leave free for
+# Celery workers, migrations and admin sessions
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", "20"))
+# Seconds a worker may take to start serving, and to drain requests when stopped
+WORKER_BOOT_TIMEOUT = float(os.getenv("WORKER_BOOT_TIMEOUT", "60"))
+WORKER_GRACEFUL_TIMEOUT = float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+# Workers whose resident memory exceeds this are replaced (0 disables)
+WORKER_MAX_MEMORY_MB = int(os.getenv("WORKER_MAX_MEMORY_MB", "500"))
+MEMORY_CHECK_INTERVAL = 10
+# Longest wait between attempts to start a worker that keeps failing
+MAX_RESPAWN_BACKOFF = 30
+
+
+def worker_pool_limits(
+    workers: int,
+    max_connections: int = DB_MAX_CONNECTIONS,
+    reserved: int = DB_RESERVED_CONNECTIONS,
+) -> tuple[int, int]:
+    """Get ``(pool_size, max_overflow)`` for each worker's database engines.
+
+    One worker more than configured is budgeted for, since a rolling restart
+    briefly runs a replacement next to the worker it replaces. The limits
+    apply to the primary and to each replica, as each is its own server.
+
+    Raises:
+        ValueError: If the budget leaves a worker no connection at all
+    """
+    per_worker = (max_connections - reserved) // (workers + 1)
+    if per_worker < 1:
+        raise ValueError(
+            f"{max_connections - reserved} database connections cannot be shared "
+            f"by {workers} workers"
+        )
+    # Same 2:3 split between persistent and overflow connections as the defaults
+    pool_size = max(1, per_worker * 2 // 5)
+    return pool_size, per_worker - pool_size
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Create the listening socket shared by every worker."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app: str, sock: socket.socket, ready_fd: int) -> int:
+    """Serve ``app`` (``"module:attribute"``) on ``sock`` in a forked worker.
+
+    Writes to ``ready_fd`` once the app has started. Returns the exit code.
+    """
+    import asyncio
+
+    import uvicorn
+
+    # Drop the supervisor's handlers; uvicorn installs its own for shutdown
+    for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+    config = uvicorn.Config(
+        app,
+        proxy_headers=True,
+        timeout_graceful_shutdown=WORKER_GRACEFUL_TIMEOUT,
+    )
+    server = uvicorn.Server(config)
+
+    async def serve() -> None:
+        task = asyncio.create_task(server.serve(sockets=[sock]))
+        while not server.started and not task.done():
+            await asyncio.sleep(0.05)
+        if server.started:
+            os.write(ready_fd, b"1")
+        os.close(ready_fd)
+        await task
+
+    asyncio.run(serve())
+    return 0 if server.started else 1
+
+
+class Supervisor:
+    """Keep ``workers`` worker processes serving on ``sock``."""
+
+    def __init__(self, app: str, sock: socket.socket, workers: int, metrics_dir: str):
+        self.app = app
+        self.sock = sock
+        self.target = workers
+        self.metrics_dir = metrics_dir
+        # Worker pid -> monotonic time it started serving
+        self.workers: dict[int, float] = {}
+        self._signals: list[int] = []
+        self._backoff = 0.0
+
+    def _on_signal(self, signum: int, frame: object) -> None:
+        self._signals.append(signum)
+
+    @property
+    def _stopping(self) -> bool:
+        return any(sig in (signal.SIGTERM, signal.SIGINT) for sig in self._signals)
+
+    def spawn(self) -> int | None:
+        """Fork a worker and wait until it serves; None if it failed to start."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            code = 1
+            try:
+                code = run_worker(self.app, self.sock, write_fd)
+            except BaseException:
+                logger.exception("Worker crashed")
+            finally:
+                os._exit(code)
+
+        os.close(write_fd)
+        try:
+            ready, _, _ = select.select([read_fd], [], [], WORKER_BOOT_TIMEOUT)
+            started = bool(ready) and os.read(read_fd, 1) == b"1"
+        finally:
+            os.close(read_fd)
+        if not started:
+            logger.error(f"Worker {pid} failed to start")
+            self.stop(pid)
+            return None
+        self.workers[pid] = time.monotonic()
+        logger.info(f"Worker {pid} serving")
+        return pid
+
+    def stop(self, *pids: int) -> None:
+        """Stop workers gracefully, killing those still running after the timeout."""
+        for pid in pids:
+            self.workers.pop(pid, None)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        remaining = set(pids)
+        deadline = time.monotonic() + WORKER_GRACEFUL_TIMEOUT + 5
+        while remaining:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+                    retire_worker(self.metrics_dir, pid)
+            if remaining and time.monotonic() > deadline:
+                for pid in remaining:
+                    logger.warning(f"Worker {pid} did not stop in time, killing it")
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                deadline = float("inf")
+            if remaining:
+                time.sleep(0.1)
+
+    def reap(self) -> None:
+        """Forget workers that exited on their own."""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if self.workers.pop(pid, None) is not None:
+                logger.error(f"Worker {pid} exited unexpectedly (status {status})")
+                retire_worker(self.metrics_dir, pid)
+
+    def scale(self) -> None:
+        """Start workers until ``target`` are serving, backing off on failures."""
+        while len(self.workers) < self.target and not self._stopping:
+            if self.spawn() is None:
+                self._backoff = min(max(self._backoff * 2, 1), MAX_RESPAWN_BACKOFF)
+                time.sleep(self._backoff)
+                return
+            self._backoff = 0.0
+
+    def replace(self, pid: int) -> bool:
+        """Start a new worker, then stop ``pid``; False if the new one failed."""
+        if self.spawn() is None:
+            return False
+        self.stop(pid)
+        return True
+
+    def rolling_restart(self) -> None:
+        """Replace every worker, one at a time, so capacity never drops."""
+        logger.info("Rolling restart")
+        for pid in list(self.workers):
+            if self._stopping:
+                return
+            if pid in self.workers and not self.replace(pid):
+                logger.error("Rolling restart aborted; remaining workers keep running")
+                return
+        logger.info("Rolling restart finished")
+
+    def check_memory(self) -> None:
+        """Replace workers using more than ``WORKER_MAX_MEMORY_MB``."""
+        if not WORKER_MAX_MEMORY_MB:
+            return
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        for pid in list(self.workers):
+            try:
+                with open(f"/proc/{pid}/statm") as f:
+                    rss_mb = int(f.read().split()[1]) * page_size / 2**20
+            except (OSError, ValueError, IndexError):
+                continue
+            if rss_mb > WORKER_MAX_MEMORY_MB:
+                logger.warning(f"Worker {pid} uses {rss_mb:.0f} MB, replacing it")
+                self.replace(pid)
+
+    def run(self) -> int:
+        """Supervise workers until SIGTERM or SIGINT. Returns the exit code."""
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._on_signal)
+
+        # The first worker checks or creates the schema alone; the others
+        # start once it serves and find the schema version current
+        if self.spawn() is None:
+            return 1
+        self.scale()
+
+        next_memory_check = time.monotonic() + MEMORY_CHECK_INTERVAL
+        while not self._stopping:
+            if signal.SIGHUP in self._signals:
+                self._signals.remove(signal.SIGHUP)
+                self.rolling_restart()
+            self.reap()
+            self.scale()
+            if time.monotonic() >= next_memory_check:
+                self.check_memory()
+                next_memory_check = time.monotonic() + MEMORY_CHECK_INTERVAL
+            time.sleep(0.5)
+
+        logger.info(f"Shutting down {len(self.workers)} workers")
+        self.stop(*self.workers)
+        return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [serve] %(message)s")
+
+    # Read by database.py in every worker
+    pool_size, max_overflow = worker_pool_limits(args.workers)
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+
+    metrics_dir = os.getenv("METRICS_DIR")
+    owns_metrics_dir = metrics_dir is None
+    if owns_metrics_dir:
+        metrics_dir = tempfile.mkdtemp(prefix="railway-api-metrics-")
+        os.environ["METRICS_DIR"] = metrics_dir
+    else:
+        os.makedirs(metrics_dir, exist_ok=True)
+        # Left over from a previous supervisor; its workers are gone
+        for name in os.listdir(metrics_dir):
+            if name.endswith(".json"):
+                os.unlink(os.path.join(metrics_dir, name))
+
+    logger.info(
+        f"Starting {args.workers} workers on {args.host}:{args.port} "
+        f"(database pool {pool_size} + {max_overflow} overflow per worker)"
+    )
+    sock = bind_socket(args.host, args.port)
+    try:
+        return Supervisor(args.app, sock, args.workers, metrics_dir).run()
+    finally:
+        sock.close()
+        if owns_metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,10 +3,21 @@ Celery tasks module.
 """
 
 from .example import add, long_running_task, process_deployment, monitor_service
+from .logs import archive_build_logs
+from .build import run_build
+from .deploy import deploy_build
+from .scheduler import schedule_builds
+from .monitor import monitor_services, monitor_shard
 
 __all__ = [
     "add",
     "long_running_task",
     "process_deployment",
     "monitor_service",
+    "archive_build_logs",
+    "run_build",
+    "deploy_build",
+    "schedule_builds",
+    "monitor_services",
+    "monitor_shard",
 ]
@@ -0,0 +1,341 @@
+"""
+Build pipeline tasks, run on the ``build`` queue.
+
+A build checks out the service's source, installs and tests it in
+throwaway containers while the image builds, then pushes the image. Steps run concurrently where the DAG
+allows (see ``core.pipeline``); a successful build queues its deploy.
+
+Installed dependencies are cached by service, toolchain and lockfile, and
+built images by commit, Dockerfile and build context (see
+``core.build_cache``); hits skip the install or the image build.
+"""
+
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any
+
+from celery import current_app, shared_task
+from celery.utils.log import get_task_logger
+
+from core.build_cache import (
+    BUILD_CACHE_REQUESTS,
+    BuildCache,
+    cache_key,
+    file_digest,
+    get_build_cache,
+)
+from core.pipeline import SKIPPED, SUCCESS, Pipeline, Step, StepFailed, run_pipeline
+from database import TaskSessionLocal
+from repositories.build import BuildRepository
+from tasks.deploy import deploy_build
+from tasks.pipeline import BUILD_REGISTRY, PipelineContext, load_context, run_command
+
+logger = get_task_logger(__name__)
+
+# Sent by name, since tasks.scheduler imports this module
+SCHEDULE_BUILDS_TASK = "tasks.scheduler.schedule_builds"
+
+# Per-step timeouts in seconds
+BUILD_CLONE_TIMEOUT = float(os.getenv("BUILD_CLONE_TIMEOUT", "300"))
+BUILD_INSTALL_TIMEOUT = float(os.getenv("BUILD_INSTALL_TIMEOUT", "900"))
+BUILD_IMAGE_TIMEOUT = float(os.getenv("BUILD_IMAGE_TIMEOUT", "1800"))
+BUILD_TEST_TIMEOUT = float(os.getenv("BUILD_TEST_TIMEOUT", "1800"))
+BUILD_RELEASE_TIMEOUT = float(os.getenv("BUILD_RELEASE_TIMEOUT", "600"))
+
+
+# Files deciding a toolchain's installed dependencies, by preference
+LOCKFILES = {
+    "node": ("package-lock.json", "package.json"),
+    "python": ("requirements.txt",),
+}
+# Directory the install step produces for a toolchain
+DEPENDENCY_DIRS = {"node": "node_modules", "python": ".venv"}
+# Images the install and test steps run in, by toolchain
+BUILD_IMAGES = {
+    "node": os.getenv("BUILD_NODE_IMAGE", "node:20"),
+    "python": os.getenv("BUILD_PYTHON_IMAGE", "python:3.11-slim"),
+}
+# Where the source is mounted in those containers; restored dependencies
+# (a venv's paths in particular) rely on it staying the same
+SANDBOX_WORKDIR = "/workspace"
+
+
+def _toolchain(source_dir: Path) -> str | None:
+    """Detect how to install and test the source, if at all."""
+    if (source_dir / "package.json").exists():
+        return "node"
+    if (source_dir / "requirements.txt").exists():
+        return "python"
+    return None
+
+
+def _lockfile_digest(source_dir: Path, toolchain: str) -> str:
+    for name in LOCKFILES[toolchain]:
+        path = source_dir / name
+        if path.exists():
+            return f"{name}:{file_digest(path)}"
+    return ""
+
+
+async def _record_cache(
+    context: PipelineContext,
+    kind: str,
+    key: str,
+    seconds: float,
+    cached: dict[str, Any] | None,
+) -> None:
+    """Record a cache hit (``cached`` is the entry's metadata) or miss on the build.
+
+    A hit's saving is the time the cached work took, less the restore.
+    """
+    BUILD_CACHE_REQUESTS.inc(kind=kind, result="miss" if cached is None else "hit")
+    value: dict[str, Any] = {"key": key, "hit": cached is not None, "seconds": round(seconds, 3)}
+    if cached is not None:
+        value["saved_seconds"] = round(max(0.0, cached.get("seconds", 0.0) - seconds), 3)
+    await context.recorder.record("cache", kind, value)
+
+
+def _store(cache: BuildCache, key: str, source: Path | None, meta: dict[str, Any]) -> None:
+    # A full disk or similar must not fail the build
+    try:
+        cache.store(key, source, meta)
+    except OSError as e:
+        logger.warning(f"Could not store build cache entry {key}: {e}")
+
+
+async def run_sandboxed(context: PipelineContext, step: str, toolchain: str, *argv: str) -> int:
+    """Run a command against the source in a throwaway container.
+
+    Install and test run code from the tenant's repository (package
+    scripts, test suites). In a container it sees the source and nothing
+    of the worker: not its environment, which holds the platform's
+    credentials, nor its files or processes. ``BUILD_WORKSPACE`` must be a
+    path the Docker daemon can mount.
+    """
+    name = f"build-{context.build_id}-{step}"
+    docker = [
+        "docker", "run", "--rm", "--name", name,
+        # Files written to the mounted source stay owned by the worker
+        "--user", f"{os.getuid()}:{os.getgid()}",
+        "-e", "HOME=/tmp", "-e", "CI=true",
+        "-v", f"{context.source_dir}:{SANDBOX_WORKDIR}", "-w", SANDBOX_WORKDIR,
+        BUILD_IMAGES[toolchain], *argv,
+    ]
+    try:
+        return await run_command(context, step, *docker)
+    except asyncio.CancelledError:
+        # Killing the docker client leaves the container running
+        process = await asyncio.create_subprocess_exec(
+            "docker", "rm", "-f", name,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+        )
+        await process.wait()
+        raise
+
+
+async def clone_repository(context: PipelineContext) -> None:
+    """Shallow-clone the service's branch, at the build's commit if it has one."""
+    if not context.git_repo:
+        raise StepFailed("Service has no git repository")
+    source = context.source_dir
+    await asyncio.to_thread(shutil.rmtree, source, True)
+    source.parent.mkdir(parents=True, exist_ok=True)
+    await run_command(
+        context, "clone", "git", "clone", "--depth", "1",
+        "--branch", context.git_branch, context.git_repo, str(source),
+    )
+    if context.commit_sha:
+        await run_command(
+            context, "clone", "git", "-C", str(source),
+            "fetch", "--depth", "1", "origin", context.commit_sha,
+        )
+        await run_command(
+            context, "clone", "git", "-C", str(source), "checkout", "--detach", context.commit_sha
+        )
+
+
+async def install_dependencies(context: PipelineContext) -> str | None:
+    """Install the source's dependencies for the test step."""
+    source = context.source_dir
+    toolchain = _toolchain(source)
+    if toolchain is None:
+        return SKIPPED
+    target = source / DEPENDENCY_DIRS[toolchain]
+
+    cache = get_build_cache()
+    key = None
+    if cache is not None:
+        digest = await asyncio.to_thread(_lockfile_digest, source, toolchain)
+        key = cache_key(
+            "dependencies", context.service_id, toolchain, BUILD_IMAGES[toolchain], digest
+        )
+        started = time.perf_counter()
+        cached = await asyncio.to_thread(cache.restore, key, target)
+        if cached is not None:
+            await context.recorder.log(f"[install] Restored {target.name} from the build cache\n")
+            await _record_cache(
+                context, "dependencies", key, time.perf_counter() - started, cached
+            )
+            return None
+
+    started = time.perf_counter()
+    if toolchain == "node":
+        command = "ci" if (source / "package-lock.json").exists() else "install"
+        await run_sandboxed(context, "install", toolchain, "npm", command)
+    else:
+        await run_sandboxed(context, "install", toolchain, "python", "-m", "venv", ".venv")
+        await run_sandboxed(
+            context, "install", toolchain, ".venv/bin/pip", "install", "-r", "requirements.txt"
+        )
+    seconds = time.perf_counter() - started
+
+    if key is not None:
+        await asyncio.to_thread(_store, cache, key, target, {"seconds": seconds})
+        await _record_cache(context, "dependencies", key, seconds, None)
+    return None
+
+
+async def run_tests(context: PipelineContext) -> str | None:
+    """Run the source's test suite, if it has one."""
+    source = context.source_dir
+    toolchain = _toolchain(source)
+    if toolchain == "node":
+        await run_sandboxed(context, "test", toolchain, "npm", "test", "--if-present")
+    elif toolchain == "python" and any((source / name).exists() for name in ("tests", "test")):
+        await run_sandboxed(context, "test", toolchain, ".venv/bin/python", "-m", "pytest", "-q")
+    else:
+        return SKIPPED
+    return None
+
+
+async def build_image(context: PipelineContext) -> None:
+    """Build the service's Docker image."""
+    source = context.source_dir
+    if not (source / context.dockerfile_path).exists():
+        raise StepFailed(f"{context.dockerfile_path} not found in the repository")
+
+    # Docker keeps image layers content-addressed itself, so the entry only
+    # names the image built for this input, which is reused while it exists
+    cache = get_build_cache()
+    key = None
+    if cache is not None and context.commit_sha:
+        key = cache_key(
+            "image", context.commit_sha, context.dockerfile_path, context.build_context
+        )
+        started = time.perf_counter()
+        entry = await asyncio.to_thread(cache.lookup, key)
+        cached = entry["meta"] if entry is not None else None
+        cached_tag = cached.get("image_tag") if cached is not None else None
+        if cached_tag is not None and await run_command(
+            context, "build", "docker", "image", "inspect", "--format", "{{.Id}}", cached_tag,
+            check=False,
+        ) == 0:
+            if cached_tag != context.image_tag:
+                await run_command(context, "build", "docker", "tag", cached_tag, context.image_tag)
+            await _record_cache(context, "image", key, time.perf_counter() - started, cached)
+            return
+
+    started = time.perf_counter()
+    await run_command(
+        context, "build", "docker", "build",
+        "-f", context.dockerfile_path, "-t", context.image_tag, context.build_context,
+        cwd=source,
+    )
+    seconds = time.perf_counter() - started
+
+    if key is not None:
+        meta = {"image_tag": context.image_tag, "seconds": seconds}
+        await asyncio.to_thread(_store, cache, key, None, meta)
+        await _record_cache(context, "image", key, seconds, None)
+
+
+async def release_image(context: PipelineContext) -> str | None:
+    """Push the image to the registry, when one is configured."""
+    if not BUILD_REGISTRY:
+        return SKIPPED
+    await run_command(context, "release", "docker", "push", context.image_tag)
+    return None
+
+
+# clone -> install -> test --\
+#       \-> build ------------+-> release
+BUILD_PIPELINE = Pipeline(
+    "build",
+    [
+        Step("clone", clone_repository, timeout=BUILD_CLONE_TIMEOUT),
+        Step("install", install_dependencies, ("clone",), timeout=BUILD_INSTALL_TIMEOUT),
+        Step("test", run_tests, ("install",), timeout=BUILD_TEST_TIMEOUT),
+        Step("build", build_image, ("clone",), timeout=BUILD_IMAGE_TIMEOUT),
+        Step("release", release_image, ("build", "test"), timeout=BUILD_RELEASE_TIMEOUT),
+    ],
+)
+
+
+async def run_build_pipeline(build_id: str, pipeline: Pipeline = BUILD_PIPELINE) -> dict[str, Any]:
+    """Run a build's pipeline and record the result on the build.
+
+    A build that is no longer pending (superseded, or claimed by another
+    delivery of its task) is skipped.
+
+    Returns:
+        The build id, pipeline status and image tag
+    """
+    async with TaskSessionLocal() as session:
+        repo = BuildRepository(session)
+        if await repo.claim_build(build_id) is None:
+            await session.rollback()
+            return {"build_id": build_id, "status": SKIPPED, "image_tag": None}
+        await session.commit()
+        try:
+            context = await load_context(session, build_id)
+            try:
+                state = await run_pipeline(pipeline, context, context.recorder.report)
+            finally:
+                await context.recorder.flush()
+                await asyncio.to_thread(shutil.rmtree, context.workdir, True)
+        except Exception:
+            # A claimed build is never claimed again, so fail it rather than leave it building
+            await session.rollback()
+            await repo.complete_build(build_id, False, logs="Build aborted by an internal error\n")
+            await session.commit()
+            raise
+        success = state["status"] == SUCCESS
+        await repo.complete_build(
+            build_id, success, image_tag=context.image_tag if success else None
+        )
+        await session.commit()
+    return {"build_id": build_id, "status": state["status"], "image_tag": context.image_tag}
+
+
+@shared_task(bind=True, max_retries=3, name="backend.tasks.build.run_build")
+def run_build(self, build_id: str, deploy: bool = True) -> dict:
+    """
+    Build a service image.
+
+    Failed steps fail the build without retrying; retries only cover errors
+    before the build is claimed, such as the database being unavailable.
+
+    Args:
+        build_id: Build to run
+        deploy: Queue the deploy pipeline if the build succeeds
+
+    Returns:
+        Build id, pipeline status and image tag
+    """
+    try:
+        logger.info(f"Starting build {build_id}")
+        result = asyncio.run(run_build_pipeline(build_id))
+        logger.info(f"Build {build_id} finished: {result['status']}")
+    except Exception as exc:
+        logger.error(f"Error in run_build: {exc}")
+        raise self.retry(exc=exc, countdown=60)
+
+    if result["status"] != SKIPPED:
+        # A build slot is free again
+        current_app.send_task(SCHEDULE_BUILDS_TASK)
+    if deploy and result["status"] == SUCCESS:
+        deploy_build.delay(build_id)
+    return result
@@ -0,0 +1,157 @@
+"""
+Deploy pipeline tasks, run on the ``deploy`` queue.
+
+A deploy replaces the service's container with one running the build's
+image and waits for it to pass its health check. The service's status and
+image follow the outcome.
+"""
+
+import asyncio
+import os
+import tempfile
+from typing import Any
+
+import httpx
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from core.pipeline import SKIPPED, SUCCESS, Pipeline, Step, StepFailed, run_pipeline
+from database import TaskSessionLocal
+from models.base import ServiceStatus
+from repositories.service import ServiceRepository
+from tasks.pipeline import PipelineContext, load_context, run_command
+
+logger = get_task_logger(__name__)
+
+# Host the deployed containers' ports are published on
+DEPLOY_HOST = os.getenv("DEPLOY_HOST", "127.0.0.1")
+DEPLOY_HEALTH_CHECK_PATH = os.getenv("DEPLOY_HEALTH_CHECK_PATH", "/health")
+DEPLOY_HEALTH_CHECK_INTERVAL = float(os.getenv("DEPLOY_HEALTH_CHECK_INTERVAL", "2"))
+# Per-step timeouts in seconds
+DEPLOY_START_TIMEOUT = float(os.getenv("DEPLOY_START_TIMEOUT", "300"))
+DEPLOY_HEALTH_CHECK_TIMEOUT = float(os.getenv("DEPLOY_HEALTH_CHECK_TIMEOUT", "120"))
+
+
+def container_name(service_id: str) -> str:
+    return f"service-{service_id}"
+
+
+def write_env_file(env: dict[str, str]) -> str:
+    """Write variables to a private file in ``docker run --env-file`` format.
+
+    Raises:
+        StepFailed: If a value spans lines, which the format cannot hold
+    """
+    for key, value in env.items():
+        if "\n" in value or "\r" in value:
+            raise StepFailed(f"Environment variable {key} spans lines, which docker cannot pass")
+    # mkstemp creates the file readable by this user only
+    fd, path = tempfile.mkstemp(prefix="deploy-env-")
+    with os.fdopen(fd, "w") as f:
+        f.writelines(f"{key}={value}\n" for key, value in env.items())
+    return path
+
+
+async def start_container(context: PipelineContext) -> None:
+    """Replace the service's container with one running the build's image.
+
+    The service's variables go to ``docker run`` in an env file rather than
+    argv, which is visible in ps, or the docker CLI's own environment,
+    where variables such as ``DOCKER_HOST`` or ``LD_PRELOAD`` would steer
+    the client.
+    """
+    name = container_name(context.service_id)
+    await run_command(context, "start", "docker", "rm", "-f", name, check=False)
+
+    env = dict(context.env)
+    if context.port is not None:
+        env.setdefault("PORT", str(context.port))
+    env_file = write_env_file(env)
+    try:
+        argv = ["docker", "run", "-d", "--name", name, "--restart", "unless-stopped"]
+        if context.port is not None:
+            argv += ["-p", f"{context.port}:{context.port}"]
+        argv += ["--env-file", env_file, context.image_tag]
+        await run_command(context, "start", *argv)
+    finally:
+        os.unlink(env_file)
+
+
+async def check_health(context: PipelineContext) -> str | None:
+    """Poll the service until it answers; the step timeout bounds the wait."""
+    if context.port is None:
+        return SKIPPED
+    url = f"http://{DEPLOY_HOST}:{context.port}{DEPLOY_HEALTH_CHECK_PATH}"
+    async with httpx.AsyncClient(timeout=DEPLOY_HEALTH_CHECK_INTERVAL) as client:
+        while True:
+            try:
+                response = await client.get(url)
+                if response.status_code < 400:
+                    await context.recorder.log(
+                        f"[health_check] {url} answered {response.status_code}\n"
+                    )
+                    return None
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(DEPLOY_HEALTH_CHECK_INTERVAL)
+
+
+DEPLOY_PIPELINE = Pipeline(
+    "deploy",
+    [
+        Step("start", start_container, timeout=DEPLOY_START_TIMEOUT),
+        Step("health_check", check_health, ("start",), timeout=DEPLOY_HEALTH_CHECK_TIMEOUT),
+    ],
+)
+
+
+async def run_deploy_pipeline(
+    build_id: str, pipeline: Pipeline = DEPLOY_PIPELINE
+) -> dict[str, Any]:
+    """Deploy a build's image and update the service to match.
+
+    Returns:
+        The build and service ids and the pipeline status
+    """
+    async with TaskSessionLocal() as session:
+        context = await load_context(session, build_id, with_env=True)
+        services = ServiceRepository(session)
+        # A failed deploy is not the monitor's to recover, see tasks.monitor
+        await services.update_returning(
+            context.service_id, {"status": ServiceStatus.BUILDING, "health_check_failures": 0}
+        )
+        await session.commit()
+
+        try:
+            state = await run_pipeline(pipeline, context, context.recorder.report)
+        finally:
+            await context.recorder.flush()
+        if state["status"] == SUCCESS:
+            await services.update_returning(
+                context.service_id, {"status": ServiceStatus.RUNNING, "image": context.image_tag}
+            )
+        else:
+            await services.update_status(context.service_id, ServiceStatus.FAILED)
+        await session.commit()
+    return {"build_id": build_id, "service_id": context.service_id, "status": state["status"]}
+
+
+@shared_task(bind=True, max_retries=3, name="backend.tasks.deploy.deploy_build")
+def deploy_build(self, build_id: str) -> dict:
+    """
+    Deploy a successful build.
+
+    Args:
+        build_id: Build whose image to deploy
+
+    Returns:
+        Build and service ids and the pipeline status
+    """
+    try:
+        logger.info(f"Deploying build {build_id}")
+        result = asyncio.run(run_deploy_pipeline(build_id))
+        logger.info(f"Deploy of build {build_id} finished: {result['status']}")
+        return result
+    except Exception as exc:
+        logger.error(f"Error in deploy_build: {exc}")
+        raise self.retry(exc=exc, countdown=60)
@@ -2,10 +2,13 @@
 Example Celery tasks for testing and demonstration.
 """
 
+import asyncio
 import time
 from celery import shared_task
 from celery.utils.log import get_task_logger
 
+from tasks.monitor import monitor_service_shard
+
 logger = get_task_logger(__name__)
 
 
@@ -104,7 +107,10 @@ def process_deployment(self, deployment_id: str, service_name: str) -> dict:
 @shared_task(bind=True, max_retries=3)
 def monitor_service(self, service_id: str) -> dict:
     """
-    Example monitoring task.
+    Check one service now.
+
+    Running services are checked periodically in shards by
+    ``tasks.monitor.monitor_services``; this checks a single one on demand.
 
     Args:
         service_id: Service identifier to monitor
@@ -114,16 +120,10 @@ def monitor_service(self, service_id: str) -> dict:
     """
     try:
         logger.info(f"Monitoring service {service_id}")
-
-        # Simulate health check
-        health_status = {
-            "service_id": service_id,
-            "cpu_usage": 45.2,
-            "memory_usage": 62.8,
-            "uptime": 3600,
-            "status": "healthy",
-        }
-
+        result = asyncio.run(monitor_service_shard([service_id]))
+        if not result["services"]:
+            return {"service_id": service_id, "healthy": None}
+        health_status = result["services"][0]
         logger.info(f"Service {service_id} health: {health_status}")
         return health_status
     except Exception as exc:
@@ -0,0 +1,82 @@
+"""
+Build log retention tasks.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from core.log_archive import get_log_storage
+from database import TaskSessionLocal
+from repositories.build_log import BuildLogArchiveRepository
+
+logger = get_task_logger(__name__)
+
+# Logs of builds finished longer ago than this are moved to cold storage
+LOG_ARCHIVE_AFTER_DAYS = float(os.getenv("LOG_ARCHIVE_AFTER_DAYS", "7"))
+# Lines per independently compressed block of an archive
+LOG_ARCHIVE_BLOCK_LINES = int(os.getenv("LOG_ARCHIVE_BLOCK_LINES", "1000"))
+# Builds archived per run, so one run stays well inside the task time limit
+LOG_ARCHIVE_MAX_BUILDS = int(os.getenv("LOG_ARCHIVE_MAX_BUILDS", "5000"))
+LOG_ARCHIVE_BATCH_SIZE = 100
+
+
+async def archive_finished_build_logs(
+    older_than: timedelta,
+    max_builds: int = LOG_ARCHIVE_MAX_BUILDS,
+    block_lines: int = LOG_ARCHIVE_BLOCK_LINES,
+) -> dict:
+    """Archive logs of builds finished before ``now - older_than``.
+
+    Each build is committed on its own, so a failure only loses that build's
+    progress and the next run picks it up again.
+    """
+    cutoff = datetime.now(timezone.utc) - older_than
+    archived = 0
+    original_bytes = 0
+    compressed_bytes = 0
+    async with TaskSessionLocal() as session:
+        repo = BuildLogArchiveRepository(session, get_log_storage())
+        while archived < max_builds:
+            batch = min(LOG_ARCHIVE_BATCH_SIZE, max_builds - archived)
+            build_ids = await repo.find_archivable(cutoff, limit=batch)
+            if not build_ids:
+                break
+            for build_id in build_ids:
+                archive = await repo.archive(build_id, block_lines)
+                await session.commit()
+                if archive is not None:
+                    original_bytes += archive.original_bytes
+                    compressed_bytes += archive.compressed_bytes
+                archived += 1
+    return {
+        "archived_builds": archived,
+        "original_bytes": original_bytes,
+        "compressed_bytes": compressed_bytes,
+    }
+
+
+@shared_task(bind=True, max_retries=3)
+def archive_build_logs(self, older_than_days: float | None = None) -> dict:
+    """
+    Move logs of finished builds into compressed cold storage.
+
+    Args:
+        older_than_days: Minimum age of a finished build, defaults to
+            LOG_ARCHIVE_AFTER_DAYS
+
+    Returns:
+        Number of archived builds and their original and compressed sizes
+    """
+    days = LOG_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    try:
+        logger.info(f"Archiving logs of builds finished more than {days} days ago")
+        result = asyncio.run(archive_finished_build_logs(timedelta(days=days)))
+        logger.info(f"Log archive run: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Error in archive_build_logs: {exc}")
+        raise self.retry(exc=exc, countdown=60)
@@ -0,0 +1,277 @@
+"""
+Service health monitor.
+
+Services are checked in shards rather than one task each: every
+``MONITOR_INTERVAL`` seconds ``monitor_services`` pages through the
+monitored services and sends one ``monitor_shard`` task per
+``MONITOR_SHARD_SIZE`` of them. A shard probes its services' health
+endpoints concurrently over one pooled HTTP client, reads the CPU and
+memory of their containers with a single ``docker stats`` call, and
+writes the outcome back in bulk.
+
+A running service is marked ``failed`` after ``MONITOR_FAILURE_THRESHOLD``
+consecutive failed checks, counted in ``Service.health_check_failures``.
+Services the monitor failed are still checked, and marked ``running``
+again on their first passing check. A service whose deploy failed is left
+to the next deploy.
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Any
+
+import httpx
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from database import TaskSessionLocal
+from repositories.service import ServiceRepository
+from tasks.deploy import DEPLOY_HEALTH_CHECK_PATH, DEPLOY_HOST, container_name
+
+logger = get_task_logger(__name__)
+
+MONITOR_INTERVAL = float(os.getenv("MONITOR_INTERVAL", "30"))
+# Services per shard task
+MONITOR_SHARD_SIZE = int(os.getenv("MONITOR_SHARD_SIZE", "500"))
+# Health probes a shard has in flight at once
+MONITOR_CONCURRENCY = int(os.getenv("MONITOR_CONCURRENCY", "50"))
+MONITOR_TIMEOUT = float(os.getenv("MONITOR_TIMEOUT", "5"))
+# Probes per service before a check counts as failed
+MONITOR_PROBE_ATTEMPTS = int(os.getenv("MONITOR_PROBE_ATTEMPTS", "2"))
+# Consecutive failed checks before a service is marked failed
+MONITOR_FAILURE_THRESHOLD = int(os.getenv("MONITOR_FAILURE_THRESHOLD", "3"))
+
+_SIZE_UNITS = {
+    "b": 1,
+    "kb": 1000,
+    "mb": 1000**2,
+    "gb": 1000**3,
+    "tb": 1000**4,
+    "kib": 1024,
+    "mib": 1024**2,
+    "gib": 1024**3,
+    "tib": 1024**4,
+}
+_SIZE = re.compile(r"^\s*([\d.]+)\s*([a-zA-Z]*)\s*$")
+
+
+def parse_size(value: str) -> int | None:
+    """Parse a size as ``docker stats`` prints it, e.g. ``12.5MiB``, to bytes."""
+    match = _SIZE.match(value)
+    if match is None or match.group(2).lower() not in _SIZE_UNITS:
+        return None
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+def parse_docker_stats(output: str) -> dict[str, dict[str, Any]]:
+    """Parse ``docker stats`` lines of name, CPU % and memory usage, by container name."""
+    stats = {}
+    for line in output.splitlines():
+        parts = line.split("\t")
+        if len(parts) != 3:
+            continue
+        name, cpu, memory = parts
+        try:
+            cpu_percent = float(cpu.strip().rstrip("%"))
+        except ValueError:
+            cpu_percent = None
+        stats[name.strip()] = {
+            "cpu_percent": cpu_percent,
+            "memory_bytes": parse_size(memory.split("/")[0]),
+        }
+    return stats
+
+
+async def container_stats() -> dict[str, dict[str, Any]] | None:
+    """Get the CPU and memory of the running containers.
+
+    Returns:
+        Stats by container name, or None when docker is unavailable
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "docker",
+            "stats",
+            "--no-stream",
+            "--format",
+            "{{.Name}}\t{{.CPUPerc}}\t{{.MemUsage}}",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except OSError as e:
+        logger.warning(f"docker stats unavailable: {e}")
+        return None
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), MONITOR_TIMEOUT * 2)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.warning("docker stats timed out")
+        return None
+    if process.returncode != 0:
+        logger.warning(f"docker stats exited with {process.returncode}")
+        return None
+    return parse_docker_stats(stdout.decode(errors="replace"))
+
+
+async def probe_health(
+    client: httpx.AsyncClient, semaphore: asyncio.Semaphore, port: int
+) -> dict[str, Any]:
+    """Probe a service's health endpoint, retrying up to ``MONITOR_PROBE_ATTEMPTS`` times."""
+    url = f"http://{DEPLOY_HOST}:{port}{DEPLOY_HEALTH_CHECK_PATH}"
+    result: dict[str, Any] = {"healthy": False}
+    async with semaphore:
+        for _ in range(MONITOR_PROBE_ATTEMPTS):
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+            except httpx.HTTPError as e:
+                result = {"healthy": False, "error": type(e).__name__}
+                continue
+            result = {
+                "healthy": response.status_code < 400,
+                "status_code": response.status_code,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+            if result["healthy"]:
+                break
+    return result
+
+
+async def check_services(
+    services: list[dict[str, Any]], client: httpx.AsyncClient | None = None
+) -> list[dict[str, Any]]:
+    """Check the health and resource use of services given as ``id``/``port`` dicts.
+
+    A service with a port is healthy if its health endpoint answers; one
+    without is healthy if its container is running. ``healthy`` is None
+    when neither can be told.
+    """
+    semaphore = asyncio.Semaphore(MONITOR_CONCURRENCY)
+    owned = client is None
+    if client is None:
+        limits = httpx.Limits(
+            max_connections=MONITOR_CONCURRENCY, max_keepalive_connections=MONITOR_CONCURRENCY
+        )
+        client = httpx.AsyncClient(timeout=MONITOR_TIMEOUT, limits=limits)
+
+    async def probe(service: dict[str, Any]) -> dict[str, Any] | None:
+        if service.get("port") is None:
+            return None
+        return await probe_health(client, semaphore, service["port"])
+
+    try:
+        stats, *probes = await asyncio.gather(
+            container_stats(), *(probe(service) for service in services)
+        )
+    finally:
+        if owned:
+            await client.aclose()
+
+    results = []
+    for service, probe_result in zip(services, probes):
+        container = stats.get(container_name(service["id"])) if stats is not None else None
+        result: dict[str, Any] = {"service_id": service["id"], "healthy": None}
+        if probe_result is not None:
+            result.update(probe_result)
+        elif stats is not None:
+            result["healthy"] = container is not None
+        result["cpu_percent"] = container["cpu_percent"] if container else None
+        result["memory_bytes"] = container["memory_bytes"] if container else None
+        results.append(result)
+    return results
+
+
+async def monitor_service_shard(service_ids: list[str]) -> dict[str, Any]:
+    """Check a shard of services and record the results.
+
+    Statuses change only for services still running or failed by the
+    monitor, so a deploy that moved a service on while it was checked is
+    not overwritten.
+
+    Returns:
+        Counts by outcome, the ids marked failed and recovered, and each
+        service's readings
+    """
+    async with TaskSessionLocal() as session:
+        targets = await ServiceRepository(session).get_health_targets(service_ids)
+    results = await check_services(targets)
+
+    healthy = [result["service_id"] for result in results if result["healthy"]]
+    unhealthy = [result["service_id"] for result in results if result["healthy"] is False]
+    failed: list[str] = []
+    recovered: list[str] = []
+    if healthy or unhealthy:
+        async with TaskSessionLocal() as session:
+            failed, recovered = await ServiceRepository(session).record_health_checks(
+                healthy, unhealthy, MONITOR_FAILURE_THRESHOLD
+            )
+            await session.commit()
+    return {
+        "checked": len(results),
+        "healthy": len(healthy),
+        "unhealthy": len(unhealthy),
+        "failed": failed,
+        "recovered": recovered,
+        "services": results,
+    }
+
+
+async def plan_shards(shard_size: int = MONITOR_SHARD_SIZE) -> list[list[str]]:
+    """Split the monitored services into shards of ``shard_size`` ids, in id order."""
+    shards = []
+    async with TaskSessionLocal() as session:
+        repo = ServiceRepository(session)
+        shard = await repo.list_monitored_ids(shard_size)
+        while shard:
+            shards.append(shard)
+            shard = await repo.list_monitored_ids(shard_size, after=shard[-1])
+    return shards
+
+
+@shared_task(bind=True, name="backend.tasks.monitor.monitor_services")
+def monitor_services(self) -> dict:
+    """
+    Send a ``monitor_shard`` task for each shard of monitored services.
+
+    Shard tasks expire after ``MONITOR_INTERVAL``, so a backlog of checks
+    is dropped instead of piling up behind the next round.
+
+    Returns:
+        Numbers of services and shards
+    """
+    try:
+        shards = asyncio.run(plan_shards())
+    except Exception as exc:
+        logger.error(f"Error in monitor_services: {exc}")
+        raise
+    for shard in shards:
+        monitor_shard.apply_async(args=[shard], expires=MONITOR_INTERVAL)
+    return {"services": sum(len(shard) for shard in shards), "shards": len(shards)}
+
+
+@shared_task(bind=True, name="backend.tasks.monitor.monitor_shard")
+def monitor_shard(self, service_ids: list[str]) -> dict:
+    """
+    Check a shard of services.
+
+    Not retried: the next round checks the services again.
+
+    Args:
+        service_ids: Services to check
+
+    Returns:
+        Counts by outcome, the ids marked failed and each service's readings
+    """
+    try:
+        result = asyncio.run(monitor_service_shard(service_ids))
+    except Exception as exc:
+        logger.error(f"Error in monitor_shard: {exc}")
+        raise
+    if result["failed"]:
+        logger.warning(f"Services failing health checks: {result['failed']}")
+    if result["recovered"]:
+        logger.info(f"Services recovered: {result['recovered']}")
+    return result
@@ -0,0 +1,199 @@
+"""
+Shared pieces of the build and deploy pipeline tasks.
+
+Step output is streamed into the build log and step progress into
+``Build.build_metadata["pipelines"][<pipeline name>]``, both committed as
+they happen so the API can show a running build. Build cache hits and
+misses are recorded under ``build_metadata["cache"]``.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.pipeline import StepFailed
+from repositories.base import CountMode, LoadProfile, PaginationParams
+from repositories.build import BuildRepository
+from repositories.environment_variable import EnvironmentVariableRepository
+
+# Builds check out and build their source under this directory
+BUILD_WORKSPACE = os.getenv(
+    "BUILD_WORKSPACE", os.path.join(tempfile.gettempdir(), "railway-builds")
+)
+# Registry images are pushed to; without one, images stay on the build host
+BUILD_REGISTRY = os.getenv("BUILD_REGISTRY", "").rstrip("/")
+# Step output is written to the build log at least this often
+BUILD_LOG_FLUSH_SECONDS = float(os.getenv("BUILD_LOG_FLUSH_SECONDS", "1"))
+
+
+class BuildRecorder:
+    """Writes a build's log output and pipeline progress.
+
+    Parallel steps share the task's session, so writes are serialized, and
+    each is committed straight away. A write is shielded from cancellation:
+    a step that times out or is cancelled mid-write stops waiting for it,
+    but the write still finishes, so the session is never left halfway
+    through a statement or commit.
+    """
+
+    def __init__(self, session: AsyncSession, build_id: str, metadata: dict[str, Any] | None):
+        self.session = session
+        self.build_id = build_id
+        self.metadata = dict(metadata or {})
+        self.repo = BuildRepository(session)
+        self._lock = asyncio.Lock()
+
+    async def _write(self, statement: Callable[[], Awaitable[Any]]) -> None:
+        async def write() -> None:
+            async with self._lock:
+                await statement()
+                await self.session.commit()
+
+        await asyncio.shield(write())
+
+    async def log(self, content: str) -> None:
+        """Append output to the build log."""
+        await self._write(lambda: self.repo.append_logs(self.build_id, content))
+
+    async def record(self, section: str, name: str, value: Any) -> None:
+        """Store ``value`` as ``build_metadata[section][name]``."""
+        entries = dict(self.metadata.get(section) or {})
+        entries[name] = value
+        self.metadata[section] = entries
+        metadata = self.metadata
+        await self._write(lambda: self.repo.update_metadata(self.build_id, metadata))
+
+    async def flush(self) -> None:
+        """Wait for writes left running by cancelled steps to finish."""
+        async with self._lock:
+            pass
+
+    async def report(self, state: dict[str, Any]) -> None:
+        """Store the state of a pipeline run, keyed by the pipeline's name."""
+        await self.record("pipelines", state["name"], state)
+
+
+@dataclass
+class PipelineContext:
+    """What the steps of a build's pipelines need to know."""
+
+    build_id: str
+    service_id: str
+    git_repo: str | None
+    git_branch: str
+    commit_sha: str | None
+    dockerfile_path: str
+    build_context: str
+    port: int | None
+    image_tag: str
+    recorder: BuildRecorder
+    workdir: Path
+    env: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def source_dir(self) -> Path:
+        return self.workdir / "src"
+
+
+def image_tag_for(service_id: str, build_id: str, commit_sha: str | None) -> str:
+    """Get the image tag a build produces."""
+    name = f"service-{service_id}"
+    if BUILD_REGISTRY:
+        name = f"{BUILD_REGISTRY}/{name}"
+    return f"{name}:{(commit_sha or build_id)[:12]}"
+
+
+async def load_context(
+    session: AsyncSession, build_id: str, with_env: bool = False
+) -> PipelineContext:
+    """Load a build and its service into a pipeline context.
+
+    Args:
+        session: Session the recorder writes through
+        build_id: Build to run
+        with_env: Also load the service's environment variables
+
+    Raises:
+        NotFoundError: If the build does not exist
+    """
+    repo = BuildRepository(session)
+    build = await repo.get_by_id_or_raise(build_id, LoadProfile.DETAIL)
+    service = build.service
+    metadata = await repo.get_metadata(build_id)
+
+    env: dict[str, str] = {}
+    if with_env:
+        variables = await EnvironmentVariableRepository(session).list_by_service(
+            service.id, pagination=PaginationParams(limit=1000), count_mode=CountMode.NONE
+        )
+        env = {variable.key: variable.value for variable in variables.items}
+
+    return PipelineContext(
+        build_id=build_id,
+        service_id=service.id,
+        git_repo=service.git_repo,
+        git_branch=service.git_branch,
+        commit_sha=build.commit_sha,
+        dockerfile_path=service.dockerfile_path,
+        build_context=service.build_context,
+        port=service.port,
+        image_tag=build.image_tag or image_tag_for(service.id, build_id, build.commit_sha),
+        recorder=BuildRecorder(session, build_id, metadata),
+        workdir=Path(BUILD_WORKSPACE) / build_id,
+        env=env,
+    )
+
+
+async def run_command(
+    context: PipelineContext,
+    step: str,
+    *argv: str,
+    cwd: Path | None = None,
+    env: dict[str, str] | None = None,
+    check: bool = True,
+) -> int:
+    """Run a command, streaming its output into the build log.
+
+    Lines are prefixed with the step name, since parallel steps share the
+    log. The process is killed if the step is cancelled or times out.
+
+    Raises:
+        StepFailed: If ``check`` is set and the command exits non-zero
+    """
+    await context.recorder.log(f"[{step}] $ {' '.join(argv)}\n")
+    process = await asyncio.create_subprocess_exec(
+        *argv,
+        cwd=cwd,
+        env=env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    buffer: list[str] = []
+    flushed = time.monotonic()
+    try:
+        async for line in process.stdout:
+            text = line.decode(errors="replace").rstrip("\n")
+            buffer.append(f"[{step}] {text}\n")
+            if time.monotonic() - flushed >= BUILD_LOG_FLUSH_SECONDS:
+                await context.recorder.log("".join(buffer))
+                buffer.clear()
+                flushed = time.monotonic()
+        returncode = await process.wait()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    finally:
+        if buffer:
+            await context.recorder.log("".join(buffer))
+
+    if check and returncode != 0:
+        raise StepFailed(f"{argv[0]} exited with status {returncode}")
+    return returncode
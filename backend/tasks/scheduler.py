@@ -0,0 +1,138 @@
+"""
+Build scheduler: decides which pending builds go to the ``build`` queue.
+
+Builds are no longer sent to the queue when requested. They wait as
+``pending`` until a scheduler run hands them to a worker, at most as many as
+there are free build slots, chosen fairly between tenants (see
+``core.build_scheduler``). Runs are triggered by new requests, by finished
+builds and every ``BUILD_SCHEDULE_INTERVAL`` seconds by beat. Runs take
+turns on an advisory lock, so each sees the slots the previous one took.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from celery import current_app, shared_task
+from celery.utils.log import get_task_logger
+
+from core.build_scheduler import QueuedBuild, TenantShare, plan_dispatch
+from database import TaskSessionLocal
+from repositories.build import BuildRepository, BuildRequest
+from repositories.tenant import TenantRepository
+from tasks.build import run_build
+
+logger = get_task_logger(__name__)
+
+# Builds the build workers run at once, across all of them
+BUILD_WORKER_SLOTS = int(os.getenv("BUILD_WORKER_SLOTS", "4"))
+# Default per-tenant cap, see Tenant.max_concurrent_builds
+BUILD_TENANT_MAX_CONCURRENT = int(os.getenv("BUILD_TENANT_MAX_CONCURRENT", "2"))
+# Estimate for services without a successful build yet
+BUILD_DEFAULT_ESTIMATE_SECONDS = float(os.getenv("BUILD_DEFAULT_ESTIMATE_SECONDS", "300"))
+# Build seconds used within this window count against a tenant's share
+BUILD_FAIR_SHARE_WINDOW = float(os.getenv("BUILD_FAIR_SHARE_WINDOW", "3600"))
+# Preview builds waiting longer than this are scheduled like production ones
+BUILD_PREVIEW_PROMOTE_AFTER = float(os.getenv("BUILD_PREVIEW_PROMOTE_AFTER", "900"))
+# Queued builds no worker started within this are handed out again
+BUILD_QUEUED_TIMEOUT = float(os.getenv("BUILD_QUEUED_TIMEOUT", "600"))
+BUILD_SCHEDULE_INTERVAL = float(os.getenv("BUILD_SCHEDULE_INTERVAL", "5"))
+BUILD_SCHEDULER_MAX_CANDIDATES = 5000
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive timestamps
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def schedule_pending_builds(slots: int = BUILD_WORKER_SLOTS) -> dict:
+    """Pick pending builds for the free build slots and queue them.
+
+    Returns:
+        Numbers of builds dispatched, requeued after a lost task, and waiting
+    """
+    now = datetime.now(timezone.utc)
+    async with TaskSessionLocal() as session:
+        repo = BuildRepository(session)
+        await repo.lock_scheduler()
+        requeued = await repo.requeue_stale(now - timedelta(seconds=BUILD_QUEUED_TIMEOUT))
+        active = await repo.count_active_by_tenant()
+        free = slots - sum(sum(services.values()) for services in active.values())
+        candidates = await repo.list_schedulable(BUILD_SCHEDULER_MAX_CANDIDATES) if free > 0 else []
+        if not candidates:
+            await session.commit()
+            return {"dispatched": 0, "requeued": requeued, "waiting": 0}
+
+        tenant_ids = {row["tenant_id"] for row in candidates} | set(active)
+        service_ids = {row["service_id"] for row in candidates}
+        for services in active.values():
+            service_ids.update(services)
+        estimates = await repo.estimate_durations(sorted(service_ids))
+        usage = await repo.build_seconds_by_tenant(now - timedelta(seconds=BUILD_FAIR_SHARE_WINDOW))
+        limits = await TenantRepository(session).get_build_limits(tenant_ids)
+
+        def estimate(service_id: str) -> float:
+            return estimates.get(service_id, BUILD_DEFAULT_ESTIMATE_SECONDS)
+
+        shares = {}
+        for tenant_id in tenant_ids:
+            weight, cap = limits.get(tenant_id, (1.0, None))
+            services = active.get(tenant_id, {})
+            shares[tenant_id] = TenantShare(
+                weight=weight,
+                max_concurrent=BUILD_TENANT_MAX_CONCURRENT if cap is None else cap,
+                running=sum(services.values()),
+                load=usage.get(tenant_id, 0.0)
+                + sum(count * estimate(service_id) for service_id, count in services.items()),
+            )
+        queued = [
+            QueuedBuild(
+                build_id=row["id"],
+                tenant_id=row["tenant_id"],
+                created_at=_as_utc(row["created_at"]),
+                estimate=estimate(row["service_id"]),
+                # Builds of the service's own branch are production builds
+                preview=row["git_branch"] not in (None, row["service_branch"]),
+            )
+            for row in candidates
+        ]
+        picked = plan_dispatch(queued, shares, free, now, BUILD_PREVIEW_PROMOTE_AFTER)
+        marked = set(await repo.mark_queued([build.build_id for build in picked]))
+        await session.commit()
+
+    for build in picked:
+        if build.build_id in marked:
+            run_build.apply_async(args=[build.build_id], task_id=build.build_id)
+    return {"dispatched": len(marked), "requeued": requeued, "waiting": len(candidates)}
+
+
+@shared_task(bind=True, max_retries=3)
+def schedule_builds(self) -> dict:
+    """
+    Hand pending builds to the build workers, fairly between tenants.
+
+    Returns:
+        Numbers of builds dispatched, requeued and waiting
+    """
+    try:
+        result = asyncio.run(schedule_pending_builds())
+        if result["dispatched"] or result["requeued"]:
+            logger.info(f"Build scheduler: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Error in schedule_builds: {exc}")
+        raise self.retry(exc=exc, countdown=5)
+
+
+def enqueue_build(request: BuildRequest) -> None:
+    """Schedule a requested build and revoke the tasks of the builds it superseded.
+
+    Call once the transaction of ``BuildRepository.request_build`` has
+    committed. Build tasks use the build id as task id so they can be
+    revoked; a revoke that misses is harmless, since the task then finds
+    its build cancelled.
+    """
+    if request.superseded:
+        current_app.control.revoke(request.superseded)
+    if request.created:
+        schedule_builds.delay()
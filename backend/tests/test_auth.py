@@ -0,0 +1,106 @@
+"""Unit tests for authenticating tenant data endpoints."""
+
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api import build_logs, exports
+from core import auth
+from database import Base, get_db
+from models import Tenant, User
+from models.base import UserRole
+
+
+class TestTenantAuthorization:
+    """Tests for restricting tenant exports and storage stats to the tenant's admins."""
+
+    @pytest.fixture
+    async def sessionmaker(self):
+        """Create an in-memory database with two tenants and their users."""
+        import models  # noqa: F401
+
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessionmaker() as session:
+            session.add_all(
+                [
+                    Tenant(id="t1", name="Acme", slug="acme"),
+                    Tenant(id="t2", name="Other", slug="other"),
+                ]
+            )
+            for user_id, tenant_id, role, active in (
+                ("owner", "t1", UserRole.OWNER, True),
+                ("member", "t1", UserRole.MEMBER, True),
+                ("former", "t1", UserRole.ADMIN, False),
+                ("outsider", "t2", UserRole.OWNER, True),
+            ):
+                session.add(
+                    User(
+                        id=f"auth-{user_id}",
+                        tenant_id=tenant_id,
+                        email=f"{user_id}@example.com",
+                        username=user_id,
+                        password_hash="x",
+                        role=role,
+                        is_active=active,
+                    )
+                )
+            await session.commit()
+        yield sessionmaker
+        await engine.dispose()
+
+    @pytest.fixture
+    def client(self, sessionmaker, monkeypatch):
+        """Create a client whose bearer tokens are the user ids they name."""
+        app = FastAPI()
+        app.include_router(exports.router)
+        app.include_router(build_logs.router)
+
+        async def override_get_db():
+            async with sessionmaker() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        monkeypatch.setattr(exports, "AsyncSessionLocal", sessionmaker)
+        monkeypatch.setattr(auth, "decode_access_token", lambda token: f"auth-{token}")
+        transport = httpx.ASGITransport(app=app)
+        return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("path", ["/tenants/t1/export", "/tenants/t1/log-storage"])
+    async def test_only_tenant_admins_are_allowed(self, client, path):
+        """Test anonymous, inactive, member and other-tenant users are turned away."""
+        async with client:
+            assert (await client.get(path)).status_code == 401
+            for user, expected in (
+                ("nobody", 401),
+                ("former", 401),
+                ("member", 403),
+                ("outsider", 403),
+                ("owner", 200),
+            ):
+                headers = {"Authorization": f"Bearer {user}"}
+                assert (await client.get(path, headers=headers)).status_code == expected, user
+
+    @pytest.mark.anyio
+    async def test_owner_export_has_no_other_tenant(self, client):
+        """Test an authorized export streams only the requested tenant."""
+        async with client:
+            response = await client.get(
+                "/tenants/t1/export", headers={"Authorization": "Bearer owner"}
+            )
+        records = [json.loads(line) for line in response.text.splitlines()]
+        users = {record["data"]["id"] for record in records if record["type"] == "user"}
+        assert users == {"auth-owner", "auth-member", "auth-former"}
+        assert all("password_hash" not in record["data"] for record in records)
+
+    def test_tokens_are_rejected_without_a_secret_key(self, monkeypatch):
+        """Test no token is accepted when SECRET_KEY is not configured."""
+        monkeypatch.setattr(auth, "SECRET_KEY", "")
+        assert auth.decode_access_token("anything") is None
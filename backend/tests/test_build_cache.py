@@ -0,0 +1,84 @@
+"""Unit tests for the content-addressed build cache."""
+
+import os
+import time
+
+import pytest
+
+from core.build_cache import BuildCache, cache_key
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Create a small dependency tree with a duplicate file, a script and a symlink."""
+    root = tmp_path / "node_modules"
+    (root / "a").mkdir(parents=True)
+    (root / "b" / "empty").mkdir(parents=True)
+    (root / "a" / "index.js").write_text("module.exports = 1\n")
+    (root / "b" / "index.js").write_text("module.exports = 1\n")
+    (root / "b" / "cli").write_text("#!/bin/sh\n")
+    os.chmod(root / "b" / "cli", 0o755)
+    os.symlink("../b/cli", root / "a" / "cli")
+    return root
+
+
+class TestBuildCache:
+    """Tests for storing, restoring and evicting entries."""
+
+    def test_restore_hardlinks_objects(self, tmp_path, tree):
+        """Test a restored tree matches the original and shares inodes with the cache."""
+        cache = BuildCache(tmp_path / "cache", max_bytes=1024 * 1024)
+        key = cache_key("dependencies", "s1", "node", "lock")
+        cache.store(key, tree, {"seconds": 12.5})
+
+        dest = tmp_path / "build" / "node_modules"
+        assert cache.restore(key, dest) == {"seconds": 12.5}
+        assert (dest / "a" / "index.js").read_text() == "module.exports = 1\n"
+        assert (dest / "b" / "empty").is_dir()
+        assert os.readlink(dest / "a" / "cli") == "../b/cli"
+        assert os.access(dest / "b" / "cli", os.X_OK)
+        assert not os.access(dest / "a" / "index.js", os.X_OK)
+        # Identical files are stored once and linked, not copied
+        assert (dest / "a" / "index.js").stat().st_ino == (dest / "b" / "index.js").stat().st_ino
+        assert (dest / "a" / "index.js").stat().st_nlink > 1
+
+    def test_miss(self, tmp_path):
+        """Test an unknown key restores nothing."""
+        cache = BuildCache(tmp_path / "cache", max_bytes=1024)
+        assert cache.restore("missing", tmp_path / "dest") is None
+        assert not (tmp_path / "dest").exists()
+
+    def test_metadata_only_entry(self, tmp_path):
+        """Test an entry may hold metadata without files."""
+        cache = BuildCache(tmp_path / "cache", max_bytes=1024)
+        cache.store("image", None, {"image_tag": "service-s1:abc"})
+        assert cache.lookup("image")["meta"] == {"image_tag": "service-s1:abc"}
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test going over budget evicts the least recently used entry and its objects."""
+        cache = BuildCache(tmp_path / "cache", max_bytes=2500)
+        for name in ("old", "used", "new"):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / "blob").write_bytes(name[0].encode() * 1000)
+        cache.store("old", tmp_path / "old", {})
+        cache.store("used", tmp_path / "used", {})
+        past = time.time() - 60
+        os.utime(cache.entries / "old.json", (past, past))
+        os.utime(cache.entries / "used.json", (past - 10, past - 10))
+        assert cache.lookup("used") is not None
+
+        cache.store("new", tmp_path / "new", {})
+        assert cache.lookup("old") is None
+        assert cache.lookup("used") is not None
+        assert cache.lookup("new") is not None
+        assert sum(path.stat().st_size for path in cache.objects.glob("*/*")) == 2000
+
+    def test_restore_after_eviction_race(self, tmp_path, tree):
+        """Test a restore whose objects were removed is a clean miss."""
+        cache = BuildCache(tmp_path / "cache", max_bytes=1024 * 1024)
+        cache.store("k", tree, {})
+        for path in cache.objects.glob("*/*"):
+            path.unlink()
+        dest = tmp_path / "dest"
+        assert cache.restore("k", dest) is None
+        assert not dest.exists()
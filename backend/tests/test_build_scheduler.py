@@ -0,0 +1,181 @@
+"""Unit tests for the fair-share build scheduler."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from core.build_scheduler import QueuedBuild, TenantShare, plan_dispatch
+from database import Base
+from models import Build, Project, Service, Tenant
+from models.base import BuildStatus
+from repositories.build import BuildRepository
+from tasks import scheduler
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def queued(build_id, tenant_id, minutes_ago=1.0, estimate=60.0, preview=False):
+    return QueuedBuild(
+        build_id=build_id,
+        tenant_id=tenant_id,
+        created_at=NOW - timedelta(minutes=minutes_ago),
+        estimate=estimate,
+        preview=preview,
+    )
+
+
+class TestPlanDispatch:
+    """Tests for choosing the builds to start."""
+
+    def test_busy_tenant_does_not_starve_others(self):
+        """Test a tenant with a burst of builds shares slots with a later tenant."""
+        burst = [queued(f"a{i}", "a", minutes_ago=10 - i / 10) for i in range(50)]
+        picked = plan_dispatch(
+            burst + [queued("b0", "b", minutes_ago=1)],
+            {"a": TenantShare(max_concurrent=10), "b": TenantShare()},
+            slots=4,
+            now=NOW,
+            promote_after=900,
+        )
+        assert [build.build_id for build in picked][:2] in (["a0", "b0"], ["b0", "a0"])
+        assert [build.build_id for build in picked[2:]] == ["a1", "a2"]
+
+    def test_concurrency_cap(self):
+        """Test a tenant at its cap is passed over even with free slots."""
+        picked = plan_dispatch(
+            [queued(f"a{i}", "a") for i in range(5)],
+            {"a": TenantShare(max_concurrent=3, running=2)},
+            slots=4,
+            now=NOW,
+            promote_after=900,
+        )
+        assert len(picked) == 1
+
+    def test_weights_and_recent_usage(self):
+        """Test a heavier weight offsets recent usage."""
+        shares = {
+            "a": TenantShare(weight=1.0, load=600.0, max_concurrent=5),
+            "b": TenantShare(weight=4.0, load=600.0, max_concurrent=5),
+        }
+        picked = plan_dispatch(
+            [queued("a0", "a", minutes_ago=5), queued("b0", "b", minutes_ago=1)],
+            shares,
+            slots=1,
+            now=NOW,
+            promote_after=900,
+        )
+        assert [build.build_id for build in picked] == ["b0"]
+
+    def test_production_before_preview_until_promoted(self):
+        """Test previews wait behind production builds until they age."""
+        builds = [
+            queued("preview", "a", minutes_ago=5, preview=True),
+            queued("old-preview", "b", minutes_ago=30, preview=True),
+            queued("production", "c", minutes_ago=1),
+        ]
+        picked = plan_dispatch(builds, {}, slots=3, now=NOW, promote_after=900)
+        assert [build.build_id for build in picked] == ["old-preview", "production", "preview"]
+
+
+class TestSchedulePendingBuilds:
+    """Tests for a scheduler run against the database."""
+
+    @pytest.fixture
+    async def sessionmaker(self, monkeypatch):
+        """Create an in-memory database with two tenants and record dispatches."""
+        import models  # noqa: F401
+
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessionmaker() as session:
+            session.add_all(
+                [
+                    Tenant(id="t1", name="Busy", slug="busy"),
+                    Tenant(id="t2", name="Quiet", slug="quiet", max_concurrent_builds=1),
+                    Project(id="p1", tenant_id="t1", name="api"),
+                    Project(id="p2", tenant_id="t2", name="web"),
+                    Service(id="s1", project_id="p1", name="api"),
+                    Service(id="s2", project_id="p2", name="web"),
+                ]
+            )
+            start = datetime.now(timezone.utc) - timedelta(minutes=10)
+            for i in range(6):
+                session.add(
+                    Build(
+                        id=f"b1-{i}",
+                        service_id="s1",
+                        git_branch="main",
+                        created_at=start + timedelta(seconds=i),
+                    )
+                )
+            for i in range(2):
+                session.add(
+                    Build(
+                        id=f"b2-{i}",
+                        service_id="s2",
+                        created_at=start + timedelta(minutes=5, seconds=i),
+                    )
+                )
+            await session.commit()
+
+        dispatched = []
+        monkeypatch.setattr(scheduler, "TaskSessionLocal", sessionmaker)
+        monkeypatch.setattr(
+            scheduler.run_build, "apply_async", lambda args, task_id: dispatched.append(task_id)
+        )
+        sessionmaker.dispatched = dispatched
+        yield sessionmaker
+        await engine.dispose()
+
+    @pytest.mark.anyio
+    async def test_fills_free_slots_fairly(self, sessionmaker):
+        """Test slots are split between tenants within their caps and marked queued."""
+        result = await scheduler.schedule_pending_builds(slots=4)
+        assert result["dispatched"] == 3
+        assert sorted(sessionmaker.dispatched) == ["b1-0", "b1-1", "b2-0"]
+
+        async with sessionmaker() as session:
+            build = await session.get(Build, "b1-0")
+            assert build.status == BuildStatus.QUEUED
+
+        # Both tenants are at their caps now
+        result = await scheduler.schedule_pending_builds(slots=4)
+        assert result["dispatched"] == 0
+
+    @pytest.mark.anyio
+    async def test_estimates_from_recent_successes(self, sessionmaker):
+        """Test a service's estimate averages its latest successful builds only."""
+        async with sessionmaker() as session:
+            start = datetime.now(timezone.utc) - timedelta(days=1)
+            for i, seconds in enumerate([1000, 100, 200, 300]):
+                session.add(
+                    Build(
+                        id=f"done-{i}",
+                        service_id="s1",
+                        status=BuildStatus.SUCCESS,
+                        duration_seconds=seconds,
+                        created_at=start + timedelta(minutes=i),
+                    )
+                )
+            session.add(
+                Build(id="failed", service_id="s1", status=BuildStatus.FAILED, duration_seconds=5)
+            )
+            await session.commit()
+            estimates = await BuildRepository(session).estimate_durations(["s1", "s2"], samples=3)
+        assert estimates == {"s1": 200.0}
+
+    @pytest.mark.anyio
+    async def test_lost_tasks_are_requeued(self, sessionmaker):
+        """Test builds queued but never started go back to pending."""
+        await scheduler.schedule_pending_builds(slots=1)
+        async with sessionmaker() as session:
+            repo = BuildRepository(session)
+            future = datetime.now(timezone.utc) + timedelta(minutes=1)
+            assert await repo.requeue_stale(future) == 1
+            await session.commit()
+            stats = await repo.queue_stats_by_tenant()
+        assert stats["t1"][0] == 6
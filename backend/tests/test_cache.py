@@ -0,0 +1,191 @@
+"""Unit tests for the read-through entity cache."""
+
+import asyncio
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from core.cache import EntityCache, LRUCache, entity_to_dict, merge_cached
+
+
+class TestLRUCache:
+    """Tests for LRUCache."""
+
+    def test_get_and_set(self):
+        """Test stored values are returned and counted as hits."""
+        cache = LRUCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used entry is evicted when full."""
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.evictions == 1
+
+    def test_expired_entries_are_misses(self):
+        """Test entries past their TTL are dropped."""
+        cache = LRUCache(maxsize=10, ttl=5)
+        with patch("core.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("core.cache.time.monotonic", return_value=106.0):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestEntityCache:
+    """Tests for EntityCache without Redis."""
+
+    @pytest.mark.anyio
+    async def test_concurrent_misses_load_once(self):
+        """Test single-flight collapses concurrent misses into one load."""
+        cache = EntityCache()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"id": "t1", "slug": "acme"}
+
+        results = await asyncio.gather(
+            *(cache.get_or_load("tenants", "slug:acme", load) for _ in range(5))
+        )
+
+        assert calls == 1
+        assert all(result == {"id": "t1", "slug": "acme"} for result in results)
+        assert cache.stats()["coalesced"] == 4
+
+    @pytest.mark.anyio
+    async def test_invalidate_drops_all_keys_of_entity(self):
+        """Test invalidating an entity drops every lookup that resolved to it."""
+        cache = EntityCache()
+
+        async def load():
+            return {"id": "u1", "email": "a@example.com"}
+
+        await cache.get_or_load("users", "email:*:a@example.com", load)
+        await cache.get_or_load("users", "id:u1", load)
+        assert cache.stats()["size"] == 2
+
+        await cache.invalidate("users", "u1")
+        assert cache.stats()["size"] == 0
+
+    @pytest.mark.anyio
+    async def test_evicted_keys_leave_the_index(self):
+        """Test the entity index shrinks as the LRU evicts entries."""
+        cache = EntityCache(maxsize=2)
+        for i in range(10):
+            await cache.get_or_load("tenants", f"slug:t{i}", lambda i=i: _value(f"t{i}"))
+        assert cache.stats()["size"] == 2
+        assert set(cache._index) == {("tenants", "t8"), ("tenants", "t9")}
+
+    @pytest.mark.anyio
+    async def test_misses_not_cached(self):
+        """Test lookups that find nothing are loaded again next time."""
+        cache = EntityCache()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            return None
+
+        assert await cache.get_or_load("tenants", "slug:none", load) is None
+        assert await cache.get_or_load("tenants", "slug:none", load) is None
+        assert calls == 2
+
+
+async def _value(entity_id):
+    return {"id": entity_id}
+
+
+class TestMergeCached:
+    """Tests for attaching cached values to a session."""
+
+    @pytest.mark.anyio
+    async def test_keeps_unflushed_changes(self):
+        """Test a cache hit returns the session's instance instead of overwriting it."""
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.pool import StaticPool
+
+        import models  # noqa: F401
+        from database import Base
+        from models.tenant import Tenant
+
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            session.add(Tenant(id="t1", name="old", slug="acme"))
+            await session.commit()
+            tenant = await session.get(Tenant, "t1")
+            cached = entity_to_dict(tenant)
+            tenant.name = "new"
+
+            assert await merge_cached(session, Tenant, cached) is tenant
+            assert tenant.name == "new"
+            assert tenant in session.dirty
+        await engine.dispose()
+
+
+    @pytest.mark.anyio
+    async def test_update_starts_from_the_database_row(self, monkeypatch):
+        """Test a write does not start from a stale cached row."""
+        import models  # noqa: F401
+        from sqlalchemy import text
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.pool import StaticPool
+
+        from database import Base
+        from models import Project, Service, Tenant
+        from repositories import base
+        from repositories.service import ServiceRepository
+
+        cache = EntityCache()
+        monkeypatch.setattr(base, "get_entity_cache", lambda: cache)
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessionmaker() as session:
+            session.add(Tenant(id="t1", name="Acme", slug="acme"))
+            session.add(Project(id="p1", tenant_id="t1", name="api"))
+            session.add(Service(id="s1", project_id="p1", name="web"))
+            await session.commit()
+            # Cache the row, then change it behind the cache's back
+            await ServiceRepository(session).get_by_id("s1")
+            await session.execute(text("UPDATE services SET name = 'worker' WHERE id = 's1'"))
+            await session.commit()
+
+        async with sessionmaker() as session:
+            repo = ServiceRepository(session)
+            assert (await repo.get_by_id("s1")).name == "web"
+            await repo.update("s1", {"name": "web"})
+            await session.commit()
+            name = await session.scalar(text("SELECT name FROM services WHERE id = 's1'"))
+            assert name == "web"
+        await engine.dispose()
+
+class TestEntitySerialization:
+    """Tests for converting entities to cacheable values."""
+
+    def test_entity_to_dict(self):
+        """Test column values are captured in JSON-safe form."""
+        from models.tenant import Tenant
+
+        created_at = datetime(2024, 1, 2, 3, 4, 5)
+        tenant = Tenant(id="t1", name="Acme", slug="acme", created_at=created_at)
+        data = entity_to_dict(tenant)
+        assert data["slug"] == "acme"
+        assert data["created_at"] == created_at.isoformat()
+        assert "projects" not in data
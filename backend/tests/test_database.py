@@ -0,0 +1,115 @@
+"""Unit tests for read-replica routing."""
+
+import itertools
+import time
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import database
+from database import Replica, RoutingSession
+from models import Build, Tenant
+
+
+class TestRoutingSession:
+    """Tests for routing statements between the primary and replicas."""
+
+    @pytest.fixture
+    def replica(self, monkeypatch):
+        """Install one healthy replica and an empty write history."""
+        replica = Replica(create_async_engine("sqlite+aiosqlite://"))
+        replica.lag = 0.0
+        monkeypatch.setattr(database, "replicas", [replica])
+        monkeypatch.setattr(database, "_replica_cycle", itertools.cycle([replica]))
+        monkeypatch.setattr(database, "_recent_writes", {})
+        return replica
+
+    def test_select_goes_to_replica(self, replica):
+        """Test plain reads are served by the replica."""
+        session = RoutingSession()
+        assert session.get_bind(clause=select(Tenant)) is replica.engine.sync_engine
+
+    def test_without_replicas_everything_goes_to_primary(self, monkeypatch):
+        """Test the primary serves reads when no replica is configured."""
+        monkeypatch.setattr(database, "replicas", [])
+        session = RoutingSession(bind=database.engine.sync_engine)
+        assert session.get_bind(clause=select(Tenant)) is database.engine.sync_engine
+
+    def test_write_pins_session_to_primary(self, replica):
+        """Test reads after a write in the same session use the primary."""
+        session = RoutingSession()
+        write = select(Build).from_statement(insert(Build).returning(Build))
+        assert session.get_bind(clause=write) is database.engine.sync_engine
+        assert session.get_bind(clause=select(Tenant)) is database.engine.sync_engine
+
+    def test_locking_and_text_statements_go_to_primary(self, replica):
+        """Test row locks and raw SQL are never sent to a replica."""
+        primary = database.engine.sync_engine
+        session = RoutingSession()
+        assert session.get_bind(clause=select(Tenant).with_for_update()) is primary
+        assert session.get_bind(clause=text("SELECT 1")) is primary
+
+    def test_lagging_replica_falls_back_to_primary(self, replica):
+        """Test a replica beyond the lag limit is skipped."""
+        replica.lag = database.REPLICA_MAX_LAG + 1
+        session = RoutingSession()
+        assert session.get_bind(clause=select(Tenant)) is database.engine.sync_engine
+
+    def test_recently_written_table_reads_from_primary(self, replica):
+        """Test tables written within the read-your-writes window use the primary."""
+        database._recent_writes["tenants"] = time.monotonic()
+        session = RoutingSession()
+        assert session.get_bind(clause=select(Tenant)) is database.engine.sync_engine
+        assert session.get_bind(clause=select(Build)) is replica.engine.sync_engine
+
+    def test_client_that_wrote_reads_from_primary(self, replica):
+        """Test a client within its read-your-writes window reads every table from the primary."""
+        token = database.client_writes.set(database.ClientWrites(time.time() + 5))
+        try:
+            session = RoutingSession()
+            assert session.get_bind(clause=select(Build)) is database.engine.sync_engine
+        finally:
+            database.client_writes.reset(token)
+
+
+class TestReadYourWritesMiddleware:
+    """Tests for carrying read-your-writes to other workers by cookie."""
+
+    @pytest.fixture
+    def client(self):
+        """Create an app whose /write endpoint commits a write."""
+        import httpx
+        from fastapi import FastAPI
+
+        from middleware.read_your_writes import ReadYourWritesMiddleware
+
+        app = FastAPI()
+        app.add_middleware(ReadYourWritesMiddleware)
+
+        @app.post("/write")
+        async def write():
+            database.client_writes.get().wrote = True
+
+        @app.get("/read")
+        async def read():
+            return {"pinned": database.client_writes.get().pinned}
+
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    @pytest.mark.anyio
+    async def test_write_pins_later_requests(self, client):
+        """Test a write sets the cookie and requests carrying it read from the primary."""
+        async with client:
+            assert (await client.get("/read")).json() == {"pinned": False}
+            response = await client.post("/write")
+            assert "db_primary_until=" in response.headers["set-cookie"]
+            assert (await client.get("/read")).json() == {"pinned": True}
+
+    def test_pin_is_capped(self):
+        """Test a forged far-future cookie pins no longer than the window."""
+        from middleware.read_your_writes import ReadYourWritesMiddleware
+
+        scope = {"headers": [(b"cookie", f"db_primary_until={time.time() + 10**9}".encode())]}
+        until = ReadYourWritesMiddleware(None)._pinned_until(scope)
+        assert until <= time.time() + database.READ_YOUR_WRITES_WINDOW
@@ -0,0 +1,137 @@
+"""Unit tests for conditional GETs and the response cache."""
+
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.projects import router
+from core import http_cache
+from core.http_cache import CONDITIONAL_RESPONSES, ResponseCache
+from database import Base, get_db
+from models import Project, Tenant
+
+
+class TestConditionalGet:
+    """Tests for ETag and Last-Modified handling on project endpoints."""
+
+    @pytest.fixture
+    async def sessionmaker(self):
+        """Create an in-memory database with one tenant and two projects."""
+        import models  # noqa: F401
+
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessionmaker() as session:
+            session.add(Tenant(id="t1", name="Acme", slug="acme"))
+            session.add_all(
+                [
+                    Project(id="p1", tenant_id="t1", name="api"),
+                    Project(id="p2", tenant_id="t1", name="web"),
+                ]
+            )
+            await session.commit()
+        yield sessionmaker
+        await engine.dispose()
+
+    @pytest.fixture
+    def client(self, sessionmaker):
+        """Create a client for the project endpoints."""
+        app = FastAPI()
+        app.include_router(router)
+
+        async def override_get_db():
+            async with sessionmaker() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        transport = httpx.ASGITransport(app=app)
+        return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    @pytest.mark.anyio
+    async def test_unchanged_list_is_not_modified(self, client):
+        """Test a matching If-None-Match gets 304 with no body."""
+        async with client:
+            first = await client.get("/tenants/t1/projects")
+            assert first.status_code == 200
+            assert first.json()["total"] == 2
+            etag = first.headers["etag"]
+
+            second = await client.get("/tenants/t1/projects", headers={"If-None-Match": etag})
+            assert second.status_code == 304
+            assert second.content == b""
+
+            other_page = await client.get(
+                "/tenants/t1/projects?limit=1", headers={"If-None-Match": etag}
+            )
+            assert other_page.status_code == 200
+
+    @pytest.mark.anyio
+    async def test_write_changes_etag(self, client, sessionmaker):
+        """Test updating or deleting a row invalidates the ETag."""
+        async with client:
+            etag = (await client.get("/tenants/t1/projects")).headers["etag"]
+
+            # SQLite's CURRENT_TIMESTAMP has whole seconds; set a later time directly
+            later = datetime.now(timezone.utc) + timedelta(seconds=5)
+            async with sessionmaker() as session:
+                await session.execute(
+                    update(Project).where(Project.id == "p1").values(updated_at=later)
+                )
+                await session.commit()
+            response = await client.get("/tenants/t1/projects", headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            etag = response.headers["etag"]
+
+            async with sessionmaker() as session:
+                await session.execute(delete(Project).where(Project.id == "p2"))
+                await session.commit()
+            response = await client.get("/tenants/t1/projects", headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.json()["total"] == 1
+
+    @pytest.mark.anyio
+    async def test_detail_last_modified(self, client):
+        """Test detail endpoints honour If-Modified-Since and 404 unknown ids."""
+        async with client:
+            first = await client.get("/projects/p1")
+            assert first.json()["name"] == "api"
+            last_modified = first.headers["last-modified"]
+
+            second = await client.get("/projects/p1", headers={"If-Modified-Since": last_modified})
+            assert second.status_code == 304
+            assert (await client.get("/projects/missing")).status_code == 404
+
+    @pytest.mark.anyio
+    async def test_response_cache_skips_rendering(self, client, monkeypatch):
+        """Test a cached body is served without rendering it again."""
+        monkeypatch.setattr(http_cache, "_response_cache", ResponseCache())
+        async with client:
+            first = await client.get("/tenants/t1/projects")
+            hits = CONDITIONAL_RESPONSES.value(result="cache_hit")
+            second = await client.get("/tenants/t1/projects")
+        assert second.content == first.content
+        assert CONDITIONAL_RESPONSES.value(result="cache_hit") == hits + 1
+
+    @pytest.mark.anyio
+    async def test_sparse_fieldset(self, client):
+        """Test fields= limits list items and rejects unknown fields."""
+        async with client:
+            response = await client.get("/tenants/t1/projects?fields=name&sort_order=asc")
+            assert response.json()["items"][0].keys() == {"id", "name"}
+            assert (await client.get("/tenants/t1/projects?fields=secret")).status_code == 400
+
+    @pytest.mark.anyio
+    async def test_invalid_sort_is_rejected(self, client):
+        """Test sort_by must be a field of the schema and sort_order asc or desc."""
+        async with client:
+            for query in ("sort_by=metadata", "sort_by=tenant", "sort_by=__init__", "sort_order=up"):
+                response = await client.get(f"/tenants/t1/projects?{query}")
+                assert response.status_code == 400, query
+            assert (await client.get("/tenants/t1/projects?sort_by=name")).status_code == 200
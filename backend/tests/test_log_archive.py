@@ -0,0 +1,134 @@
+"""Unit tests for compressed build log archives."""
+
+import gzip
+
+import pytest
+
+from core.log_archive import (
+    LocalDiskStorage,
+    archive_key,
+    compress_log,
+    read_all,
+    read_lines,
+    split_lines,
+)
+
+
+class RecordingStorage(LocalDiskStorage):
+    """Local storage remembering the byte ranges read."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.reads = []
+
+    def read_range(self, key, offset, length):
+        self.reads.append((offset, length))
+        return super().read_range(key, offset, length)
+
+
+class TestSplitLines:
+    """Tests for line splitting."""
+
+    def test_keeps_newlines(self):
+        """Test lines keep their newline and a trailing newline adds no line."""
+        assert split_lines("a\nb\n") == ["a\n", "b\n"]
+
+    def test_unterminated_last_line(self):
+        """Test a last line without newline is kept."""
+        assert split_lines("a\nb") == ["a\n", "b"]
+        assert split_lines("") == []
+
+
+class TestCompressLog:
+    """Tests for block-compressed log archives."""
+
+    @pytest.fixture
+    def log_text(self):
+        """Create a log of 2500 lines."""
+        return "".join(f"line {i}\n" for i in range(2500))
+
+    def test_archive_is_plain_gzip(self, log_text):
+        """Test the concatenated blocks decompress as one gzip file."""
+        data, index, line_count = compress_log(log_text, block_lines=1000)
+        assert gzip.decompress(data).decode() == log_text
+        assert line_count == 2500
+        assert [entry[0] for entry in index] == [0, 1000, 2000]
+        assert index[-1][1] + index[-1][2] == len(data)
+
+    def test_read_lines_reads_only_spanned_blocks(self, log_text, tmp_path):
+        """Test a line range decompresses only the blocks it overlaps."""
+        data, index, _ = compress_log(log_text, block_lines=1000)
+        storage = RecordingStorage(str(tmp_path))
+        key = archive_key("abcdef")
+        storage.write(key, data)
+
+        assert read_lines(storage, key, index, 1500, 3) == ["line 1500", "line 1501", "line 1502"]
+        assert storage.reads[-1] == (index[1][1], index[1][2])
+
+        assert read_lines(storage, key, index, 998, 4) == [
+            "line 998",
+            "line 999",
+            "line 1000",
+            "line 1001",
+        ]
+        assert storage.reads[-1] == (0, index[1][1] + index[1][2])
+
+    def test_read_past_end(self, log_text, tmp_path):
+        """Test reading beyond the last line returns what is left."""
+        data, index, _ = compress_log(log_text, block_lines=1000)
+        storage = LocalDiskStorage(str(tmp_path))
+        storage.write("log.gz", data)
+        assert read_lines(storage, "log.gz", index, 2498, 10) == ["line 2498", "line 2499"]
+        assert read_all(storage, "log.gz", index) == log_text
+
+    def test_empty_log(self, tmp_path):
+        """Test an empty log archives to nothing."""
+        data, index, line_count = compress_log("")
+        assert (data, index, line_count) == (b"", [], 0)
+        assert read_lines(LocalDiskStorage(str(tmp_path)), "none", index, 0, 10) == []
+
+
+class TestArchivedReads:
+    """Tests for reading build output once its chunks are archived."""
+
+    @pytest.fixture
+    async def session(self):
+        """Create an in-memory database with one finished build and its log."""
+        import models  # noqa: F401
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from database import Base
+        from models import Build, Project, Service, Tenant
+        from models.base import BuildStatus
+
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            session.add(Tenant(id="t1", name="Acme", slug="acme"))
+            session.add(Project(id="p1", tenant_id="t1", name="api"))
+            session.add(Service(id="s1", project_id="p1", name="web"))
+            session.add(Build(id="b1", service_id="s1", status=BuildStatus.SUCCESS))
+            await session.commit()
+            yield session
+        await engine.dispose()
+
+    @pytest.mark.anyio
+    async def test_offset_reads_and_follow_use_the_archive(self, session, tmp_path):
+        """Test reads past offset 0 and follows still see an archived log."""
+        from repositories.build_log import BuildLogArchiveRepository, BuildLogRepository
+
+        storage = LocalDiskStorage(str(tmp_path))
+        logs = BuildLogRepository(session, storage)
+        await logs.append("b1", "step 1\n")
+        await logs.append("b1", "step 2\n")
+        await BuildLogArchiveRepository(session, storage).archive("b1")
+        await session.commit()
+
+        log_slice = await logs.read("b1", offset=7)
+        assert (log_slice.content, log_slice.next_offset) == ("step 2\n", 14)
+        assert log_slice.archived
+        assert [content async for content in logs.follow("b1", offset=3, poll_interval=60)] == [
+            "p 1\nstep 2\n"
+        ]
+        assert [content async for content in logs.follow("b1", offset=14, poll_interval=60)] == []
@@ -0,0 +1,193 @@
+"""Unit tests for in-process metrics and database instrumentation."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.metrics import MetricsRegistry
+
+
+class TestMetrics:
+    """Tests for counters, gauges and histograms."""
+
+    @pytest.fixture
+    def registry(self):
+        """Create an empty registry."""
+        return MetricsRegistry()
+
+    def test_counter_per_label(self, registry):
+        """Test counters keep one value per label combination."""
+        counter = registry.counter("requests_total", "Requests", ("method",))
+        counter.inc(method="GET")
+        counter.inc(2, method="GET")
+        counter.inc(method="POST")
+        assert counter.value(method="GET") == 3
+        assert counter.value(method="POST") == 1
+
+    def test_gauge_function(self, registry):
+        """Test callback gauges are read when collected."""
+        gauge = registry.gauge("in_use", "In use", ("engine",))
+        values = iter([1, 5])
+        gauge.set_function(lambda: next(values), engine="primary")
+        assert gauge.value(engine="primary") == 1
+        assert gauge.samples() == [{"labels": {"engine": "primary"}, "value": 5}]
+
+    def test_histogram_cumulative_buckets(self, registry):
+        """Test histogram buckets are cumulative and end with +Inf."""
+        histogram = registry.histogram("latency", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value)
+        sample = histogram.samples()[0]
+        assert sample["buckets"] == [(0.1, 1), (1.0, 3), ("+Inf", 4)]
+        assert sample["count"] == 4
+        assert sample["sum"] == pytest.approx(4.05)
+
+    def test_same_name_returns_same_metric(self, registry):
+        """Test registering a name twice returns the existing metric."""
+        assert registry.counter("a", "A") is registry.counter("a", "A")
+        with pytest.raises(ValueError):
+            registry.gauge("a", "A")
+
+
+class TestDatabaseInstrumentation:
+    """Tests for statement timing and the slow query log."""
+
+    def test_redact_parameters(self):
+        """Test parameter values never reach the slow query log."""
+        from core.db_metrics import redact_parameters
+
+        assert redact_parameters({"email": "a@b.c"}) == {"email": "?"}
+        assert redact_parameters(("secret", 1)) == ["?", "?"]
+        assert redact_parameters([("a",), ("b",)]) == "<2 parameter sets>"
+
+    @pytest.mark.anyio
+    async def test_statements_timed_and_slow_ones_logged(self, monkeypatch):
+        """Test statements are timed per operation and slow ones are kept."""
+        from core import db_metrics
+
+        monkeypatch.setattr(db_metrics, "SLOW_QUERY_THRESHOLD", 0.0)
+        engine = create_async_engine("sqlite+aiosqlite://")
+        db_metrics.instrument_engine(engine, "test")
+        before = db_metrics.STATEMENT_SECONDS.count(engine="test", operation="SELECT")
+
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT :value"), {"value": "hunter2"})
+            with pytest.raises(Exception):
+                await conn.execute(text("SELECT missing FROM nowhere"))
+        await engine.dispose()
+
+        assert db_metrics.STATEMENT_SECONDS.count(engine="test", operation="SELECT") == before + 1
+        assert db_metrics.STATEMENT_ERRORS.value(engine="test", operation="SELECT") == 1
+        slow = [entry for entry in db_metrics.SLOW_QUERIES if entry["engine"] == "test"]
+        assert slow[-1]["statement"] == "SELECT ?"
+        assert "hunter2" not in str(slow[-1]["parameters"])
+
+
+class TestPrometheusExposition:
+    """Tests for the Prometheus text format and HTTP metrics."""
+
+    def test_render_histogram_and_labels(self):
+        """Test histograms render buckets, sum and count with escaped labels."""
+        from core.metrics import render_prometheus
+
+        registry = MetricsRegistry()
+        registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.5,)).observe(
+            0.2, route='/a"b'
+        )
+        registry.gauge("in_flight", "In flight").set(2)
+        text_output = render_prometheus(registry)
+
+        assert "# TYPE latency_seconds histogram" in text_output
+        assert 'latency_seconds_bucket{route="/a\\"b",le="0.5"} 1' in text_output
+        assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 1' in text_output
+        assert 'latency_seconds_count{route="/a\\"b"} 1' in text_output
+        assert "in_flight 2" in text_output
+
+    @pytest.mark.anyio
+    async def test_requests_labelled_by_route_template(self):
+        """Test request latency uses the route template, not the raw path."""
+        import httpx
+        from fastapi import FastAPI
+
+        from middleware.metrics import REQUEST_SECONDS, REQUESTS_IN_FLIGHT, MetricsMiddleware
+
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/widgets/{widget_id}")
+        async def widget(widget_id: str):
+            return {"id": widget_id}
+
+        labels = {"method": "GET", "route": "/widgets/{widget_id}", "status": "200"}
+        before = REQUEST_SECONDS.count(**labels)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/widgets/1")
+            await client.get("/widgets/2")
+
+        assert REQUEST_SECONDS.count(**labels) == before + 2
+        assert REQUESTS_IN_FLIGHT.value() == 0
+
+
+class TestWorkerMetrics:
+    """Tests for metrics shared between serve.py workers."""
+
+    def test_merge_sums_counters_and_labels_gauges(self):
+        """Test counters and histograms add up while gauges stay per worker."""
+        from core.metrics import merge_snapshots
+
+        snapshots = {}
+        for worker, requests in (("1", 2), ("2", 3)):
+            registry = MetricsRegistry()
+            registry.counter("requests_total", "Requests").inc(requests)
+            registry.histogram("latency", "Latency", buckets=(1.0,)).observe(0.5)
+            registry.gauge("in_flight", "In flight").set(requests)
+            snapshots[worker] = registry.snapshot()
+
+        merged = merge_snapshots(snapshots)
+        assert merged["requests_total"]["samples"] == [{"labels": {}, "value": 5}]
+        histogram = merged["latency"]["samples"][0]
+        assert histogram["buckets"] == [[1.0, 2], ["+Inf", 2]]
+        assert histogram["count"] == 2
+        assert [s["labels"] for s in merged["in_flight"]["samples"]] == [
+            {"worker": "1"},
+            {"worker": "2"},
+        ]
+        assert "in_flight" not in merge_snapshots(snapshots, gauges=False)
+
+    def test_retired_worker_counts_are_kept(self, tmp_path):
+        """Test an exited worker's counters stay in the aggregate."""
+        import json
+
+        from core.worker_metrics import aggregate, retire_worker
+
+        dead = MetricsRegistry()
+        dead.counter("requests_total", "Requests").inc(4)
+        (tmp_path / "worker-99999.json").write_text(json.dumps(dead.snapshot()))
+        retire_worker(str(tmp_path), 99999)
+        assert not (tmp_path / "worker-99999.json").exists()
+
+        live = MetricsRegistry()
+        live.counter("requests_total", "Requests").inc()
+        merged = aggregate(str(tmp_path), live)
+        assert merged["requests_total"]["samples"][0]["value"] == 5
+
+    def test_queue_gauges_are_not_per_worker(self, tmp_path):
+        """Test deployment-wide queue gauges stay out of the worker snapshots."""
+        from core.queue_metrics import CELERY_QUEUE_LENGTH, QUEUE_REGISTRY
+        from core.worker_metrics import aggregate
+
+        CELERY_QUEUE_LENGTH.set(7, queue="builds")
+        assert "celery_queue_length" not in aggregate(str(tmp_path))
+        samples = QUEUE_REGISTRY.snapshot()["celery_queue_length"]["samples"]
+        assert {"labels": {"queue": "builds"}, "value": 7} in samples
+
+    def test_worker_pool_limits(self):
+        """Test per-worker pools fit the connection budget during restarts."""
+        from serve import worker_pool_limits
+
+        pool_size, max_overflow = worker_pool_limits(4, max_connections=100, reserved=20)
+        assert (pool_size, max_overflow) == (6, 10)
+        assert (4 + 1) * (pool_size + max_overflow) <= 100 - 20
+        with pytest.raises(ValueError):
+            worker_pool_limits(10, max_connections=25, reserved=20)
@@ -0,0 +1,171 @@
+"""Unit tests for the batched service health monitor."""
+
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import Project, Service, Tenant
+from models.base import ServiceStatus
+from tasks import monitor
+
+
+def test_parse_docker_stats():
+    """Test CPU and memory are parsed from docker stats lines."""
+    output = "service-s1\t12.50%\t128MiB / 1.944GiB\nother\t--\t0B / 0B\nbroken line\n"
+    assert monitor.parse_docker_stats(output) == {
+        "service-s1": {"cpu_percent": 12.5, "memory_bytes": 128 * 1024**2},
+        "other": {"cpu_percent": None, "memory_bytes": 0},
+    }
+
+
+class Requests(list):
+    """Ports probed; every service answers on ``healthy_path`` once it is set."""
+
+    healthy_path = None
+
+
+class TestMonitorShard:
+    """Tests for checking a shard of services against the database."""
+
+    @pytest.fixture
+    async def sessionmaker(self, monkeypatch):
+        """Create an in-memory database with running services and stub docker stats."""
+        import models  # noqa: F401
+
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessionmaker() as session:
+            session.add_all(
+                [
+                    Tenant(id="t1", name="Tenant", slug="tenant"),
+                    Project(id="p1", tenant_id="t1", name="app"),
+                    Service(id="up", project_id="p1", name="up", port=8001),
+                    Service(id="down", project_id="p1", name="down", port=8002),
+                    Service(id="worker", project_id="p1", name="worker"),
+                    Service(id="gone", project_id="p1", name="gone"),
+                    Service(
+                        id="deploying",
+                        project_id="p1",
+                        name="deploying",
+                        port=8003,
+                        status=ServiceStatus.BUILDING,
+                    ),
+                ]
+            )
+            for service_id in ("up", "down", "worker", "gone"):
+                (await session.get(Service, service_id)).status = ServiceStatus.RUNNING
+            await session.commit()
+
+        async def container_stats():
+            return {
+                "service-up": {"cpu_percent": 3.0, "memory_bytes": 1024},
+                "service-worker": {"cpu_percent": 50.0, "memory_bytes": 2048},
+            }
+
+        monkeypatch.setattr(monitor, "TaskSessionLocal", sessionmaker)
+        monkeypatch.setattr(monitor, "container_stats", container_stats)
+        yield sessionmaker
+        await engine.dispose()
+
+    @pytest.fixture
+    def requests(self, monkeypatch):
+        """Serve health checks from a stub transport, recording the requests."""
+        seen = Requests()
+
+        def handler(request):
+            seen.append(request.url.port)
+            if request.url.port == 8001 or request.url.path == seen.healthy_path:
+                return httpx.Response(200)
+            return httpx.Response(503)
+
+        transport = httpx.MockTransport(handler)
+        original = monitor.check_services
+
+        async def check_services(services):
+            async with httpx.AsyncClient(transport=transport) as client:
+                return await original(services, client=client)
+
+        monkeypatch.setattr(monitor, "check_services", check_services)
+        return seen
+
+    @pytest.mark.anyio
+    async def test_marks_failed_after_consecutive_failures(
+        self, sessionmaker, requests, monkeypatch
+    ):
+        """Test services are marked failed only after the threshold, skipping ones not running."""
+        monkeypatch.setattr(monitor, "MONITOR_FAILURE_THRESHOLD", 2)
+        shard = ["up", "down", "worker", "gone", "deploying"]
+
+        result = await monitor.monitor_service_shard(shard)
+        assert result["checked"] == 5
+        assert result["healthy"] == 2
+        # "deploying" fails too, but its status is not the monitor's to change
+        assert result["unhealthy"] == 3
+        assert result["failed"] == []
+        readings = {service["service_id"]: service for service in result["services"]}
+        assert readings["up"]["cpu_percent"] == 3.0
+        assert readings["worker"]["memory_bytes"] == 2048
+        # Unhealthy endpoints are retried within a check
+        assert requests.count(8002) == monitor.MONITOR_PROBE_ATTEMPTS
+
+        result = await monitor.monitor_service_shard(shard)
+        assert sorted(result["failed"]) == ["down", "gone"]
+        assert await self.statuses(sessionmaker) == {
+            "up": ServiceStatus.RUNNING,
+            "down": ServiceStatus.FAILED,
+            "worker": ServiceStatus.RUNNING,
+            "gone": ServiceStatus.FAILED,
+            "deploying": ServiceStatus.BUILDING,
+        }
+
+    @pytest.mark.anyio
+    async def test_passing_check_resets_count_and_recovers(
+        self, sessionmaker, requests, monkeypatch
+    ):
+        """Test a passing check clears failure counts and recovers services the monitor failed."""
+        monkeypatch.setattr(monitor, "MONITOR_FAILURE_THRESHOLD", 1)
+        async with sessionmaker() as session:
+            (await session.get(Service, "up")).health_check_failures = 5
+            await session.commit()
+        assert (await monitor.monitor_service_shard(["down"]))["failed"] == ["down"]
+
+        monkeypatch.setattr(monitor, "DEPLOY_HEALTH_CHECK_PATH", "/ok")
+        requests.healthy_path = "/ok"
+        result = await monitor.monitor_service_shard(["up", "down"])
+        assert result["recovered"] == ["down"]
+        async with sessionmaker() as session:
+            for service_id in ("up", "down"):
+                service = await session.get(Service, service_id)
+                assert service.status == ServiceStatus.RUNNING
+                assert service.health_check_failures == 0
+
+    @pytest.mark.anyio
+    async def test_plan_shards(self, sessionmaker):
+        """Test running and monitor-failed services are split into shards of the given size."""
+        async with sessionmaker() as session:
+            session.add(
+                Service(id="crashed", project_id="p1", name="crashed", status=ServiceStatus.FAILED)
+            )
+            session.add(
+                Service(
+                    id="flapping",
+                    project_id="p1",
+                    name="flapping",
+                    status=ServiceStatus.FAILED,
+                    health_check_failures=3,
+                )
+            )
+            await session.commit()
+        shards = await monitor.plan_shards(shard_size=3)
+        assert [len(shard) for shard in shards] == [3, 2]
+        assert sum(shards, []) == ["down", "flapping", "gone", "up", "worker"]
+
+    async def statuses(self, sessionmaker):
+        async with sessionmaker() as session:
+            services = (await session.execute(select(Service))).scalars()
+            return {service.id: service.status for service in services}
@@ -0,0 +1,360 @@
+"""Unit tests for the build pipeline engine and build requests."""
+
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from core.pipeline import (
+    CANCELLED,
+    FAILED,
+    SKIPPED,
+    SUCCESS,
+    TIMED_OUT,
+    Pipeline,
+    Step,
+    StepFailed,
+    run_pipeline,
+)
+from database import Base
+from models import Build, Project, Service, Tenant
+from models.base import BuildStatus
+from repositories.base import LoadProfile
+from repositories.build import BuildRepository
+from tasks.pipeline import load_context, run_command
+
+
+def step(name, events, depends_on=(), seconds=0.05, result=None, timeout=600.0):
+    """Create a step that records its start and end around a sleep."""
+
+    async def run(context):
+        events.append(("start", name))
+        await asyncio.sleep(seconds)
+        events.append(("end", name))
+        return result
+
+    return Step(name, run, tuple(depends_on), timeout)
+
+
+@pytest.fixture
+async def session():
+    """Create an in-memory database with one build."""
+    import models  # noqa: F401
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        session.add(Tenant(id="t1", name="Acme", slug="acme"))
+        session.add(Project(id="p1", tenant_id="t1", name="api"))
+        session.add(Service(id="s1", project_id="p1", name="web", port=8080))
+        session.add(
+            Build(
+                id="b1",
+                service_id="s1",
+                commit_sha="abc123",
+                build_metadata={"trigger": "push"},
+            )
+        )
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+class TestPipeline:
+    """Tests for DAG validation."""
+
+    def test_unknown_dependency(self):
+        """Test depending on a missing step is rejected."""
+        with pytest.raises(ValueError, match="unknown"):
+            Pipeline("p", [step("a", [], ["b"])])
+
+    def test_cycle(self):
+        """Test a dependency cycle is rejected."""
+        with pytest.raises(ValueError, match="cycle"):
+            Pipeline("p", [step("a", [], ["b"]), step("b", [], ["a"])])
+
+    def test_order(self):
+        """Test steps are ordered after their dependencies."""
+        events = []
+        pipeline = Pipeline(
+            "p", [step("c", events, ["b"]), step("b", events, ["a"]), step("a", events)]
+        )
+        assert pipeline.order == ["a", "b", "c"]
+
+
+class TestRunPipeline:
+    """Tests for running a pipeline."""
+
+    @pytest.mark.anyio
+    async def test_independent_steps_run_in_parallel(self):
+        """Test steps with met dependencies overlap and reports track progress."""
+        events = []
+        reports = []
+
+        async def report(state):
+            reports.append({name: s["status"] for name, s in state["steps"].items()})
+
+        pipeline = Pipeline(
+            "build",
+            [
+                step("clone", events),
+                step("build", events, ["clone"]),
+                step("test", events, ["clone"], result=SKIPPED),
+                step("release", events, ["build", "test"]),
+            ],
+        )
+        state = await run_pipeline(pipeline, None, report)
+
+        assert state["status"] == SUCCESS
+        assert state["steps"]["test"]["status"] == SKIPPED
+        assert state["steps"]["release"]["status"] == SUCCESS
+        # build and test both start before either ends
+        middle = events[2:6]
+        assert [kind for kind, _ in middle] == ["start", "start", "end", "end"]
+        assert {"build": "running", "test": "running"}.items() <= reports[1].items()
+        assert all(s["duration_seconds"] is not None for s in state["steps"].values())
+
+    @pytest.mark.anyio
+    async def test_failure_cancels_running_and_skips_dependents(self):
+        """Test a failed step cancels its siblings and skips what comes after."""
+        events = []
+
+        async def fail(context):
+            raise StepFailed("exit status 1")
+
+        pipeline = Pipeline(
+            "build",
+            [
+                Step("test", fail),
+                step("build", events, seconds=5),
+                step("release", events, ["build", "test"]),
+            ],
+        )
+        state = await asyncio.wait_for(run_pipeline(pipeline, None), timeout=2)
+
+        assert state["status"] == FAILED
+        assert state["steps"]["test"]["status"] == FAILED
+        assert state["steps"]["test"]["error"] == "exit status 1"
+        assert state["steps"]["build"]["status"] == CANCELLED
+        assert state["steps"]["release"]["status"] == SKIPPED
+        assert state["steps"]["release"]["started_at"] is None
+        assert ("end", "build") not in events
+
+    @pytest.mark.anyio
+    async def test_step_timeout(self):
+        """Test a step exceeding its timeout fails the pipeline."""
+        pipeline = Pipeline("deploy", [step("health_check", [], seconds=5, timeout=0.05)])
+        state = await asyncio.wait_for(run_pipeline(pipeline, None), timeout=2)
+        assert state["status"] == FAILED
+        assert state["steps"]["health_check"]["status"] == TIMED_OUT
+
+
+class TestBuildRecorder:
+    """Tests for recording pipeline progress on a build."""
+
+    @pytest.mark.anyio
+    async def test_progress_and_output_are_stored(self, session):
+        """Test step states land in build_metadata and command output in the log."""
+        context = await load_context(session, "b1")
+        assert context.image_tag == "service-s1:abc123"
+
+        async def echo(context):
+            await run_command(context, "build", "sh", "-c", "echo one; echo two")
+
+        pipeline = Pipeline("build", [Step("build", echo)])
+        await run_pipeline(pipeline, context, context.recorder.report)
+
+        repo = BuildRepository(session)
+        metadata = await repo.get_metadata("b1")
+        assert metadata["trigger"] == "push"
+        assert metadata["pipelines"]["build"]["status"] == SUCCESS
+        assert metadata["pipelines"]["build"]["steps"]["build"]["status"] == SUCCESS
+        logs = await repo.get_logs("b1")
+        assert "[build] one\n[build] two\n" in logs
+
+    @pytest.mark.anyio
+    async def test_timeout_during_commit_finishes_the_write(self, session, monkeypatch):
+        """Test a step timing out mid-commit does not leave the session halfway through it."""
+        context = await load_context(session, "b1")
+        events = []
+        commit = session.commit
+
+        async def slow_commit():
+            events.append("begin")
+            await asyncio.sleep(0.1)
+            await commit()
+            events.append("end")
+
+        monkeypatch.setattr(session, "commit", slow_commit)
+
+        async def chatty(context):
+            await context.recorder.log("working\n")
+
+        pipeline = Pipeline("build", [Step("build", chatty, timeout=0.05)])
+        state = await run_pipeline(pipeline, context, context.recorder.report)
+        await context.recorder.flush()
+
+        assert state["steps"]["build"]["status"] == TIMED_OUT
+        assert events == ["begin", "end"] * (len(events) // 2)
+        assert "working\n" in await BuildRepository(session).get_logs("b1")
+
+    @pytest.mark.anyio
+    async def test_tenant_code_runs_in_a_container(self, session, monkeypatch):
+        """Test install and test commands run in a container that gets no worker environment."""
+        from tasks import build
+
+        commands = []
+
+        async def record(context, step, *argv, **kwargs):
+            commands.append((argv, kwargs))
+            return 0
+
+        monkeypatch.setattr(build, "run_command", record)
+        context = await load_context(session, "b1")
+        await build.run_sandboxed(context, "test", "node", "npm", "test")
+
+        [(argv, kwargs)] = commands
+        assert argv[:3] == ("docker", "run", "--rm")
+        assert f"{context.source_dir}:{build.SANDBOX_WORKDIR}" in argv
+        assert argv[-3:] == (build.BUILD_IMAGES["node"], "npm", "test")
+        assert "env" not in kwargs
+        variables = [argv[i + 1] for i, arg in enumerate(argv) if arg == "-e"]
+        assert variables == ["HOME=/tmp", "CI=true"]
+
+
+    @pytest.mark.anyio
+    async def test_service_variables_go_to_an_env_file(self, session, monkeypatch):
+        """Test deploys pass service variables in a file, not to the docker CLI's environment."""
+        import os
+
+        from tasks import deploy
+
+        commands = []
+
+        async def record(context, step, *argv, **kwargs):
+            env_file = argv[argv.index("--env-file") + 1] if "--env-file" in argv else None
+            contents = open(env_file).read() if env_file else None
+            commands.append((argv, kwargs, env_file, contents))
+            return 0
+
+        monkeypatch.setattr(deploy, "run_command", record)
+        context = await load_context(session, "b1")
+        context.env = {"DOCKER_HOST": "tcp://evil:2375", "API_KEY": "secret"}
+        await deploy.start_container(context)
+
+        (_, remove_kwargs, _, _), (argv, kwargs, env_file, contents) = commands
+        assert remove_kwargs == {"check": False}
+        assert "env" not in kwargs
+        assert "secret" not in " ".join(argv)
+        assert contents == "DOCKER_HOST=tcp://evil:2375\nAPI_KEY=secret\nPORT=8080\n"
+        assert not os.path.exists(env_file)
+
+        context.env = {"CERT": "line one\nline two"}
+        with pytest.raises(StepFailed):
+            await deploy.start_container(context)
+
+class TestBuildCoalescing:
+    """Tests for coalescing and superseding build requests."""
+
+    @pytest.mark.anyio
+    async def test_same_commit_joins_in_flight_build(self, session):
+        """Test a repeated request for a pending commit returns its build."""
+        repo = BuildRepository(session)
+        first = await repo.request_build("s1", "def456", "main")
+        second = await repo.request_build("s1", "def456", "main")
+        assert first.created and not second.created
+        assert second.build.id == first.build.id
+
+    @pytest.mark.anyio
+    async def test_newer_commit_supersedes_pending_builds(self, session):
+        """Test only pending builds of the same branch are cancelled."""
+        repo = BuildRepository(session)
+        older = await repo.request_build("s1", "c1", "main")
+        running = await repo.request_build("s1", "c2", "main")
+        assert running.superseded == [older.build.id]
+        await repo.claim_build(running.build.id)
+        preview = await repo.request_build("s1", "c3", "preview")
+
+        newest = await repo.request_build("s1", "c4", "main")
+        assert newest.superseded == []
+        await session.commit()
+
+        statuses = {
+            build_id: (await repo.get_by_id(build_id, LoadProfile.SUMMARY)).status
+            for build_id in (older.build.id, running.build.id, preview.build.id)
+        }
+        assert statuses == {
+            older.build.id: BuildStatus.CANCELLED,
+            running.build.id: BuildStatus.BUILDING,
+            preview.build.id: BuildStatus.PENDING,
+        }
+        assert "Superseded by build" in await repo.get_logs(older.build.id)
+        # A superseded build's task finds nothing to claim
+        assert await repo.claim_build(older.build.id) is None
+
+    @pytest.mark.anyio
+    async def test_cancel_leaves_started_builds(self, session):
+        """Test cancelling only stops builds that have not been claimed."""
+        repo = BuildRepository(session)
+        pending = await repo.request_build("s1", "c1", "main")
+        started = await repo.request_build("s1", "c2", "preview")
+        await repo.claim_build(started.build.id)
+
+        cancelled = await repo.cancel_pending([pending.build.id, started.build.id])
+        assert cancelled == [pending.build.id]
+        # A cancelled commit is built again when pushed again
+        again = await repo.request_build("s1", "c1", "main")
+        assert again.created and again.build.id != pending.build.id
+
+    @pytest.mark.anyio
+    async def test_push_webhooks_request_coalesced_builds(self, session, monkeypatch):
+        """Test signed pushes request builds through request_build and enqueue them."""
+        import hashlib
+        import hmac
+        import json
+
+        import httpx
+        from fastapi import FastAPI
+
+        from api.webhooks import router
+        from database import get_db
+        from models import Webhook
+        from tasks import scheduler
+
+        session.add(Webhook(id="w1", service_id="s1", secret="shh", url="https://example.com"))
+        await session.commit()
+        enqueued = []
+        monkeypatch.setattr(scheduler, "enqueue_build", enqueued.append)
+
+        app = FastAPI()
+        app.include_router(router)
+
+        async def override_get_db():
+            yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+
+        def push(sha, event="push", secret="shh"):
+            payload = {"ref": "refs/heads/main", "after": sha, "head_commit": {"message": sha}}
+            body = json.dumps(payload).encode()
+            signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+            headers = {"X-GitHub-Event": event, "X-Hub-Signature-256": signature}
+            return client.post("/webhooks/w1", content=body, headers=headers)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await push("c1", secret="wrong")).status_code == 401
+            assert (await push("c1", event="ping")).json()["status"] == "ignored"
+            first = (await push("c1")).json()
+            repeat = (await push("c1")).json()
+            second = (await push("c2")).json()
+
+        assert first["status"] == "queued"
+        assert repeat == {"status": "joined", "build_id": first["build_id"], "superseded": []}
+        assert second["superseded"] == [first["build_id"]]
+        assert [request.superseded for request in enqueued] == [[], [], [first["build_id"]]]
+        build = await BuildRepository(session).get_by_id(second["build_id"], LoadProfile.SUMMARY)
+        assert (build.git_branch, build.commit_sha) == ("main", "c2")
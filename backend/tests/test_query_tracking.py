@@ -0,0 +1,77 @@
+"""Unit tests for per-request query tracking and budgets."""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.db_metrics import instrument_engine
+from core.query_tracker import QueryBudgetExceeded, QueryStats, query_budget, statement_shape
+from middleware.query_tracking import QueryTrackingMiddleware
+
+
+class TestStatementShape:
+    """Tests for statement normalization."""
+
+    def test_expanded_in_lists_collapse(self):
+        """Test IN lists of any length have the same shape."""
+        assert statement_shape("SELECT a FROM t WHERE id IN ($1, $2, $3)") == statement_shape(
+            "SELECT a FROM t WHERE id IN ($1)"
+        )
+
+    def test_repeated_shapes(self):
+        """Test shapes executed often enough are reported."""
+        stats = QueryStats()
+        for i in range(5):
+            stats.record(f"SELECT * FROM services WHERE id = ${i + 1}", 0.001)
+        stats.record("SELECT * FROM projects", 0.001)
+        assert stats.repeated_shapes(threshold=5) == {"SELECT * FROM services WHERE id = ?": 5}
+        assert stats.count == 6
+
+
+class TestQueryTrackingMiddleware:
+    """Tests for the query tracking middleware."""
+
+    @pytest.fixture
+    def engine(self):
+        """Create an instrumented in-memory engine."""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        instrument_engine(engine, "tracking-test")
+        return engine
+
+    def _app(self, engine, **options):
+        app = FastAPI()
+        app.add_middleware(QueryTrackingMiddleware, **options)
+
+        @app.get("/items")
+        @query_budget(2)
+        async def items():
+            async with engine.connect() as conn:
+                for i in range(3):
+                    await conn.execute(text(f"SELECT {i}"))
+            return {"ok": True}
+
+        return app
+
+    @pytest.mark.anyio
+    async def test_headers_report_query_count(self, engine):
+        """Test development headers carry the statement count."""
+        app = self._app(engine, emit_headers=True)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/items")
+        assert response.status_code == 200
+        assert response.headers["x-db-query-count"] == "3"
+        assert float(response.headers["x-db-time-ms"]) >= 0
+
+    @pytest.mark.anyio
+    async def test_enforced_budget_fails_request(self, engine):
+        """Test exceeding an enforced budget raises QueryBudgetExceeded."""
+        app = self._app(engine, enforce_budgets=True)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with pytest.raises(QueryBudgetExceeded) as exc_info:
+                await client.get("/items")
+        assert exc_info.value.budget == 2
+        assert exc_info.value.count == 3
@@ -8,6 +8,9 @@ from datetime import datetime
 from repositories.base import (
     BaseRepository,
     ConflictError,
+    CountMode,
+    Cursor,
+    InvalidCursorError,
     NotFoundError,
     PaginatedResult,
     PaginationParams,
@@ -47,6 +50,18 @@ class TestPaginationParams:
         params = PaginationParams(skip=0, limit=0)
         assert params.limit == 1
 
+    def test_offset_mode_by_default(self):
+        """Test keyset pagination is off by default."""
+        params = PaginationParams()
+        assert params.cursor is None
+        assert params.keyset is False
+
+    def test_cursor_enables_keyset(self):
+        """Test passing a cursor switches to keyset pagination."""
+        params = PaginationParams(limit=20, cursor="abc")
+        assert params.keyset is True
+        assert params.cursor == "abc"
+
 
 class TestSortParams:
     """Tests for SortParams."""
@@ -107,6 +122,166 @@ class TestPaginatedResult:
         assert result.has_more is False
 
 
+class TestCountMode:
+    """Tests for CountMode."""
+
+    def test_values(self):
+        """Test count modes accept their string values."""
+        assert CountMode("exact") is CountMode.EXACT
+        assert CountMode("none") is CountMode.NONE
+        assert CountMode("estimate") is CountMode.ESTIMATE
+
+    def test_result_without_total(self):
+        """Test a count-free result relies on the explicit has_more."""
+        result = PaginatedResult(items=["a", "b"], total=None, skip=0, limit=2)
+        assert result.total is None
+        assert result.has_more is False
+
+        result = PaginatedResult(items=["a", "b"], total=None, skip=0, limit=2, has_more=True)
+        assert result.has_more is True
+
+    def test_estimated_total_flag(self):
+        """Test estimated totals are flagged on the result."""
+        result = PaginatedResult(
+            items=["a"], total=5000, skip=0, limit=1, total_is_estimate=True
+        )
+        assert result.total_is_estimate is True
+        assert result.has_more is True
+
+
+    @pytest.mark.anyio
+    async def test_filtered_estimates_are_cached_in_a_bounded_lru(self, monkeypatch):
+        """Test filtered counts are reused, and old filter combinations are evicted."""
+        from core.cache import LRUCache
+        from repositories import base
+        from repositories.service import ServiceRepository
+
+        estimates = LRUCache(maxsize=2, ttl=60)
+        monkeypatch.setattr(base, "_count_estimates", estimates)
+        session = AsyncMock()
+        session.info = {}
+        session.get_bind = MagicMock()
+        session.execute = AsyncMock(return_value=MagicMock(scalar=MagicMock(return_value=7)))
+        repo = ServiceRepository(session)
+
+        for name in ("a", "b", "a", "c", "d"):
+            await repo.list({"name": name}, count_mode=CountMode.ESTIMATE)
+        assert len(estimates) == 2
+        assert estimates.get(("services", (("name", "a"),))) is None
+        assert estimates.get(("services", (("name", "d"),))) == 7
+
+class TestCursor:
+    """Tests for keyset pagination cursors."""
+
+    def test_round_trip_datetime(self):
+        """Test a created_at cursor decodes back to a datetime."""
+        from models.build import Build
+
+        created_at = datetime(2024, 5, 1, 12, 30, 15)
+        token = Cursor("created_at", created_at, "build-1", Cursor.PREV).encode()
+        cursor = Cursor.decode(token, Build.created_at)
+        assert cursor.value == created_at
+        assert cursor.entity_id == "build-1"
+        assert cursor.direction == Cursor.PREV
+
+    def test_round_trip_string(self):
+        """Test a string column cursor round trip."""
+        from models.service import Service
+
+        token = Cursor("name", "api", "svc-1").encode()
+        cursor = Cursor.decode(token, Service.name)
+        assert cursor.value == "api"
+        assert cursor.direction == Cursor.NEXT
+
+    def test_sort_mismatch_rejected(self):
+        """Test a cursor cannot be reused with a different sort column."""
+        from models.service import Service
+
+        token = Cursor("name", "api", "svc-1").encode()
+        with pytest.raises(InvalidCursorError):
+            Cursor.decode(token, Service.created_at)
+
+    def test_sort_order_mismatch_rejected(self):
+        """Test a cursor cannot be reused with the opposite sort order."""
+        from models.service import Service
+
+        token = Cursor("name", "api", "svc-1", sort_order="asc").encode()
+        assert Cursor.decode(token, Service.name, "asc").sort_order == "asc"
+        with pytest.raises(InvalidCursorError):
+            Cursor.decode(token, Service.name, "desc")
+
+    @pytest.fixture
+    async def session(self):
+        """Create an in-memory database with services, some without a port."""
+        import models  # noqa: F401
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from database import Base
+        from models import Project, Service, Tenant
+
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            session.add(Tenant(id="t1", name="Acme", slug="acme"))
+            session.add(Project(id="p1", tenant_id="t1", name="api"))
+            ports = [None, 8002, None, 8001, 8002, None]
+            session.add_all(
+                [
+                    Service(id=f"s{i}", project_id="p1", name=f"svc-{i}", port=port)
+                    for i, port in enumerate(ports)
+                ]
+            )
+            await session.commit()
+            yield session
+        await engine.dispose()
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("sort_order", ["asc", "desc"])
+    async def test_keyset_pages_through_nulls(self, session, sort_order):
+        """Test rows with a NULL sort value are neither skipped nor repeated."""
+        from repositories.service import ServiceRepository
+
+        repo = ServiceRepository(session)
+        sort = SortParams("port", sort_order)
+        page = await repo.list(pagination=PaginationParams(limit=2, keyset=True), sort=sort)
+        pages = [[service.id for service in page.items]]
+        while page.next_cursor:
+            pagination = PaginationParams(limit=2, cursor=page.next_cursor)
+            page = await repo.list(pagination=pagination, sort=sort)
+            pages.append([service.id for service in page.items])
+
+        ordered = ["s3", "s1", "s4", "s0", "s2", "s5"]
+        if sort_order == "desc":
+            ordered.reverse()
+        assert sum(pages, []) == ordered
+
+        pagination = PaginationParams(limit=2, cursor=page.prev_cursor)
+        previous = await repo.list(pagination=pagination, sort=sort)
+        assert [service.id for service in previous.items] == pages[-2]
+
+    def test_garbage_rejected(self):
+        """Test malformed cursors raise InvalidCursorError."""
+        from models.service import Service
+
+        with pytest.raises(InvalidCursorError):
+            Cursor.decode("not-a-cursor!", Service.name)
+
+    def test_paginated_result_explicit_has_more(self):
+        """Test keyset results carry cursors and an explicit has_more."""
+        result = PaginatedResult(
+            items=["a"],
+            total=1,
+            skip=0,
+            limit=1,
+            has_more=True,
+            next_cursor="next",
+        )
+        assert result.has_more is True
+        assert result.next_cursor == "next"
+        assert result.prev_cursor is None
+
+
 class TestNotFoundError:
     """Tests for NotFoundError."""
 
@@ -134,6 +309,7 @@ class TestBaseRepository:
     def mock_session(self):
         """Create a mock async session."""
         session = AsyncMock()
+        session.info = {}
         session.execute = AsyncMock()
         session.flush = AsyncMock()
         session.refresh = AsyncMock()
@@ -170,6 +346,388 @@ class TestBaseRepository:
         assert repo.session == mock_session
 
 
+class TestLoadProfiles:
+    """Tests for per-call relationship load profiles."""
+
+    def test_no_profile_loads_nothing(self):
+        """Test queries are untouched when no profile is given."""
+        from sqlalchemy import select
+
+        from models.service import Service
+        from repositories.service import ServiceRepository
+
+        repo = ServiceRepository(AsyncMock())
+        query = select(Service)
+        assert repo._apply_load_profile(query, None) is query
+
+    def test_profile_adds_loader_options(self):
+        """Test a profile adds one loader option per relationship path."""
+        from sqlalchemy import select
+
+        from models.tenant import Tenant
+        from repositories.base import LoadProfile
+        from repositories.tenant import TenantRepository
+
+        repo = TenantRepository(AsyncMock())
+        query = repo._apply_load_profile(select(Tenant), LoadProfile.FULL)
+        assert len(query._with_options) == 2
+
+    def test_unknown_profile_rejected(self):
+        """Test unknown profile names raise ValueError."""
+        from sqlalchemy import select
+
+        from models.service import Service
+        from repositories.service import ServiceRepository
+
+        repo = ServiceRepository(AsyncMock())
+        with pytest.raises(ValueError):
+            repo._apply_load_profile(select(Service), "everything")
+
+    def test_relationships_not_eager_by_default(self):
+        """Test no model relationship is loaded implicitly."""
+        from sqlalchemy import inspect
+
+        import models
+
+        for name in models.__all__:
+            model = getattr(models, name)
+            if not hasattr(model, "__table__"):
+                continue
+            for rel in inspect(model).relationships:
+                assert rel.lazy != "selectin", f"{name}.{rel.key}"
+
+
+class TestEnvironmentVariableBulkOperations:
+    """Tests for single-statement environment variable writes."""
+
+    @pytest.fixture
+    def mock_session(self):
+        """Create a mock async session."""
+        session = AsyncMock()
+        session.info = {}
+        session.execute = AsyncMock(return_value=MagicMock())
+        return session
+
+    @pytest.mark.anyio
+    async def test_bulk_upsert_single_statement(self, mock_session):
+        """Test bulk upsert issues one ON CONFLICT statement with deduplicated keys."""
+        from sqlalchemy.dialects import postgresql
+
+        from repositories.environment_variable import EnvironmentVariableRepository
+
+        repo = EnvironmentVariableRepository(mock_session)
+        await repo.bulk_upsert(
+            "svc-1",
+            [
+                {"key": "A", "value": "1"},
+                {"key": "A", "value": "2"},
+                {"key": "B", "value": "3", "is_secret": True},
+            ],
+        )
+
+        assert mock_session.execute.await_count == 1
+        statement = mock_session.execute.call_args[0][0]
+        compiled = statement.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        assert "ON CONFLICT (service_id, key) DO UPDATE" in sql
+        assert "RETURNING" in sql
+        assert compiled.params["value_m0"] == "2"
+        assert "key_m2" not in compiled.params
+
+    @pytest.mark.anyio
+    async def test_delete_by_keys_empty(self, mock_session):
+        """Test deleting no keys skips the database."""
+        from repositories.environment_variable import EnvironmentVariableRepository
+
+        repo = EnvironmentVariableRepository(mock_session)
+        assert await repo.delete_by_keys("svc-1", []) == 0
+        mock_session.execute.assert_not_awaited()
+
+
+class TestUpdateReturning:
+    """Tests for the single round-trip update path."""
+
+    @pytest.fixture
+    def mock_session(self):
+        """Create a mock async session whose UPDATE matches no rows."""
+        session = AsyncMock()
+        session.info = {}
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = None
+        session.execute = AsyncMock(return_value=result)
+        return session
+
+    @pytest.mark.anyio
+    async def test_missing_entity_raises(self, mock_session):
+        """Test updating a missing entity raises NotFoundError."""
+        from repositories.service import ServiceRepository
+
+        repo = ServiceRepository(mock_session)
+        with pytest.raises(NotFoundError):
+            await repo.update_returning("missing", {"name": "api"})
+        assert mock_session.execute.await_count == 1
+
+    @pytest.mark.anyio
+    async def test_complete_build_computes_duration_in_sql(self, mock_session):
+        """Test complete_build is one UPDATE computing the duration in SQL."""
+        from sqlalchemy.dialects import postgresql
+
+        from repositories.build import BuildRepository
+
+        mock_session.execute.return_value.scalar_one_or_none.return_value = MagicMock()
+        repo = BuildRepository(mock_session)
+        await repo.complete_build("build-1", success=True, image_tag="app:1")
+
+        assert mock_session.execute.await_count == 1
+        statement = mock_session.execute.call_args[0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert sql.startswith("UPDATE builds SET")
+        assert "EXTRACT(epoch FROM now() - builds.started_at)" in sql
+        assert "RETURNING" in sql
+
+
+class TestStreaming:
+    """Tests for server-side cursor iteration."""
+
+    @pytest.fixture
+    def mock_session(self):
+        """Create a mock async session streaming two partitions."""
+
+        async def partitions():
+            yield ["a", "b"]
+            yield ["c"]
+
+        session = AsyncMock()
+        session.info = {}
+        result = MagicMock()
+        result.partitions = partitions
+        session.stream_scalars = AsyncMock(return_value=result)
+        return session
+
+    @pytest.mark.anyio
+    async def test_stream_yields_every_partition(self, mock_session):
+        """Test stream flattens partitions fetched with yield_per."""
+        from repositories.service import ServiceRepository
+
+        repo = ServiceRepository(mock_session)
+        items = [item async for item in repo.stream({"status": "running"}, chunk_size=2)]
+
+        assert items == ["a", "b", "c"]
+        kwargs = mock_session.stream_scalars.call_args[1]
+        assert kwargs["execution_options"] == {"yield_per": 2}
+
+    @pytest.mark.anyio
+    async def test_stream_by_tenant_filters_through_projects(self, mock_session):
+        """Test tenant streams select service ids through the projects table."""
+        from sqlalchemy.dialects import postgresql
+
+        from repositories.environment_variable import EnvironmentVariableRepository
+
+        repo = EnvironmentVariableRepository(mock_session)
+        items = [item async for item in repo.stream_by_tenant("tenant-1")]
+
+        assert len(items) == 3
+        statement = mock_session.stream_scalars.call_args[0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "environment_variables.service_id IN (SELECT services.id" in sql
+        assert "projects.tenant_id" in sql
+
+
+class TestBatchLoader:
+    """Tests for request-scoped batched lookups."""
+
+    @pytest.fixture
+    def mock_session(self):
+        """Create a batching mock session that returns the requested services."""
+        from database import BATCH_LOADING_KEY
+
+        session = AsyncMock()
+        session.info = {BATCH_LOADING_KEY: True}
+
+        async def execute(query):
+            ids = query.whereclause.right.value
+            result = MagicMock()
+            result.scalars.return_value = [
+                MagicMock(id=entity_id) for entity_id in ids if entity_id != "missing"
+            ]
+            return result
+
+        session.execute = AsyncMock(side_effect=execute)
+        return session
+
+    @pytest.mark.anyio
+    async def test_same_tick_lookups_coalesced(self, mock_session):
+        """Test concurrent get_by_id calls share one IN query."""
+        import asyncio
+
+        from repositories.service import ServiceRepository
+
+        repo = ServiceRepository(mock_session)
+        found = await asyncio.gather(
+            repo.get_by_id("a"), repo.get_by_id("b"), repo.get_by_id("missing")
+        )
+
+        assert mock_session.execute.await_count == 1
+        assert [entity and entity.id for entity in found] == ["a", "b", None]
+
+    @pytest.mark.anyio
+    async def test_lookups_memoized_until_write(self, mock_session):
+        """Test repeated lookups hit the memo until the model is written."""
+        from repositories.loader import clear_loaders
+        from repositories.service import ServiceRepository
+
+        repo = ServiceRepository(mock_session)
+        first = await repo.get_by_id("a")
+        assert await repo.get_by_id("a") is first
+        assert mock_session.execute.await_count == 1
+
+        clear_loaders(mock_session, repo.model)
+        await repo.get_by_id("a")
+        assert mock_session.execute.await_count == 2
+
+
+    @pytest.mark.anyio
+    async def test_rollback_clears_memo(self):
+        """Test instances expired by a rollback are loaded again, not served from the memo."""
+        import models  # noqa: F401
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from database import BATCH_LOADING_KEY, Base
+        from models import Tenant
+        from repositories.base import ConflictError
+        from repositories.tenant import TenantRepository
+
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            session.info[BATCH_LOADING_KEY] = True
+            session.add(Tenant(id="t1", name="Acme", slug="acme"))
+            await session.commit()
+
+            repo = TenantRepository(session)
+            tenant = await repo.get_by_id("t1")
+            with pytest.raises(ConflictError):
+                await repo.create({"id": "t2", "name": "Other", "slug": "acme"})
+
+            reloaded = await repo.get_by_id("t1")
+            assert reloaded.name == "Acme"
+            assert reloaded is tenant
+        await engine.dispose()
+
+class TestMembershipRoleCache:
+    """Tests for cached team membership checks."""
+
+    @pytest.fixture(autouse=True)
+    def role_cache(self, monkeypatch):
+        """Start every test with an empty role cache keeping versions in process."""
+        from repositories import team_member
+
+        cache = team_member.MembershipCache()
+        monkeypatch.setattr(team_member, "_role_cache", cache)
+        return cache
+
+    @pytest.fixture
+    def mock_session(self):
+        """Create a mock session where the user is an admin."""
+        session = AsyncMock()
+        session.info = {}
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = "admin"
+        session.execute = AsyncMock(return_value=result)
+        return session
+
+    @pytest.mark.anyio
+    async def test_checks_served_from_cache(self, mock_session):
+        """Test repeated permission checks query the database once."""
+        from models.base import TeamMemberRole
+        from repositories.team_member import TeamMemberRepository
+
+        repo = TeamMemberRepository(mock_session)
+        assert await repo.is_member("team-1", "user-1") is True
+        assert await repo.has_role("team-1", "user-1", TeamMemberRole.ADMIN) is True
+        assert await repo.has_role("team-1", "user-1", TeamMemberRole.OWNER) is False
+        assert mock_session.execute.await_count == 1
+
+    @pytest.mark.anyio
+    async def test_remove_member_invalidates(self, mock_session):
+        """Test removing a member drops the cached role."""
+        from repositories.team_member import TeamMemberRepository
+
+        repo = TeamMemberRepository(mock_session)
+        await repo.is_member("team-1", "user-1")
+        mock_session.execute.return_value.scalar_one_or_none.return_value = MagicMock()
+        assert await repo.remove_member("team-1", "user-1") is True
+
+        mock_session.execute.return_value.scalar_one_or_none.return_value = None
+        assert await repo.is_member("team-1", "user-1") is False
+
+    @pytest.mark.anyio
+    async def test_invalidation_reaches_other_processes(self, mock_session, monkeypatch):
+        """Test a role change committed in one process is not served from another's cache."""
+        from repositories import team_member
+
+        redis = FakeRedis()
+        writer = team_member.MembershipCache()
+        reader = team_member.MembershipCache()
+        writer._redis = reader._redis = redis
+
+        monkeypatch.setattr(team_member, "_role_cache", reader)
+        repo = team_member.TeamMemberRepository(mock_session)
+        assert await repo.is_member("team-1", "user-1") is True
+        assert await repo.is_member("team-1", "user-1") is True
+        assert mock_session.execute.await_count == 1
+
+        await writer.invalidate("user-1")
+        mock_session.execute.return_value.scalar_one_or_none.return_value = None
+        assert await repo.is_member("team-1", "user-1") is False
+        assert mock_session.execute.await_count == 2
+
+    @pytest.mark.anyio
+    async def test_unreachable_redis_reads_database(self, mock_session, monkeypatch):
+        """Test roles are not served from cache when versions cannot be checked."""
+        from repositories import team_member
+
+        cache = team_member.MembershipCache()
+        cache._redis = FakeRedis(down=True)
+        monkeypatch.setattr(team_member, "_role_cache", cache)
+        repo = team_member.TeamMemberRepository(mock_session)
+        await repo.is_member("team-1", "user-1")
+        await repo.is_member("team-1", "user-1")
+        assert mock_session.execute.await_count == 2
+
+
+class FakeRedis:
+    """The few Redis commands the membership cache uses, in memory."""
+
+    def __init__(self, down=False):
+        self.down = down
+        self.values = {}
+
+    async def mget(self, *keys):
+        if self.down:
+            raise ConnectionError("redis is down")
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+
+    def expire(self, key, seconds):
+        pass
+
+    async def execute(self):
+        pass
+
+
 # Test model and repository imports
 class TestRepositoryImports:
     """Test that all repositories can be imported."""
@@ -266,6 +824,173 @@ class TestModelImports:
         assert WebhookProvider.GITHUB == "github"
 
 
+class TestBuildLogStore:
+    """Tests for the append-only chunked build log store."""
+
+    @pytest.fixture
+    def mock_session(self):
+        """Create a mock async session."""
+        session = AsyncMock()
+        session.info = {}
+        session.execute = AsyncMock(return_value=MagicMock())
+        return session
+
+    @pytest.mark.anyio
+    async def test_append_is_single_insert_select(self, mock_session):
+        """Test appending numbers the chunk from the last one in one statement."""
+        from sqlalchemy.dialects import postgresql
+
+        from repositories.build_log import BuildLogRepository
+
+        repo = BuildLogRepository(mock_session)
+        await repo.append("build-1", "line\n")
+
+        assert mock_session.execute.await_count == 1
+        statement = mock_session.execute.call_args[0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert sql.startswith("INSERT INTO build_log_chunks")
+        assert "ORDER BY build_log_chunks.seq DESC" in sql
+        assert "RETURNING" in sql
+
+    @pytest.mark.anyio
+    async def test_append_empty_is_noop(self, mock_session):
+        """Test empty output is not stored."""
+        from repositories.build_log import BuildLogRepository
+
+        repo = BuildLogRepository(mock_session)
+        assert await repo.append("build-1", "") is None
+        mock_session.execute.assert_not_awaited()
+
+    @pytest.mark.anyio
+    async def test_read_from_offset_slices_first_chunk(self, mock_session):
+        """Test reading from inside a chunk skips the part already read."""
+        from repositories.build_log import BuildLogRepository
+
+        rows = [MagicMock(start_offset=0, content="hello "), MagicMock(start_offset=6, content="world")]
+        mock_session.execute.return_value.all.return_value = rows
+        repo = BuildLogRepository(mock_session)
+        log_slice = await repo.read("build-1", offset=3)
+
+        assert log_slice.content == "lo world"
+        assert log_slice.next_offset == 11
+
+    @pytest.mark.anyio
+    async def test_follow_releases_connection_between_polls(self, mock_session):
+        """Test following ends the transaction before handing output to the client."""
+        from models.base import BuildStatus
+        from repositories.build_log import BuildLogRepository
+
+        def rows(*contents):
+            result = MagicMock()
+            result.all.return_value = [MagicMock(start_offset=0, content=c) for c in contents]
+            return result
+
+        status = MagicMock()
+        status.scalar_one_or_none.return_value = BuildStatus.SUCCESS
+        not_archived = MagicMock()
+        not_archived.scalar_one_or_none.return_value = None
+        mock_session.execute.side_effect = [
+            rows("step 1\n"),
+            rows(),
+            not_archived,
+            status,
+            rows(),
+            not_archived,
+        ]
+        repo = BuildLogRepository(mock_session)
+
+        async for content in repo.follow("build-1", poll_interval=0):
+            assert content == "step 1\n"
+            assert mock_session.rollback.await_count == 1
+        assert mock_session.rollback.await_count == 2
+
+    @pytest.mark.anyio
+    async def test_update_status_appends_instead_of_rewriting(self, mock_session):
+        """Test status updates append logs rather than setting Build.logs."""
+        from models.base import BuildStatus
+        from repositories.build import BuildRepository
+
+        repo = BuildRepository(mock_session)
+        await repo.update_status("build-1", BuildStatus.BUILDING, logs="step 1\n")
+
+        assert mock_session.execute.await_count == 2
+        insert_sql = str(mock_session.execute.call_args_list[0][0][0])
+        update_sql = str(mock_session.execute.call_args_list[1][0][0])
+        assert insert_sql.startswith("INSERT INTO build_log_chunks")
+        assert "logs" not in update_sql
+
+
+class TestBuildDeferredColumns:
+    """Test large build columns are not loaded by default."""
+
+    def test_large_columns_deferred(self):
+        """Test logs, commit message and metadata are deferred together."""
+        from sqlalchemy import inspect
+
+        from models.build import BUILD_DETAILS_GROUP, Build
+
+        mapper = inspect(Build)
+        for name in ("logs", "commit_message", "build_metadata"):
+            prop = mapper.column_attrs[name]
+            assert prop.deferred is True
+            assert prop.group == BUILD_DETAILS_GROUP
+
+    def test_listing_columns_not_deferred(self):
+        """Test the columns used for listing builds stay eagerly loaded."""
+        from sqlalchemy import inspect
+
+        from models.build import Build
+
+        mapper = inspect(Build)
+        for name in ("status", "commit_sha", "duration_seconds", "created_at"):
+            assert mapper.column_attrs[name].deferred is False
+
+
+    @pytest.fixture
+    async def session(self):
+        """Create an in-memory database with one service."""
+        import models  # noqa: F401
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from database import Base
+        from models import Project, Service, Tenant
+
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            session.add(Tenant(id="t1", name="Acme", slug="acme"))
+            session.add(Project(id="p1", tenant_id="t1", name="api"))
+            session.add(Service(id="s1", project_id="p1", name="web"))
+            await session.commit()
+            yield session
+        await engine.dispose()
+
+    @pytest.mark.anyio
+    async def test_created_and_updated_builds_keep_written_columns(self, session):
+        """Test deferred columns just written stay readable after create and update."""
+        from sqlalchemy import inspect
+
+        from repositories.build import BuildRepository
+
+        repo = BuildRepository(session)
+        build = await repo.create(
+            {"service_id": "s1", "commit_message": "Fix", "build_metadata": {"trigger": "push"}}
+        )
+        assert build.commit_message == "Fix"
+        assert build.build_metadata == {"trigger": "push"}
+        await session.commit()
+        session.expunge_all()
+
+        build = await repo.update(build.id, {"commit_message": "Fix again"})
+        assert build.commit_message == "Fix again"
+        # Deferred columns not written are still not loaded
+        assert "logs" in inspect(build).unloaded
+
+        requested = await repo.request_build("s1", "abc123", "main", commit_message="Push")
+        assert requested.build.commit_message == "Push"
+        assert requested.build.build_metadata is None
+
 class TestEnumValues:
     """Test enum values are correct."""
 
@@ -274,9 +999,11 @@ class TestEnumValues:
         from models.base import BuildStatus
         
         assert BuildStatus.PENDING.value == "pending"
+        assert BuildStatus.QUEUED.value == "queued"
         assert BuildStatus.BUILDING.value == "building"
         assert BuildStatus.SUCCESS.value == "success"
         assert BuildStatus.FAILED.value == "failed"
+        assert BuildStatus.CANCELLED.value == "cancelled"
 
     def test_service_status_values(self):
         """Test ServiceStatus enum values."""
@@ -0,0 +1,109 @@
+"""Unit tests for fast response serialization and sparse fieldsets."""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from core.serialization import dumps, encode_page, list_adapter, parse_fields
+from database import Base
+from models import Project, Tenant
+from repositories import PaginationParams, ProjectRepository, SortParams
+from schemas import ProjectRead, ServiceRead
+
+
+class TestSparseFields:
+    """Tests for fields= parsing and per-fieldset adapters."""
+
+    def test_parse_fields_adds_id(self):
+        """Test id is always part of a fieldset."""
+        assert parse_fields("name, status", ServiceRead) == ("id", "name", "status")
+        assert parse_fields(None, ServiceRead) is None
+
+    def test_unknown_field_rejected(self):
+        """Test fields outside the schema raise ValueError."""
+        with pytest.raises(ValueError, match="password"):
+            parse_fields("name,password", ProjectRead)
+
+    def test_adapter_cached_per_fieldset(self):
+        """Test adapters are built once per schema and fieldset."""
+        assert list_adapter(ProjectRead, ("id", "name")) is list_adapter(ProjectRead, ("id", "name"))
+
+
+class TestEncodePage:
+    """Tests for page encoding."""
+
+    def test_page_envelope(self):
+        """Test items and page metadata end up in one JSON document."""
+        created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        rows = [{"id": "p1", "tenant_id": "t1", "name": "api", "created_at": created}]
+        body = encode_page(list_adapter(ProjectRead), rows, total=1, has_more=False)
+        page = json.loads(body)
+        assert page["items"][0]["created_at"] == "2024-01-01T00:00:00Z"
+        assert page["items"][0]["description"] is None
+        assert page["total"] == 1 and page["has_more"] is False
+
+    def test_sparse_page_only_has_selected_fields(self):
+        """Test a fieldset adapter drops every other field."""
+        rows = [{"id": "p1", "name": "api"}]
+        body = encode_page(list_adapter(ProjectRead, ("id", "name")), rows)
+        assert json.loads(body) == {"items": [{"id": "p1", "name": "api"}]}
+
+    def test_dumps_models(self):
+        """Test orjson encoding falls back to model_dump for schemas."""
+        project = ProjectRead(
+            id="p1", tenant_id="t1", name="api", created_at=datetime(2024, 1, 1)
+        )
+        assert json.loads(dumps({"project": project}))["project"]["name"] == "api"
+
+
+class TestProjectedList:
+    """Tests for column-projected repository lists."""
+
+    @pytest.fixture
+    async def session(self):
+        """Create an in-memory database with three projects."""
+        import models  # noqa: F401
+
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            session.add(Tenant(id="t1", name="Acme", slug="acme"))
+            session.add_all(
+                [Project(id=f"p{i}", tenant_id="t1", name=f"project-{i}") for i in range(3)]
+            )
+            await session.commit()
+            yield session
+        await engine.dispose()
+
+    @pytest.mark.anyio
+    async def test_rows_are_dicts_of_selected_columns(self, session):
+        """Test projected lists return plain dicts and no ORM objects."""
+        result = await ProjectRepository(session).list_by_tenant(
+            "t1", sort=SortParams("name", "asc"), columns=["name"]
+        )
+        assert result.items == [{"id": f"p{i}", "name": f"project-{i}"} for i in range(3)]
+        assert result.total == 3
+        assert len(session.identity_map) == 0
+
+    @pytest.mark.anyio
+    async def test_keyset_pages_over_projected_rows(self, session):
+        """Test keyset cursors work on projected rows."""
+        repo = ProjectRepository(session)
+        sort = SortParams("name", "asc")
+        first = await repo.list_by_tenant(
+            "t1", PaginationParams(limit=2, keyset=True), sort, columns=["id"]
+        )
+        assert [row["id"] for row in first.items] == ["p0", "p1"]
+        second = await repo.list_by_tenant(
+            "t1", PaginationParams(limit=2, cursor=first.next_cursor), sort, columns=["id"]
+        )
+        assert [row["id"] for row in second.items] == ["p2"]
+
+    @pytest.mark.anyio
+    async def test_unknown_column_rejected(self, session):
+        """Test projecting a non-column raises ValueError."""
+        with pytest.raises(ValueError):
+            await ProjectRepository(session).list_by_tenant("t1", columns=["services"])
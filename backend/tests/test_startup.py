@@ -0,0 +1,93 @@
+"""Unit tests for startup schema checks and deferred routers."""
+
+import sys
+import types
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+from sqlalchemy import Column, Integer, MetaData, Table
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import database
+from core.startup import DeferredRouters, StartupTimer
+
+
+class TestSchemaStartup:
+    """Tests for the schema version check in init_db."""
+
+    @pytest.fixture
+    async def engine(self, monkeypatch):
+        """Point the primary engine at an empty in-memory database."""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        monkeypatch.setattr(database, "engine", engine)
+        yield engine
+        await engine.dispose()
+
+    def test_schema_version_tracks_model_changes(self):
+        """Test the fingerprint changes when a column is added."""
+        metadata = MetaData()
+        table = Table("things", metadata, Column("id", Integer, primary_key=True))
+        before = database.schema_version(metadata)
+        assert database.schema_version(metadata) == before
+        table.append_column(Column("size", Integer))
+        assert database.schema_version(metadata) != before
+
+    @pytest.mark.anyio
+    async def test_check_mode_creates_once_then_skips(self, engine, monkeypatch):
+        """Test DDL runs on an empty database and is skipped afterwards."""
+        monkeypatch.setattr(database, "DB_STARTUP_MODE", "check")
+        assert await database.init_db() == "created"
+        assert await database.get_stored_schema_version() == database.schema_version()
+        assert await database.init_db() == "skipped"
+
+    @pytest.mark.anyio
+    async def test_changed_models_recreate(self, engine, monkeypatch):
+        """Test a stale stored version runs create_all again."""
+        monkeypatch.setattr(database, "DB_STARTUP_MODE", "check")
+        await database.init_db()
+        monkeypatch.setattr(database, "schema_version", lambda: "changed")
+        assert await database.init_db() == "created"
+        assert await database.get_stored_schema_version() == "changed"
+
+    @pytest.mark.anyio
+    async def test_skip_mode_runs_no_ddl(self, engine, monkeypatch):
+        """Test skip mode leaves the database untouched."""
+        monkeypatch.setattr(database, "DB_STARTUP_MODE", "skip")
+        assert await database.init_db() == "skipped"
+        assert await database.get_stored_schema_version() is None
+
+
+class TestDeferredRouters:
+    """Tests for routers imported on first use."""
+
+    @pytest.fixture
+    def router_module(self, monkeypatch):
+        """Register an importable module holding a router."""
+        module = types.ModuleType("deferred_test_routes")
+        module.router = APIRouter()
+
+        @module.router.get("/rare")
+        async def rare():
+            return {"rare": True}
+
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+        return module
+
+    @pytest.mark.anyio
+    async def test_first_request_loads_router(self, router_module):
+        """Test an unmatched request loads pending routers and is retried."""
+        app = FastAPI()
+        timer = StartupTimer()
+        deferred = DeferredRouters(app, timer)
+        deferred.add("deferred_test_routes:router", prefix="/api")
+        assert not deferred.loaded
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/api/rare")).json() == {"rare": True}
+            assert (await client.get("/missing")).status_code == 404
+
+        assert deferred.loaded
+        assert "deferred_routers" in timer.phases
+        assert "/api/rare" in app.openapi()["paths"]
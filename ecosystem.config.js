@@ -2,19 +2,23 @@ module.exports = {
   apps: [
     {
       name: 'railway-api',
-      script: 'uvicorn',
-      args: 'main:app --host 0.0.0.0 --port 8000',
+      // Pre-fork supervisor running WEB_CONCURRENCY uvicorn workers.
+      // Rolling restart: pm2 sendSignal SIGHUP railway-api
+      script: 'serve.py',
+      args: '--host 0.0.0.0 --port 8000',
       cwd: './backend',
       interpreter: 'python3',
       instances: 1,
       exec_mode: 'fork',
       autorestart: true,
       watch: false,
-      max_memory_restart: '500M',
+      // Workers over WORKER_MAX_MEMORY_MB are replaced by the supervisor
+      // itself; PM2 only sees the supervisor process
+      kill_timeout: 40000,
       env: {
         NODE_ENV: 'development',
         ENVIRONMENT: 'development'
-        // DATABASE_URL, REDIS_URL, SECRET_KEY loaded from .env file
+        // DATABASE_URL, REDIS_URL, SECRET_KEY, WEB_CONCURRENCY loaded from .env file
       },
       env_production: {
         NODE_ENV: 'production',